@@ -0,0 +1,98 @@
+"""
+Benchmarks of io readers using synthetic documents
+
+Run from asv_bench directory::
+
+    asv run
+    asv continuous master HEAD
+"""
+
+from pyopendata.io import read_sdmx, read_jsdmx, read_jstat
+from pyopendata.io.sdmx import _read_sdmx_dsd
+from pyopendata.util import testing
+
+
+class ReadSDMX(object):
+
+    params = ([(10, 5, 2), (20, 10, 10)], [0., 0.5])
+    param_names = ['dimensions', 'sparsity']
+
+    def setup(self, dimensions, sparsity):
+        self.dsd = _read_sdmx_dsd(testing.make_sdmx_dsd(dimensions))
+        self.data = testing.make_sdmx(dimensions, periods=20, sparsity=sparsity)
+
+    def time_read_sdmx(self, dimensions, sparsity):
+        read_sdmx(self.data, dsd=self.dsd)
+
+    def peakmem_read_sdmx(self, dimensions, sparsity):
+        read_sdmx(self.data, dsd=self.dsd)
+
+    def time_read_sdmx_without_dsd(self, dimensions, sparsity):
+        read_sdmx(self.data)
+
+
+class ReadSDMXUnaligned(object):
+
+    # series key values and observations are ordered differently in each series,
+    # which requires realignment of keys
+
+    params = [(10, 5, 2), (20, 10, 10)]
+    param_names = ['dimensions']
+
+    def setup(self, dimensions):
+        self.dsd = _read_sdmx_dsd(testing.make_sdmx_dsd(dimensions))
+        self.data = testing.make_sdmx(dimensions, periods=20, shuffle=True)
+
+    def time_read_sdmx(self, dimensions):
+        read_sdmx(self.data, dsd=self.dsd)
+
+    def peakmem_read_sdmx(self, dimensions):
+        read_sdmx(self.data, dsd=self.dsd)
+
+
+class ReadSDMXDSD(object):
+
+    params = [(10, 5, 2), (500, 50, 20)]
+    param_names = ['dimensions']
+
+    def setup(self, dimensions):
+        self.dsd = testing.make_sdmx_dsd(dimensions)
+
+    def time_read_sdmx_dsd(self, dimensions):
+        _read_sdmx_dsd(self.dsd)
+
+    def peakmem_read_sdmx_dsd(self, dimensions):
+        _read_sdmx_dsd(self.dsd)
+
+
+class ReadJSDMX(object):
+
+    params = ([(10, 5, 2), (20, 10, 10, 5)], [0., 0.95])
+    param_names = ['dimensions', 'sparsity']
+
+    def setup(self, dimensions, sparsity):
+        self.data = testing.make_jsdmx(dimensions, periods=20, sparsity=sparsity)
+
+    def time_read_jsdmx(self, dimensions, sparsity):
+        read_jsdmx(self.data)
+
+    def peakmem_read_jsdmx(self, dimensions, sparsity):
+        read_jsdmx(self.data)
+
+
+class ReadJStat(object):
+
+    params = ([(10, 5, 20), (100, 50, 200)], [0., 0.5])
+    param_names = ['dimensions', 'sparsity']
+
+    def setup(self, dimensions, sparsity):
+        self.data = testing.make_jstat(dimensions, sparsity=sparsity, status=True)
+
+    def time_read_jstat(self, dimensions, sparsity):
+        read_jstat(self.data)
+
+    def time_read_jstat_status(self, dimensions, sparsity):
+        read_jstat(self.data, status=True)
+
+    def peakmem_read_jstat(self, dimensions, sparsity):
+        read_jstat(self.data)
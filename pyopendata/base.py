@@ -3,20 +3,32 @@
 from __future__ import unicode_literals
 from __future__ import division
 
+import collections
+import datetime
 import os
 import sys
+import tempfile
 
+import numpy as np
 import requests
 import pandas
-from pandas.compat import StringIO, bytes_to_str, binary_type
 from pandas.util.decorators import Appender
 
-from pyopendata.util import network
+from pyopendata.util import cache, network
 
 _shared_docs = dict()
 _base_doc_kwargs = dict(resource_klass='DataResource')
 
 
+# marks the cache attribute which is not set, to distinguish from None (disabled)
+_default = object()
+
+
+# request to be issued asynchronously. callback receives ``requests.Response``
+# to fill caches, and returns list of following _Prefetch (or None)
+_Prefetch = collections.namedtuple('_Prefetch', ['url', 'params', 'callback'])
+
+
 class DataResource(pandas.core.base.StringMixin):
     """
     Represents a data contained in the URL
@@ -30,6 +42,10 @@ class DataResource(pandas.core.base.StringMixin):
     _cache_attrs = []
 
     _chunk_size = 1024 * 1024
+    # raw content larger than this is spilled to a temporary file
+    _spool_size = 32 * 1024 * 1024
+    # keyword of ``read`` to retrieve observations since a period, used by ``refresh``
+    _since_keyword = None
 
     def __init__(self, format=None, id=None, name=None, url=None, proxies=None,
                  size=None, **kwargs):
@@ -47,8 +63,12 @@ class DataResource(pandas.core.base.StringMixin):
         for attr in self._attrs:
             value = kwargs.pop(attr, None)
             setattr(self, attr, value)
-        # cache for raw content
+        # cache for raw content, binary file-like
         self._raw_content = None
+        # results of ``refresh`` and the time retrieved, keyed by keywords
+        self._refreshed = {}
+        # ETag and Last-Modified of retrieved responses, keyed by url
+        self._validators = {}
 
         self._initialize_attrs(self)
 
@@ -77,15 +97,79 @@ class DataResource(pandas.core.base.StringMixin):
         else:
             return url
 
-    def _requests_get(self, action='',  params=None, url=None):
+    @property
+    def session_pool(self):
+        """
+        SessionPool used to issue requests. Default pool is shared by
+        all stores and resources (see ``pyopendata.util.network.set_default_pool``)
+        """
+        pool = getattr(self, '_session_pool', None)
+        if pool is None:
+            return network.get_default_pool()
+        return pool
+
+    @session_pool.setter
+    def session_pool(self, pool):
+        self._session_pool = pool
+
+    @property
+    def http_cache(self):
+        """
+        HTTPCache to store responses on disk. Default is shared by
+        all stores and resources (see ``pyopendata.util.cache.set_default_cache``).
+        None disables the cache for the instance
+        """
+        http_cache = getattr(self, '_http_cache', _default)
+        if http_cache is _default:
+            return cache.get_default_cache()
+        return http_cache
+
+    @http_cache.setter
+    def http_cache(self, http_cache):
+        self._http_cache = http_cache
+
+    @property
+    def result_cache(self):
+        """
+        ResultCache to store parsed results on disk. Default is shared by
+        all resources (see ``pyopendata.util.cache.set_default_result_cache``).
+        None disables the cache for the instance
         """
-        Internal requests.get to handle proxy
+        result_cache = getattr(self, '_result_cache', _default)
+        if result_cache is _default:
+            return cache.get_default_result_cache()
+        return result_cache
+
+    @result_cache.setter
+    def result_cache(self, result_cache):
+        self._result_cache = result_cache
+
+    def _requests_get(self, action='',  params=None, url=None, **kwargs):
+        """
+        Internal requests.get to handle proxy, pooled connections and cache
         """
         if url is None:
             url = self.url
-        response = requests.get(url + action, params=params, proxies=self.proxies)
+        http_cache = self.http_cache
+        if http_cache is not None:
+            response = http_cache.get(self.session_pool, url + action, params=params,
+                                      proxies=self.proxies, **kwargs)
+        else:
+            response = self.session_pool.get(url + action, params=params,
+                                             proxies=self.proxies, **kwargs)
+        self._record_validators(url + action, params, response.headers)
         return response
 
+    def _record_validators(self, url, params, headers):
+        """
+        Record ETag and Last-Modified of the retrieved response, which are
+        stored with the parsed result by ``_read_cached``
+        """
+        validators = getattr(self, '_validators', None)
+        if validators is not None:
+            validators[_request_url(url, params)] = [headers.get('etag'),
+                                                     headers.get('last-modified')]
+
     _shared_docs['read'] = (
         """Read data from resource
 
@@ -93,6 +177,9 @@ class DataResource(pandas.core.base.StringMixin):
         ----------
         raw : bool, default False
             If False, return pandas.DataFrame. If True, return raw data
+        cache : {'parquet', 'feather'}, ResultCache or False, optional
+            Store the parsed result on disk, and reload it while the source is
+            not changed. Default is ``result_cache`` of the resource. False disables it.
         kwargs:
             Keywords passed to pandas.read_xxx function
 
@@ -107,42 +194,284 @@ class DataResource(pandas.core.base.StringMixin):
         """)
 
     @Appender(_shared_docs['read'])
-    def read(self, raw=False, **kwargs):
+    def read(self, raw=False, cache=None, **kwargs):
         if raw:
             content = self._read_raw(**kwargs)
-            return content.getvalue()
+            content.seek(0)
+            return content.read()
+
+        result_cache = self._get_result_cache(cache)
+        if result_cache is not None:
+            return self._read_cached(result_cache, **kwargs)
+        return self._read(**kwargs)
+
+    def _get_result_cache(self, result_cache=None):
+        if result_cache is None:
+            return self.result_cache
+        elif result_cache is False:
+            return None
+        elif isinstance(result_cache, pandas.compat.string_types):
+            return cache.ResultCache(format=result_cache)
+        return result_cache
+
+    def _source_queries(self, **kwargs):
+        """
+        Return list of queries to retrieve data, as tuples of url and sorted params
+        """
+        return [(self.url, ())]
+
+    def _source_validators(self, queries, validators=None):
+        """
+        Return ETag and Last-Modified of queries, by conditional requests
+        with the given validators. Contents are not retrieved.
+        """
+        results = []
+        for i, (url, params) in enumerate(queries):
+            headers = {}
+            if validators is not None:
+                etag, last_modified = validators[i]
+                if etag is not None:
+                    headers['If-None-Match'] = etag
+                if last_modified is not None:
+                    headers['If-Modified-Since'] = last_modified
+            response = self.session_pool.get(url, params=dict(params), proxies=self.proxies,
+                                             headers=headers, stream=True)
+            try:
+                if response.status_code == 304 and validators is not None:
+                    results.append(list(validators[i]))
+                else:
+                    results.append([response.headers.get('etag'),
+                                    response.headers.get('last-modified')])
+            finally:
+                response.close()
+        return results
+
+    def _read_cached(self, result_cache, prefetched=False, **kwargs):
+        """
+        Read via ResultCache. Stored result is used if the source has the same
+        validators as the response parsed when it was stored. If prefetched,
+        validators are taken from the prefetched responses without requests
+        """
+        queries = self._source_queries(**kwargs)
+        key = (self.__class__.__name__, repr(queries), repr(sorted(kwargs.items())))
+
+        loaded = result_cache.load(key)
+        if loaded is not None:
+            result, meta = loaded
+            if result_cache.is_fresh(key):
+                return result
+            stored = meta.get('validators')
+            # the source without validators can't be regarded as unchanged,
+            # read it without revalidation
+            if stored and all(any(v) for v in stored):
+                if prefetched:
+                    validators = self._recorded_validators(queries)
+                else:
+                    validators = self._source_validators(queries, validators=stored)
+                if validators == stored:
+                    result_cache.touch(key)
+                    return result
+
+        result = self._read(**kwargs)
+        if isinstance(result, pandas.DataFrame):
+            # validators of the responses actually parsed
+            validators = self._recorded_validators(queries)
+            result_cache.put(key, result, meta=dict(validators=validators))
+        return result
+
+    def _recorded_validators(self, queries):
+        recorded = getattr(self, '_validators', {})
+        return [recorded.get(_request_url(url, params), [None, None])
+                for url, params in queries]
+
+    _shared_docs['aread'] = (
+        """Coroutine to read data from resource.
+        Data is retrieved asynchronously, then parsed as the same as ``read``.
+        Requires Python 3.5 or later and aiohttp.
+
+        Parameters
+        ----------
+        raw : bool, default False
+            If False, return pandas.DataFrame. If True, return raw data
+        session : aiohttp.ClientSession, optional
+            Session to be used. If omitted, a session is created for each call
+        kwargs:
+            Keywords passed to ``read``
+
+        Returns
+        -------
+        coroutine which returns pandas.DataFrame or requests.raw.data
+        """)
+
+    @Appender(_shared_docs['aread'])
+    def aread(self, raw=False, session=None, **kwargs):
+        from pyopendata.util import aio
+        return aio.aread(self, raw=raw, session=session, **kwargs)
+
+    def refresh(self, data=None, overlap=1, **kwargs):
+        """
+        Read time series incrementally. The first call reads the whole data, and
+        following calls with the same keywords retrieve only the periods since
+        the last observation, then merge them into the previous result.
+
+        Parameters
+        ----------
+        data : pandas.DataFrame, optional
+            Result to be refreshed, such as the one stored locally.
+            Default is the last result of ``refresh`` with the same keywords
+        overlap : int, default 1
+            Number of the last observed periods retrieved again, as they can be revised.
+            Must be 1 or greater
+        kwargs:
+            Keywords passed to ``read``
+
+        Returns
+        -------
+        data : pandas.DataFrame
+        """
+        if overlap < 1:
+            raise ValueError('overlap must be 1 or greater: {0}'.format(overlap))
+        key = repr(sorted(kwargs.items()))
+        updated_after = None
+        if data is None:
+            data, updated_after = self._refreshed.get(key, (None, None))
+        # the time is truncated to seconds by providers, rather retrieve the same update
+        retrieved = datetime.datetime.utcnow().replace(microsecond=0)
+
+        start = None if data is None else _last_observed(data, overlap)
+        if start is None:
+            result = self._read(**kwargs)
         else:
-            return self._read(**kwargs)
+            updates = self._read_since(start, updated_after=updated_after, **kwargs)
+            result = _merge_periods(data, updates, start)
+        self._refreshed[key] = (result, retrieved)
+        return result
+
+    def _read_since(self, start, updated_after=None, **kwargs):
+        """
+        Read observations since start. Providers supporting ``updated_after``
+        can return only the series updated after the time
+        """
+        if self._since_keyword is None:
+            msg = '{0} does not support incremental refresh'
+            raise NotImplementedError(msg.format(self.__class__.__name__))
+        kwargs[self._since_keyword] = start
+        return self._read(**kwargs)
+
+    def _prefetch(self, **kwargs):
+        """
+        Return list of _Prefetch to retrieve data required by ``read``
+        """
+        if self._raw_content is not None:
+            return []
+
+        def callback(response):
+            self._check_status(response)
+            self._set_raw_content(response)
+        return [_Prefetch(self.url, None, callback)]
+
+    def _check_status(self, response):
+        """
+        Raise ValueError if the response is not successful, not to buffer an error page
+        """
+        if response.status_code != 200:
+            response.close()
+            msg = 'Unable to retrieve {0}: HTTP status {1}'
+            raise ValueError(msg.format(response.url, response.status_code))
+
+    def _set_raw_content(self, response):
+        self._raw_content = self._buffer_content(response)
+
+    def _new_buffer(self):
+        return tempfile.SpooledTemporaryFile(max_size=self._spool_size)
+
+    def _buffer_content(self, response):
+        """
+        Return a binary buffer which holds the content of response.
+        Streamed response is written by chunks without holding the whole content
+        """
+        out = self._new_buffer()
+        try:
+            for chunk in response.iter_content(self._chunk_size):
+                if chunk:
+                    out.write(chunk)
+        finally:
+            response.close()
+        out.seek(0)
+        return out
 
     def _read(self):
         raise NotImplementedError
 
     def _read_raw(self, **kwargs):
+        """
+        Return raw content as a binary file-like, positioned at the beginning
+        """
         if self._raw_content is None:
-            response = self._requests_get()
+            response = self._requests_get(stream=True)
             content_length = response.headers.get('content-length')
-            out = StringIO()
-
             try:
-                content_length = int(content_length)
-                pb = network.ProgressBar(total=content_length)
-
-                for chunk in response.iter_content(self._chunk_size):
-                    if chunk:
-                        out.write(chunk)
-                        pb.update(self._chunk_size)
-                self._raw_content = out
-            except Exception as e:
-                # print(e)
-                # no content_length or any errors
-                if isinstance(response.content, binary_type):
-                    out.write(bytes_to_str(response.content))
-                else:
-                    out.write(response.content)
-                self._raw_content = out
+                pb = network.ProgressBar(total=int(content_length))
+            except (TypeError, ValueError):
+                # no content_length
+                pb = None
+
+            out = self._new_buffer()
+            for chunk in response.iter_content(self._chunk_size):
+                if chunk:
+                    out.write(chunk)
+                    if pb is not None:
+                        pb.update(len(chunk))
+            self._raw_content = out
+        self._raw_content.seek(0)
         return self._raw_content
 
 
+def _request_url(url, params=None):
+    """
+    Return url including params, to identify the request
+    """
+    if isinstance(params, dict):
+        params = sorted(params.items())
+    elif params is not None:
+        params = sorted(params)
+    return requests.Request('GET', url, params=params).prepare().url
+
+
+def _last_observed(data, overlap=1):
+    """
+    Return the overlap-th last index which has any observation, or None
+    """
+    if len(data.columns) == 0:
+        return None
+    observed = data.index[data.notnull().values.any(axis=1)]
+    if len(observed) == 0:
+        return None
+    return observed[max(len(observed) - overlap, 0)]
+
+
+def _merge_periods(data, updates, start):
+    """
+    Replace observations of data since start by updates.
+    Series not contained in updates are kept as they are
+    """
+    if len(updates.index) == 0 or len(updates.columns) == 0:
+        return data
+    new_columns = [c for c in updates.columns if c not in data.columns]
+    columns = data.columns
+    if len(new_columns) > 0:
+        columns = columns.append(updates.columns[updates.columns.get_indexer(new_columns)])
+    # union may infer frequency of DatetimeIndex, which read never sets
+    index = data.index.append(updates.index[~updates.index.isin(data.index)]).sort_values()
+
+    result = data.reindex(index=index, columns=columns)
+    values = result.values.copy()
+    rows = np.flatnonzero(index >= start)
+    positions = columns.get_indexer(updates.columns)
+    values[np.ix_(rows, positions)] = updates.reindex(index=index[rows]).values
+    return pandas.DataFrame(values, index=index, columns=columns)
+
+
 class DataStore(DataResource):
     _connection_errors = (requests.exceptions.ConnectionError, ValueError)
     _cache_attrs = ['_datasets']
@@ -154,14 +483,18 @@ class DataStore(DataResource):
         from pyopendata.undata import UNdataStore
         from pyopendata.worldbank import WorldBankStore
 
+        def _mirror_url(kind):
+            # provider stores can be initialized with URL of a mirror
+            return None if kind_or_url in (None, kind) else kind_or_url
+
         if kind_or_url == 'oecd' or cls is OECDStore:
-            return OECDStore._initialize(proxies=proxies)
+            return OECDStore._initialize(url=_mirror_url('oecd'), proxies=proxies)
         elif kind_or_url == 'eurostat' or cls is EurostatStore:
-            return EurostatStore._initialize(proxies=proxies)
+            return EurostatStore._initialize(url=_mirror_url('eurostat'), proxies=proxies)
         elif kind_or_url == 'undata' or cls is UNdataStore:
-            return UNdataStore._initialize(proxies=proxies)
+            return UNdataStore._initialize(url=_mirror_url('undata'), proxies=proxies)
         elif kind_or_url == 'worldbank' or cls is WorldBankStore:
-            return WorldBankStore._initialize(proxies=proxies)
+            return WorldBankStore._initialize(url=_mirror_url('worldbank'), proxies=proxies)
 
         elif cls is CKANStore:
             # skip validation if initialized with CKANStore directly
@@ -214,6 +547,75 @@ class DataStore(DataResource):
     def get(self, name):
         raise NotImplementedError
 
+    _shared_docs['aget'] = (
+        """Coroutine to get resource by resource_id.
+        Requires Python 3.5 or later and aiohttp.
+
+        Parameters
+        ----------
+        resource_id : str
+            id to specify resource
+        session : aiohttp.ClientSession, optional
+            Session to be used. If omitted, a session is created for each call
+
+        Returns
+        -------
+        coroutine which returns %(resource_klass)s
+        """)
+
+    @Appender(_shared_docs['aget'] % _base_doc_kwargs)
+    def aget(self, name, session=None, **kwargs):
+        from pyopendata.util import aio
+        return aio.aget(self, name, session=session, **kwargs)
+
+    def _get_prefetch(self, name, found, **kwargs):
+        """
+        Return list of _Prefetch to get resource. Resource is appended to found.
+        """
+        # most of stores can create resource without requests
+        found.append(self.get(name, **kwargs))
+        return []
+
+    def read_many(self, ids, max_workers=4, return_exceptions=False,
+                  max_pending=None, **kwargs):
+        """
+        Read multiple resources concurrently.
+
+        Parameters
+        ----------
+        ids : iterable of str
+            ids to specify resources
+        max_workers : int, default 4
+            Maximum number of resources being read concurrently.
+            Limited to the number of connections per host of ``session_pool``
+        return_exceptions : bool, default False
+            If True, exception raised while reading a resource is returned as its result.
+            Otherwise, the exception is raised.
+        max_pending : int, optional
+            Maximum number of results read but not consumed.
+            Default is twice of max_workers
+        kwargs:
+            Keywords passed to ``read``
+
+        Returns
+        -------
+        generator which yields tuples of id and result, in the order of completion
+        """
+        max_workers = min(max_workers, self.session_pool.pool_maxsize)
+
+        def read(resource_id):
+            return self.get(resource_id).read(**kwargs)
+
+        results = network.imap_threads_unordered(read, ids, max_workers=max_workers,
+                                                 max_pending=max_pending)
+        for resource_id, result, error in results:
+            if error is not None:
+                if not return_exceptions:
+                    results.close()
+                    raise error
+                result = error
+            yield resource_id, result
+
     _shared_docs['search'] = (
         """Search resources by search_string.
 
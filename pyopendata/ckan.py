@@ -2,10 +2,17 @@
 
 from __future__ import unicode_literals
 
+import gzip
+import zipfile
+
 import pandas as pd
+import pandas.compat as compat
+from pandas.compat import StringIO, text_type
 from pandas.util.decorators import Appender
 
-from pyopendata.base import DataStore, DataResource, _shared_docs
+from pyopendata.base import DataStore, DataResource, _Prefetch, _shared_docs
+from pyopendata.io.util import _json_loads, _read_stream, _sniff_format, _SNIFF_SIZE
+from pyopendata.util import network
 
 
 _ckan_doc_kwargs = dict(resource_klass='CKANResource')
@@ -22,7 +29,13 @@ class CKANStore(DataStore):
 
     """
 
-    _cache_attrs = ['_datasets', '_packages', '_groups', '_tags']
+    _cache_attrs = ['_datasets', '_packages', '_groups', '_tags', '_index']
+
+    # number of packages requested in a single page.
+    # CKAN limits it by ``ckan.search.rows_max``, 1000 by default
+    page_size = 1000
+    # number of threads to retrieve pages
+    max_workers = 4
 
     @classmethod
     def _normalize_url(cls, url):
@@ -90,6 +103,23 @@ class CKANStore(DataStore):
         results = self._validate_response(response)
         return CKANResource(_store=self, **results)
 
+    def _get_prefetch(self, object_id, found, **kwargs):
+        # same as get, try resource first then package
+        def package_callback(response):
+            results = self._validate_response(response)
+            found.append(CKANPackage(_store=self, **results))
+
+        def resource_callback(response):
+            try:
+                results = self._validate_response(response)
+            except self._connection_errors:
+                return [_Prefetch(self.url + '/api/action/package_show', dict(id=object_id),
+                                  package_callback)]
+            found.append(CKANResource(_store=self, **results))
+
+        return [_Prefetch(self.url + '/api/action/resource_show', dict(id=object_id),
+                          resource_callback)]
+
     def get_resources_from_tag(self, tag):
         params = dict(id=tag)
         response = self._requests_get('/api/action/tag_show', params=params)
@@ -107,6 +137,7 @@ class CKANStore(DataStore):
     @Appender(_shared_docs['search'] % _ckan_doc_kwargs)
     def search(self, search_string):
         # get smaller object to larger object (resource -> package)
+        # resources are searched in the index if set up by get_index
         try:
             return self.search_resource(search_string)
         except self._connection_errors:
@@ -116,25 +147,145 @@ class CKANStore(DataStore):
         except self._connection_errors:
             raise
 
-    def search_package(self, search_string):
-        params = dict(q=search_string)
-        response = self._requests_get('/api/action/package_search', params=params)
-        results = self._validate_response(response)
-        results = results['results']
-        return [CKANPackage(_store=self, **r) for r in results]
+    def search_package(self, search_string, **kwargs):
+        """
+        Search packages. All the matched packages are retrieved via pages.
+        If the index is set up by ``get_index``, packages are searched in the index
+        without accessing the store, unless kwargs are specified. The index matches
+        plain words only, Solr syntax such as ``tags:economy`` is not supported.
+
+        Parameters
+        ----------
+        search_string : str
+            Query passed as ``q``
+        kwargs:
+            Keywords passed to ``iter_search_package``
 
-    def search_resource(self, search_string):
-        # different params from search_packages
-        # params = dict(query=search_string)
-        # response = requests.get('{0}/api/action/resource_search'.format(self.url), params=params)
+        Returns
+        -------
+        result : list of CKANPackage, or list of dict if fl is specified
+        """
+        index = self._get_open_index()
+        if index is not None and len(kwargs) == 0:
+            return index.search_package(search_string)
+        return list(self.iter_search_package(search_string, **kwargs))
 
-        # avoid escape search string (:)
+    def iter_search_package(self, search_string=None, rows=None, fq=None, sort=None,
+                            fl=None, prefetch=1):
+        """
+        Search packages page by page.
 
-        request_url = '/api/action/resource_search?query={0}'.format(search_string)
-        response = self._requests_get(request_url)
-        results = self._validate_response(response)
-        results = results['results']
-        return [CKANResource(_store=self, **r) for r in results]
+        Parameters
+        ----------
+        search_string : str, optional
+            Query passed as ``q``. If omitted, all packages are matched.
+        rows : int, optional
+            Number of packages in a single page. Default is ``page_size`` of the store
+        fq : str, optional
+            Filter query, such as ``tags:economy``
+        sort : str, optional
+            Sort order, such as ``metadata_modified desc``
+        fl : str or list of str, optional
+            Fields to be retrieved. If specified, dict of the fields is returned
+            instead of CKANPackage
+        prefetch : int, default 1
+            Number of following pages retrieved concurrently in advance
+
+        Returns
+        -------
+        generator which yields CKANPackage, or dict if fl is specified
+        """
+        params = dict(q=search_string, fq=fq, sort=sort)
+        if fl is not None:
+            params['fl'] = fl if isinstance(fl, compat.string_types) else ','.join(fl)
+        params = dict((k, v) for k, v in compat.iteritems(params) if v is not None)
+
+        results = self._iter_pages('/api/action/package_search', params,
+                                   'start', 'rows', rows=rows, prefetch=prefetch)
+        for r in results:
+            if fl is not None:
+                yield r
+            else:
+                yield CKANPackage(_store=self, **r)
+
+    def search_resource(self, search_string, **kwargs):
+        """
+        Search resources. All the matched resources are retrieved via pages.
+        If the index is set up by ``get_index``, resources of the packages containing
+        all the words are searched in the index without accessing the store, unless
+        kwargs are specified. Field syntax such as ``name:population`` is not
+        supported by the index.
+
+        Parameters
+        ----------
+        search_string : str
+            Query such as ``name:population``
+        kwargs:
+            Keywords passed to ``iter_search_resource``
+
+        Returns
+        -------
+        result : list of CKANResource
+        """
+        index = self._get_open_index()
+        if index is not None and len(kwargs) == 0:
+            return index.search_resource(search_string)
+        return list(self.iter_search_resource(search_string, **kwargs))
+
+    def iter_search_resource(self, search_string, rows=None, sort=None, prefetch=1):
+        """
+        Search resources page by page.
+
+        Parameters
+        ----------
+        search_string : str
+            Query such as ``name:population``
+        rows : int, optional
+            Number of resources in a single page. Default is ``page_size`` of the store
+        sort : str, optional
+            Field to sort resources, passed as ``order_by``
+        prefetch : int, default 1
+            Number of following pages retrieved concurrently in advance
+
+        Returns
+        -------
+        generator which yields CKANResource
+        """
+        # avoid escape search string (:)
+        action = '/api/action/resource_search?query={0}'.format(search_string)
+        params = dict(order_by=sort) if sort is not None else {}
+        results = self._iter_pages(action, params, 'offset', 'limit',
+                                   rows=rows, prefetch=prefetch)
+        for r in results:
+            yield CKANResource(_store=self, **r)
+
+    def _iter_pages(self, action, params, start_key, rows_key, rows=None, prefetch=1):
+        """
+        Yield results of search action page by page
+        """
+        rows = rows or self.page_size
+
+        def read_page(start):
+            page_params = dict(params)
+            page_params[start_key] = start
+            page_params[rows_key] = rows
+            response = self._requests_get(action, params=page_params)
+            return self._validate_response(response)
+
+        first = read_page(0)
+        for r in first['results']:
+            yield r
+        nresults = len(first['results'])
+        if nresults == 0:
+            return
+
+        # page size may be limited by the server
+        starts = range(nresults, first['count'], min(rows, nresults))
+        pages = network.imap_threads(lambda start: read_page(start)['results'], starts,
+                                     max_workers=prefetch + 1, max_pending=prefetch + 1)
+        for page in pages:
+            for r in page:
+                yield r
 
     @property
     def datasets(self):
@@ -143,21 +294,141 @@ class CKANStore(DataStore):
     @property
     def packages(self):
         if self._packages is None:
+            self._packages = self.get_packages()
+        return self._packages
+
+    def get_packages(self, hydrate=False, page_size=None, max_workers=None):
+        """
+        Get all packages in the store.
+
+        Parameters
+        ----------
+        hydrate : bool, default False
+            If False, retrieve only package names by ``package_list``,
+            then resources are retrieved per package when accessed.
+            If True, retrieve packages with their resources by paginated ``package_search``,
+            or ``current_package_list_with_resources`` if search is not available.
+            Pages are retrieved concurrently.
+        page_size : int, optional
+            Number of packages in a single page. Default is ``page_size`` of the store
+        max_workers : int, optional
+            Number of threads to retrieve pages. Default is ``max_workers`` of the store
+
+        Returns
+        -------
+        result : list of CKANPackage
+        """
+        page_size = page_size or self.page_size
+        max_workers = max_workers or self.max_workers
+
+        results = None
+        if hydrate:
+            for func in [self._search_all_packages, self._list_all_packages]:
+                try:
+                    results = func(page_size, max_workers)
+                    break
+                except self._connection_errors:
+                    continue
+
+        if results is None:
             response = self._requests_get('/api/action/package_list')
             results = self._validate_response(response)
-            if isinstance(results, list):
-                self._packages = [CKANPackage(_store=self, name=r) for r in results]
-                # self._packages = results
-            elif isinstance(results, dict):
+            if isinstance(results, dict):
                 # internally calls ``current_package_list_with_resources``?
                 results = results['results']
-                self._packages = [CKANPackage(_store=self, **r) for r in results]
-            else:
+            elif not isinstance(results, list):
                 raise ValueError(type(results), results)
-        return self._packages
+
+        packages = []
+        ids = set()
+        for r in results:
+            if not isinstance(r, dict):
+                packages.append(CKANPackage(_store=self, name=r))
+                continue
+            # a package can appear in multiple pages if the catalog is modified
+            if r.get('id') is not None:
+                if r['id'] in ids:
+                    continue
+                ids.add(r['id'])
+            packages.append(CKANPackage(_store=self, **r))
+        return packages
+
+    def _search_all_packages(self, page_size, max_workers):
+        results = self._iter_pages('/api/action/package_search', dict(sort='name asc'),
+                                   'start', 'rows', rows=page_size, prefetch=max_workers - 1)
+        return list(results)
+
+    def _list_all_packages(self, page_size, max_workers):
+        # total number is unknown, retrieve pages by max_workers until reaching the end
+        def read_page(offset):
+            params = dict(offset=offset, limit=page_size)
+            response = self._requests_get('/api/action/current_package_list_with_resources',
+                                          params=params)
+            return self._validate_response(response)
+
+        results = read_page(0)
+        if len(results) == 0:
+            return results
+        if len(results) < page_size:
+            # page size may be limited by the server
+            page = read_page(len(results))
+            if len(page) == 0:
+                return results
+            page_size = len(results)
+            results.extend(page)
+            if len(page) < page_size:
+                return results
+
+        while True:
+            offsets = [len(results) + page_size * i for i in range(max_workers)]
+            pages = list(network.imap_threads(read_page, offsets, max_workers=max_workers))
+            for page in pages:
+                results.extend(page)
+            if any(len(page) < page_size for page in pages):
+                return results
+
+    def get_index(self, path=None, sync=True):
+        """
+        Get local persistent index of packages and resources, which can be searched
+        and filtered by tags, groups, formats and sizes without accessing the store.
+        Once set up, ``search``, ``search_package``, ``search_resource``, ``tags`` and
+        ``groups`` of the store use the index until it is closed. The index supports
+        plain words only, Solr syntax such as ``tags:economy`` and ``fq`` is not
+        supported.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path to the index. Default is under the cache directory, named by the URL
+        sync : bool, default True
+            If True, update the index by packages modified after the last sync.
+            The first sync retrieves all the packages.
+
+        Returns
+        -------
+        result : CKANIndex
+        """
+        from pyopendata.util.index import CKANIndex
+        index = CKANIndex(self, path=path)
+        if sync:
+            index.sync()
+        self._index = index
+        return index
+
+    def _get_open_index(self):
+        index = getattr(self, '_index', None)
+        if index is None or index.closed:
+            return None
+        return index
 
     @property
     def groups(self):
+        """
+        Names of groups. Taken from the index if set up by ``get_index``
+        """
+        index = self._get_open_index()
+        if index is not None:
+            return index.groups
         if self._groups is None:
             response = self._requests_get('/api/action/group_list')
             self._groups = self._validate_response(response)
@@ -165,6 +436,12 @@ class CKANStore(DataStore):
 
     @property
     def tags(self):
+        """
+        Names of tags. Taken from the index if set up by ``get_index``
+        """
+        index = self._get_open_index()
+        if index is not None:
+            return index.tags
         if self._tags is None:
             response = self._requests_get('/api/action/tag_list')
             self._tags= self._validate_response(response)
@@ -174,7 +451,7 @@ class CKANStore(DataStore):
         if response.status_code != 200:
             raise ValueError(response.status_code)
 
-        response_dict = response.json()
+        response_dict = _json_loads(response.content)
         if response_dict['success'] is not True:
             raise valueError(responce_dict['message'])
         return response_dict['result']
@@ -215,6 +492,20 @@ class CKANPackage(DataResource):
             self._resources = self.store.get_package(self.name).resources
         return self._resources
 
+    def _prefetch(self, **kwargs):
+        if self._resources is not None:
+            if len(self._resources) == 1:
+                return self._resources[0]._prefetch(**kwargs)
+            return []
+
+        def callback(response):
+            results = self.store._validate_response(response)
+            resources = results.get('resources', [])
+            self._resources = [CKANResource(_store=self.store, **r) for r in resources]
+            return self._prefetch(**kwargs)
+        return [_Prefetch(self.store.url + '/api/action/package_show', dict(id=self.name),
+                          callback)]
+
     @Appender(_shared_docs['get'] % _ckan_doc_kwargs)
     def get(self, resource_id):
         return self.get_resource(resource_id)
@@ -296,22 +587,118 @@ Format: {format}, Size: {size}""".format(id=self.id, name=self.name,
             else:
                 raise ValueError('Package has {0} resources. Use CKANResource.read()'.format(source_len))
 
-    def _read(self, **kwargs):
+    def _prefetch(self, **kwargs):
+        if self.resources is None:
+            return DataResource._prefetch(self, **kwargs)
+        elif len(self.resources) == 1:
+            return self.resources[0]._prefetch(**kwargs)
+        return []
+
+    def iter_chunks(self, chunksize=100000, **kwargs):
+        """
+        Read data as chunks of DataFrame. Data is parsed while downloading,
+        and only a chunk is held in memory unless the content is already retrieved.
+        Only CSV is supported, which can be gzip compressed.
+
+        Parameters
+        ----------
+        chunksize : int, default 100000
+            Number of rows of each chunk
+        kwargs:
+            Keywords passed to pandas.read_csv
+
+        Returns
+        -------
+        generator which yields pandas.DataFrame
+        """
+        response = None
+        if self._raw_content is not None:
+            source = self._read_raw()
+            head = source.read(_SNIFF_SIZE)
+            source.seek(0)
+        else:
+            response = self._requests_get(stream=True)
+            source = _read_stream(response.iter_content(self._chunk_size),
+                                  buffer_size=_SNIFF_SIZE)
+            head = source.peek(_SNIFF_SIZE)
         try:
-            # try to parse a StringIO first, then URL
-            content = self._read_raw()
-            return self._read_ext(content, **kwargs)
-        except Exception:
-            return self._read_ext(self.url, **kwargs)
+            sniffed = self._sniff(head, kwargs)
+            fmt = sniffed.format or self.format
+            if fmt not in ('CSV', 'CSV/TXT') or sniffed.compression == 'zip':
+                msg = 'Reading by chunks is not supported for format: {0}'
+                raise ValueError(msg.format(fmt if sniffed.compression != 'zip' else 'ZIP'))
+            if sniffed.compression == 'gzip':
+                source = gzip.GzipFile(fileobj=source, mode='rb')
+
+            kwargs = self._csv_options(sniffed, kwargs)
+            for chunk in pd.read_csv(source, chunksize=chunksize, **kwargs):
+                yield chunk
+        finally:
+            if response is not None:
+                source.close()
+                response.close()
+
+    def _read(self, **kwargs):
+        if kwargs.get('chunksize') is not None:
+            return self.iter_chunks(**kwargs)
+        if self.format == 'N/A':
+            raise ValueError('{0} is not available on the store'.format(self.name))
 
-    def _read_ext(self, target, **kwargs):
-        if self.format in ('CSV', 'CSV/TXT'):
+        # guess format from the content rather than metadata,
+        # the content is retrieved only once
+        content = self._read_raw()
+        sniffed = self._sniff(content.read(_SNIFF_SIZE), kwargs)
+        content.seek(0)
+
+        target = content
+        if sniffed.compression == 'gzip':
+            target = gzip.GzipFile(fileobj=content, mode='rb')
+        elif sniffed.compression == 'zip':
+            archive = zipfile.ZipFile(content)
+            names = archive.namelist()
+            if any(name.startswith('xl/') for name in names):
+                # XLSX is a zip archive
+                sniffed = sniffed._replace(format='XLS', compression=None)
+                content.seek(0)
+            else:
+                names = [name for name in names if not name.endswith('/')]
+                if len(names) != 1:
+                    msg = 'Archive contains {0} files, unable to select one to read'
+                    raise ValueError(msg.format(len(names)))
+                with archive.open(names[0]) as member:
+                    sniffed = self._sniff(member.read(_SNIFF_SIZE), kwargs)
+                target = archive.open(names[0])
+        return self._read_ext(target, sniffed.format or self.format, sniffed=sniffed, **kwargs)
+
+    def _sniff(self, head, kwargs):
+        # explicit encoding, such as multibyte cp932, is not guessed
+        encoding = kwargs.get('encoding')
+        if encoding is not None:
+            return _sniff_format(head, encodings=(encoding, ))
+        return _sniff_format(head)
+
+    def _csv_options(self, sniffed, kwargs):
+        kwargs = dict(kwargs)
+        if sniffed.encoding is not None:
+            kwargs.setdefault('encoding', sniffed.encoding)
+        if sniffed.delimiter is not None and 'sep' not in kwargs and 'delimiter' not in kwargs:
+            kwargs['sep'] = sniffed.delimiter
+        return kwargs
+
+    def _read_ext(self, target, format, sniffed=None, **kwargs):
+        if format in ('CSV', 'CSV/TXT'):
+            if sniffed is not None:
+                kwargs = self._csv_options(sniffed, kwargs)
             return pd.read_csv(target, **kwargs)
-        elif self.format == 'XLS':
+        elif format in ('XLS', 'XLSX'):
             return pd.read_excel(target, **kwargs)
-        elif self.format == 'JSON':
-            return pd.read_json(target, **kwargs)
-        elif self.format == 'N/A':
-            raise ValueError('{0} is not available on the store'.format(self.name))
+        elif format == 'JSON':
+            content = target.read()
+            if not isinstance(content, text_type):
+                encoding = 'utf-8' if sniffed is None else sniffed.encoding or 'utf-8'
+                content = content.decode(encoding)
+            return pd.read_json(StringIO(content), **kwargs)
+        elif format == 'HTML':
+            raise ValueError('{0} is a HTML page, not a data file'.format(self.name))
         else:
-            raise ValueError('Unsupported read format: {0}'.format(self.format))
+            raise ValueError('Unsupported read format: {0}'.format(format))
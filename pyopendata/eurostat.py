@@ -7,8 +7,9 @@ import pandas as pd
 from pandas.compat import u, range, iterkeys, iteritems
 from pandas.util.decorators import Appender
 
-from pyopendata.base import DataStore, DataResource, _shared_docs
+from pyopendata.base import DataStore, DataResource, _Prefetch, _shared_docs
 import pyopendata.io.sdmx as sdmx
+from pyopendata.util import cache
 
 
 _eurostat_doc_kwargs = dict(resource_klass='EurostatResource')
@@ -21,57 +22,259 @@ class EurostatStore(DataStore):
     # http://epp.eurostat.ec.europa.eu/portal/page/portal/sdmx_web_services/getting_started/rest_sdmx_2.1
 
     _url = 'http://www.ec.europa.eu/eurostat/SDMX/diss-web/rest'
-    _cache_attrs = ['_datasets']
+    _cache_attrs = ['_datasets', '_catalog']
+
+    # seconds to use the persisted dataflow list without revalidating
+    catalog_ttl = 24 * 60 * 60
 
     @Appender(_shared_docs['get'] % _eurostat_doc_kwargs)
     def get(self, data_id):
-        resource = EurostatResource(id=data_id)
+        resource = EurostatResource(_store=self, id=data_id)
         return resource
 
+    def get_catalog(self, path=None, refresh=True, ttl=None):
+        """
+        Get local catalog of dataflows, persisted between sessions.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path to the catalog. Default is under the cache directory, named by the URL
+        refresh : bool, default True
+            If True, retrieve the dataflow list if it has been changed
+        ttl : int, optional
+            Seconds to use the catalog without revalidating. Default is ``catalog_ttl``
+
+        Returns
+        -------
+        result : EurostatCatalog
+        """
+        from pyopendata.util.index import EurostatCatalog
+        if ttl is None:
+            ttl = self.catalog_ttl
+        catalog = EurostatCatalog(self, path=path, ttl=ttl)
+        if refresh:
+            catalog.refresh()
+        return catalog
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            self._catalog = self.get_catalog()
+        return self._catalog
+
     @property
     def datasets(self):
         if self._datasets is None:
-            response = self._requests_get('/dataflow/ESTAT/all/latest')
-            import xml.etree.cElementTree as ET
-            root = ET.fromstring(response.content)
-
-            self._datasets = []
-            for dataflow in root.iter(sdmx._STRUCTURE + 'Dataflow'):
-                name = sdmx._get_english_name(dataflow)
-                id = dataflow.get('id')
-                resource = EurostatResource(name=name, id=id)
-                self._datasets.append(resource)
+            self._datasets = self.catalog.datasets
         return self._datasets
 
+    @Appender(_shared_docs['search'] % _eurostat_doc_kwargs)
+    def search(self, search_string):
+        return self.catalog.search(search_string)
+
 
 class EurostatResource(DataResource):
 
-    def __init__(self, **kwargs):
+    _since_keyword = 'start_period'
+
+    def __init__(self, _store=None, **kwargs):
         DataResource.__init__(self, **kwargs)
-        self.url = EurostatStore._url + '/data/{0}/?'.format(self.id)
-        self.dsd_url = EurostatStore._url + '/datastructure/ESTAT/DSD_{0}'.format(self.id)
+        base_url = EurostatStore._url if _store is None else _store.url
+        self._base_url = base_url
+        self.url = base_url + '/data/{0}/?'.format(self.id)
+        self.dsd_url = base_url + '/datastructure/ESTAT/DSD_{0}'.format(self.id)
+        # DSD is shared by resources via DSDCache
+        self._dsd_key = (base_url, 'ESTAT', 'DSD_{0}'.format(self.id), 'latest')
 
         self._dsd = None
+        self._dsd_error = None
+        # query which _raw_content corresponds to
+        self._raw_query = None
+
+    @property
+    def dsd_cache(self):
+        """
+        DSDCache to share DSD among resources.
+        Default is ``pyopendata.util.cache.get_default_dsd_cache()``
+        """
+        dsd_cache = getattr(self, '_dsd_cache', None)
+        if dsd_cache is None:
+            dsd_cache = cache.get_default_dsd_cache()
+        return dsd_cache
+
+    @dsd_cache.setter
+    def dsd_cache(self, dsd_cache):
+        self._dsd_cache = dsd_cache
 
     @property
     def dsd(self):
         if self._dsd is None:
-            dsd = self._requests_get(url=self.dsd_url).content
-            self._dsd = sdmx._read_sdmx_dsd(dsd)
+            if self._dsd_error is not None:
+                # avoid retrying unavailable DSD
+                raise self._dsd_error
+            try:
+                self._dsd = self.dsd_cache.get(self._dsd_key, self._load_dsd)
+            except Exception as e:
+                self._dsd_error = e
+                raise
         return self._dsd
 
-    def _read(self, **kwargs):
+    def _load_dsd(self):
+        response = self._requests_get(url=self.dsd_url)
+        self._check_status(response)
+        return sdmx._read_sdmx_dsd(response.content, codelists=self.dsd_cache.codelists)
 
+    def _set_dsd(self, response):
         try:
-            # try to use dsd if available
+            self._dsd = sdmx._read_sdmx_dsd(response.content,
+                                            codelists=self.dsd_cache.codelists)
+        except Exception as e:
+            self._dsd_error = e
+            raise
+        self.dsd_cache.put(self._dsd_key, self._dsd)
+
+    def _build_query(self, key=None, start_period=None, end_period=None,
+                     last_n_observations=None, updated_after=None, dsd=None):
+        """
+        Return the query to retrieve data as a tuple of url and sorted params
+        """
+        if isinstance(key, dict) and dsd is None:
+            # DSD is mandatory to order dimensions
             dsd = self.dsd
+        if dsd is not None:
+            key = sdmx._build_sdmx_key(key, dimensions=dsd.dimensions, codes=dsd.dimension_codes)
+        else:
+            key = sdmx._build_sdmx_key(key)
+
+        if key is None:
+            url = self.url
+        else:
+            url = self._base_url + '/data/{0}/{1}/'.format(self.id, key)
+
+        params = {}
+        for name, value in [('startPeriod', start_period), ('endPeriod', end_period)]:
+            if value is None:
+                continue
+            if hasattr(value, 'strftime'):
+                value = value.strftime('%Y-%m-%d')
+            params[name] = u(str(value))
+        if last_n_observations is not None:
+            params['lastNObservations'] = int(last_n_observations)
+        if updated_after is not None:
+            if hasattr(updated_after, 'strftime'):
+                # naive datetime is regarded as UTC
+                suffix = 'Z' if updated_after.tzinfo is None else '%z'
+                updated_after = updated_after.strftime('%Y-%m-%dT%H:%M:%S' + suffix)
+            params['updatedAfter'] = u(str(updated_after))
+        return url, tuple(sorted(iteritems(params)))
+
+    def _source_queries(self, **kwargs):
+        return [self._build_query(dsd=self._get_dsd(), **kwargs)]
+
+    def _get_dsd(self):
+        try:
+            # try to use dsd if available
+            return self.dsd
         except Exception:
-            dsd = None
+            return None
+
+    def _prefetch(self, **kwargs):
+        if self._dsd is None and self._dsd_error is None:
+            self._dsd = self.dsd_cache.lookup(self._dsd_key)
+
+        def data_prefetches():
+            query = self._build_query(dsd=self._dsd, **kwargs)
+            if self._raw_content is not None and self._raw_query == query:
+                return []
+
+            def callback(response):
+                if response.status_code == 404 and kwargs.get('updated_after') is not None:
+                    # nothing is updated, handled by read
+                    response.close()
+                    return
+                self._check_status(response)
+                self._set_raw_content(response)
+                self._raw_query = query
+            url, params = query
+            return [_Prefetch(url, dict(params), callback)]
 
-        data = self._requests_get().content
-        result = sdmx.read_sdmx(data, dsd=dsd)
+        if self._dsd is not None or self._dsd_error is not None:
+            return data_prefetches()
+
+        def dsd_callback(response):
+            try:
+                self._check_status(response)
+                self._set_dsd(response)
+            except Exception as e:
+                # data can be read without DSD, keep the error to avoid
+                # retrying it with a blocking request
+                self._dsd_error = e
+            if isinstance(kwargs.get('key'), dict):
+                # data query can be built after DSD is retrieved
+                return data_prefetches()
+
+        prefetches = [_Prefetch(self.dsd_url, None, dsd_callback)]
+        if not isinstance(kwargs.get('key'), dict):
+            prefetches.extend(data_prefetches())
+        return prefetches
+
+    def _read_raw(self, **kwargs):
+        query = self._build_query(dsd=self._get_dsd(), **kwargs)
+        if self._raw_content is None or self._raw_query != query:
+            url, params = query
+            response = self._requests_get(url=url, params=dict(params), stream=True)
+            self._check_status(response)
+            self._set_raw_content(response)
+            self._raw_query = query
+        self._raw_content.seek(0)
+        return self._raw_content
+
+    def _read(self, key=None, start_period=None, end_period=None,
+              last_n_observations=None, updated_after=None):
+        """
+        Read data from Eurostat
+
+        Parameters
+        ----------
+        key : str or dict, optional
+            Filter series by dimension codes. str is a SDMX 2.1 REST key such as
+            "A.B+C..D". dict maps dimension ids to a code or list of codes, such as
+            ``{'GEO': ['DE', 'FR'], 'UNIT': 'NR'}``. Key is validated against DSD.
+        start_period, end_period : str, int or datetime-like, optional
+            Filter observations by time period
+        last_n_observations : int, optional
+            Retrieve only the last n observations of each series
+        updated_after : str or datetime-like, optional
+            Retrieve only the series updated after the time.
+            Empty DataFrame is returned if no series is updated
+        """
+        dsd = self._get_dsd()
+        query = self._build_query(key=key, start_period=start_period, end_period=end_period,
+                                  last_n_observations=last_n_observations,
+                                  updated_after=updated_after, dsd=dsd)
+
+        if self._raw_content is not None and self._raw_query == query:
+            self._raw_content.seek(0)
+            result = sdmx.read_sdmx(self._raw_content, dsd=dsd)
+        else:
+            # parse incrementally while downloading
+            url, params = query
+            response = self._requests_get(url=url, params=dict(params), stream=True)
+            if response.status_code == 404 and updated_after is not None:
+                # SDMX REST responds "No Results Found" if nothing is updated
+                response.close()
+                return pd.DataFrame()
+            self._check_status(response)
+            try:
+                result = sdmx.read_sdmx(response.iter_content(self._chunk_size), dsd=dsd)
+            finally:
+                response.close()
         # There is data not sorted by time
         result = result.sort_index()
         return result
 
-
+    def _read_since(self, start, updated_after=None, **kwargs):
+        kwargs['start_period'] = start
+        # only the series updated after the last refresh
+        return self._read(updated_after=updated_after, **kwargs)
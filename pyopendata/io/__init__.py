@@ -1,4 +1,5 @@
 # pylint: disable-msg=E1101,W0613,W0603
 from pyopendata.io.jsdmx import read_jsdmx
 from pyopendata.io.jstat import read_jstat
-from pyopendata.io.sdmx import read_sdmx
\ No newline at end of file
+from pyopendata.io.sdmx import read_sdmx
+from pyopendata.io.util import set_json_backend, get_json_backend
@@ -2,7 +2,6 @@
 
 from __future__ import unicode_literals
 
-import itertools
 import os
 
 import requests
@@ -11,7 +10,7 @@ import numpy as np
 import pandas as pd
 import pandas.compat as compat
 
-from pyopendata.io.util import _read_content
+from pyopendata.io.util import _read_content, _json_loads
 
 
 def read_jsdmx(path_or_buf):
@@ -30,55 +29,85 @@ def read_jsdmx(path_or_buf):
 
     jdata = _read_content(path_or_buf)
 
-    import json
     if isinstance(jdata, dict):
         data = jdata
     else:
-        data = json.loads(jdata, object_pairs_hook=compat.OrderedDict)
+        data = _json_loads(jdata)
 
     structure = data['structure']
-    index = _parse_dimensions(structure['dimensions']['observation'])
-    columns = _parse_dimensions(structure['dimensions']['series'])
+    observation = structure['dimensions']['observation']
+    series = structure['dimensions']['series']
+    index = _parse_dimensions(observation)
+    columns = _parse_dimensions(series)
 
     dataset = data['dataSets']
     if len(dataset) != 1:
         raise ValueError("length of 'dataSets' must be 1")
     dataset = dataset[0]
-    values = _parse_values(dataset, index=index, columns=columns)
+    # sizes are taken from the structure, as MultiIndex of a single
+    # dimension is created as Index without levels
+    values = _parse_values(dataset, index_sizes=[len(d['values']) for d in observation],
+                           columns_sizes=[len(d['values']) for d in series])
 
     df = pd.DataFrame(values, columns=columns, index=index)
     return df
 
 
-def _get_indexer(index):
-    if index.nlevels == 1:
-        return [str(i) for i in compat.range(len(index))]
-    else:
-        it = itertools.product(*[compat.range(len(level)) for level in index.levels])
-        return [':'.join(map(str, i)) for i in it]
+def _get_locations(keys, sizes):
+    """
+    Convert keys formatted as 'i:j:k' to flat locations in the product of dimensions.
+    Locations of the keys which don't fit to the dimensions are -1.
+    """
+    if len(keys) == 0:
+        return np.array([], dtype=np.intp)
 
+    # split only unique keys
+    labels, uniques = pd.factorize(np.array(keys, dtype=object))
+    coords = np.array([k.split(':') for k in uniques], dtype=np.intp)
+    coords = coords.reshape(len(uniques), -1)
+    if coords.shape[1] != len(sizes):
+        raise ValueError('Key must have {0} dimensions'.format(len(sizes)))
 
-def _parse_values(dataset, index, columns):
-    size = len(index)
+    valid = (coords < np.array(sizes, dtype=np.intp)).all(axis=1)
+    locations = np.empty(len(uniques), dtype=np.intp)
+    locations.fill(-1)
+    locations[valid] = np.ravel_multi_index(tuple(coords[valid].T), sizes)
+    return locations[labels]
+
+
+def _parse_values(dataset, index_sizes, columns_sizes):
     series = dataset['series']
 
+    # walk only observations which actually exist
+    s_keys = []
+    o_keys = []
     values = []
-    # for s_key, s_value in compat.iteritems(series):
-    for s_key in _get_indexer(columns):
-        try:
-            observations = series[s_key]['observations']
-            observed = []
-            for o_key in _get_indexer(index):
-                try:
-                    observed.append(observations[o_key][0])
-                except KeyError:
-                    observed.append(np.nan)
-        except KeyError:
-            observed = [np.nan] * size
-
-        values.append(observed)
-
-    return np.transpose(np.array(values))
+    for s_key, s_value in compat.iteritems(series):
+        observations = s_value.get('observations', {})
+        for o_key, o_value in compat.iteritems(observations):
+            s_keys.append(s_key)
+            o_keys.append(o_key)
+            values.append(o_value[0])
+
+    rows = _get_locations(o_keys, index_sizes)
+    cols = _get_locations(s_keys, columns_sizes)
+    mask = (rows >= 0) & (cols >= 0)
+
+    values = np.array(values)
+    shape = (int(np.prod(index_sizes)), int(np.prod(columns_sizes)))
+    if mask.sum() == shape[0] * shape[1]:
+        # no missing values, keep the inferred dtype
+        result = np.empty(shape, dtype=values.dtype)
+    else:
+        if values.dtype.kind in ('i', 'u', 'b', 'f'):
+            dtype = np.float64
+        else:
+            dtype = object
+        result = np.empty(shape, dtype=dtype)
+        result.fill(np.nan)
+    if len(values) > 0:
+        result[rows[mask], cols[mask]] = values[mask]
+    return result
 
 
 def _parse_dimensions(dimensions):
@@ -10,10 +10,10 @@ import numpy as np
 import pandas as pd
 import pandas.compat as compat
 
-from pyopendata.io.util import _read_content
+from pyopendata.io.util import _read_content, _json_loads
 
 
-def read_jstat(path_or_buf, typ='frame', squeeze=True):
+def read_jstat(path_or_buf, typ='frame', squeeze=True, dtype=None, status=False):
     """
     Convert a JSON-Stat string to pandas object
 
@@ -30,6 +30,14 @@ def read_jstat(path_or_buf, typ='frame', squeeze=True):
         When the input has multiple dataset, returns dictionary of results.
         If False, always return a dictionary.
 
+    dtype : str or numpy.dtype, optional
+        dtype to coerce values. If None, values are parsed as float64
+        unless these are not numeric.
+
+    status : bool, default False
+        If True, each result is a tuple of values and status.
+        Status has the same shape as values, and its values are categorical.
+
     Returns
     -------
     results : Series, DataFrame, or dictionaly of Series or DataFrame.
@@ -37,32 +45,24 @@ def read_jstat(path_or_buf, typ='frame', squeeze=True):
 
     jdata = _read_content(path_or_buf)
 
-    import json
     if isinstance(jdata, dict):
         datasets = jdata
     else:
-        datasets = json.loads(jdata, object_pairs_hook=compat.OrderedDict)
+        datasets = _json_loads(jdata)
 
     results = {}
     for dataname, dataset in compat.iteritems(datasets):
         values = dataset['value']               # mandatory
         dimensions = dataset['dimension']       # mandatory
-        # Not supported, as the reis no specific meaning
-        # in current format specification
-        # status = dataset.get('status', None)    # optional
         midx = _parse_dimensions(dimensions)
-        values = _parse_values(values, size=len(midx))
+        values = _parse_values(values, size=len(midx), dtype=dtype)
+
+        result = _reshape(pd.Series(values, index=midx), typ=typ)
+        if status:
+            status_values = _parse_status(dataset.get('status', None), size=len(midx))
+            status_values = _reshape(pd.Series(status_values, index=midx), typ=typ)
+            result = (result, status_values)
 
-        result = pd.Series(values, index=midx)
-        if typ == 'frame':
-            if result.index.nlevels > 1:
-                result = result.unstack()
-            else:
-                result = result.to_frame()
-        elif typ == 'series':
-            pass
-        else:
-            raise ValueError("'typ' must be either 'frame' or 'series'")
         if len(datasets) == 1 and squeeze:
             return result
 
@@ -70,18 +70,76 @@ def read_jstat(path_or_buf, typ='frame', squeeze=True):
     return results
 
 
-def _parse_values(values, size):
+def _reshape(result, typ):
+    if typ == 'frame':
+        if result.index.nlevels > 1:
+            result = result.unstack()
+        else:
+            result = result.to_frame()
+    elif typ == 'series':
+        pass
+    else:
+        raise ValueError("'typ' must be either 'frame' or 'series'")
+    return result
+
+
+def _scatter(values, size, dtype=None):
+    """
+    Scatter dict which maps location to value to an array
+    """
+    locations = np.fromiter((int(k) for k in compat.iterkeys(values)),
+                            dtype=np.intp, count=len(values))
+    data = list(compat.itervalues(values))
+
+    if dtype is None:
+        try:
+            data = np.array(data, dtype=np.float64)
+        except (TypeError, ValueError):
+            data = np.array(data, dtype=object)
+    else:
+        data = np.array(data, dtype=dtype)
+
+    result = np.empty(size, dtype=data.dtype)
+    if result.dtype.kind in ('f', 'c', 'O'):
+        result.fill(np.nan)
+    elif len(values) < size:
+        raise ValueError("dtype {0} cannot hold missing values".format(result.dtype))
+    result[locations] = data
+    return result
+
+
+def _parse_values(values, size, dtype=None):
     if isinstance(values, list):
-        return values
+        if dtype is None:
+            return values
+        return np.array(values, dtype=dtype)
     elif isinstance(values, dict):
-        result = [np.nan] * size
-        for k, v in compat.iteritems(values):
-            result[int(k)] = v
-        return result
+        return _scatter(values, size, dtype=dtype)
     else:
         raise ValueError("'values' must be list or dict")
 
 
+def _parse_status(status, size):
+    if status is None:
+        result = np.empty(size, dtype=object)
+        result.fill(np.nan)
+    elif isinstance(status, compat.string_types):
+        # applies to all values
+        result = np.empty(size, dtype=object)
+        result.fill(status)
+    elif isinstance(status, list):
+        if len(status) == 1:
+            result = np.empty(size, dtype=object)
+            result.fill(status[0])
+        else:
+            result = np.array(status, dtype=object)
+    elif isinstance(status, dict):
+        result = _scatter(status, size, dtype=object)
+    else:
+        raise ValueError("'status' must be str, list or dict")
+    return pd.Categorical(result)
+
+
 def _parse_dimensions(dimensions):
     names = dimensions['id']
     sizes = dimensions['size']
@@ -12,7 +12,7 @@ import numpy as np
 import pandas as pd
 import pandas.compat as compat
 
-from pyopendata.io.util import _read_content
+from pyopendata.io.util import _read_content, _read_stream
 
 
 _STRUCTURE = '{http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure}'
@@ -29,7 +29,9 @@ _VALUE = _GENERIC + 'Value'
 _OBSDIMENSION = _GENERIC + 'ObsDimension'
 _OBSVALUE = _GENERIC + 'ObsValue'
 _CODE = _STRUCTURE + 'Code'
+_DIMENSION = _STRUCTURE + 'Dimension'
 _TIMEDIMENSION = _STRUCTURE + 'TimeDimension'
+_ENUMERATION_REF = '{0}LocalRepresentation/{0}Enumeration/Ref'.format(_STRUCTURE)
 
 
 def read_sdmx(path_or_buf, dtype='float64', dsd=None):
@@ -38,8 +40,10 @@ def read_sdmx(path_or_buf, dtype='float64', dsd=None):
 
     Parameters
     ----------
-    filepath_or_buffer : a valid SDMX-XML string or file-like
+    filepath_or_buffer : a valid SDMX-XML string, file-like or iterable of bytes
         https://webgate.ec.europa.eu/fpfis/mwikis/sdmx/index.php/Main_Page
+        Iterable of bytes chunks (such as ``requests.Response.iter_content``)
+        is parsed incrementally as chunks arrive.
     dtype : str
         dtype to coerce values
     dsd : dict
@@ -50,91 +54,142 @@ def read_sdmx(path_or_buf, dtype='float64', dsd=None):
     results : Series, DataFrame, or dictionaly of Series or DataFrame.
     """
 
-    xdata = _read_content(path_or_buf)
+    source = _read_stream(path_or_buf)
 
     import xml.etree.ElementTree as ET
-    root = ET.fromstring(xdata)
-
-    structure = _get_child(root, _MESSAGE + 'Structure')
-    idx_name = structure.get('dimensionAtObservation')
-    dataset = _get_child(root, _DATASET)
 
-    keys = []
-    obss = []
-    for series in dataset.iter(_SERIES):
-        key = _parse_series_key(series)
-        obs = _parse_observations(series.iter(_OBSERVATION))
-        keys.append(key)
-        obss.append(obs)
+    idx_name = None
+    dataset = None
+
+    # decoded columns, each observation is stored in a single pass
+    # - names / codes: series key names and codes per name
+    # - times / values / positions: observation key, value and series location
+    names = None
+    codes = None
+    times = []
+    values = []
+    positions = []
+    nseries = 0
+    try:
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if element.tag == _DATASET:
+                    dataset = element
+                continue
+
+            if element.tag == _SERIES:
+                key = _parse_series_key(element)
+                if names is None:
+                    names = [k for k, _ in key]
+                    codes = [[] for _ in names]
+                _append_series_key(key, names, codes)
+
+                nobs = len(times)
+                for obs_key, obs_value in _parse_observations(element):
+                    times.append(obs_key)
+                    values.append(obs_value)
+                positions.extend([nseries] * (len(times) - nobs))
+                nseries += 1
+
+                # release parsed series, memory only holds a single series
+                element.clear()
+                if dataset is not None:
+                    try:
+                        dataset.remove(element)
+                    except ValueError:
+                        pass
+            elif element.tag == _MESSAGE + 'Structure':
+                idx_name = element.get('dimensionAtObservation')
+    finally:
+        if source is not path_or_buf:
+            source.close()
+
+    if nseries < 1:
+        raise ValueError("Data contains no 'Series'")
 
-    mcols = _construct_index(keys, dsd=dsd)
-    mseries = _construct_series(obss, name=idx_name, dsd=dsd)
+    mcols = _construct_index(names, codes, dsd=dsd)
+    idx, rows = _construct_time_index(times, nseries, name=idx_name, dsd=dsd)
 
-    df = pd.DataFrame(mseries, dtype=dtype)
-    df = df.T
-    df.columns = mcols
+    values = np.array(values, dtype=dtype)
+    data = np.empty((len(idx), nseries), dtype=values.dtype)
+    data.fill(np.nan)
+    data[rows, np.array(positions, dtype=np.intp)] = values
 
+    df = pd.DataFrame(data, index=idx, columns=mcols)
     return df
 
 
-def _construct_series(values, name, dsd=None):
-
+def _construct_time_index(times, nseries, name, dsd=None):
+    """
+    Construct index from observation keys, and return the index and
+    row locations of each observation
+    """
     # ts defines attributes to be handled as times
-    times = dsd.ts if dsd is not None else []
+    ts = dsd.ts if dsd is not None else []
+
+    rows, uniques = pd.factorize(np.array(times, dtype=object))
+    nuniques = len(uniques)
+    if len(rows) != nuniques * nseries or \
+       not (rows == np.tile(np.arange(nuniques), nseries)).all():
+        # series have different observation keys, sort keys to be aligned
+        order = np.argsort(uniques, kind='mergesort')
+        uniques = uniques[order]
+        mapper = np.empty(nuniques, dtype=np.intp)
+        mapper[order] = np.arange(nuniques)
+        rows = mapper[rows]
+
+    if name in ts:
+        idx = pd.DatetimeIndex(uniques, name=name)
+    else:
+        idx = pd.Index(uniques, name=name)
+    return idx, rows
 
-    if len(values) < 1:
-        raise ValueError("Data contains no 'Series'")
-    results = []
-    for value in values:
 
-        if name in times:
-            idx = pd.DatetimeIndex([v[0] for v in value], name=name)
-        else:
-            idx = pd.Index([v[0] for v in value], name=name)
+def _construct_index(names, codes, dsd=None):
 
-        results.append(pd.Series([v[1] for v in value], index=idx))
-    return results
+    # code defines a mapping to key's internal code to its representation
+    mappers = dsd.codes if dsd is not None else {}
 
+    arrays = []
+    for name, values in zip(names, codes):
+        # apply DSD
+        mapper = mappers.get(name)
+        if mapper is not None:
+            values = [mapper.get(v, v) for v in values]
+        arrays.append(values)
 
-def _construct_index(keys, dsd=None):
+    midx = pd.MultiIndex.from_arrays(arrays, names=names)
+    return midx
 
-    # code defines a mapping to key's internal code to its representation
-    codes = dsd.codes if dsd is not None else {}
 
-    if len(keys) < 1:
-        raise ValueError("Data contains no 'Series'")
-    names = [t[0] for t in keys[0]]
-    values = {}
-    # initialize
-    for key in keys:
-        for name, value in key:
-            # apply DSD
-            try:
-                value = codes[name][value]
-            except KeyError:
-                pass
-
-            try:
-                values[name].append(value)
-            except KeyError:
-                values[name] = [value]
-
-    midx = pd.MultiIndex.from_arrays([values[name] for name in names], names=names)
-    return midx
+def _append_series_key(key, names, codes):
+    if len(key) == len(names) and all(k == n for (k, _), n in zip(key, names)):
+        for (_, value), values in zip(key, codes):
+            values.append(value)
+    else:
+        # key is not ordered as the same as the first series
+        key = dict(key)
+        for name, values in zip(names, codes):
+            values.append(key.get(name))
 
 
-def _parse_observations(observations):
-    results = []
-    for observation in observations:
-        obsdimension = _get_child(observation, _OBSDIMENSION)
-        obsvalue = _get_child(observation, _OBSVALUE)
-        results.append((obsdimension.get('value'), obsvalue.get('value')))
-    # return list of key/value tuple, eg: [(key, value), ...]
-    return results
+def _parse_observations(series):
+    # yield key/value tuple, eg: (key, value)
+    for observation in series.iterfind(_OBSERVATION):
+        obsdimension = observation.find(_OBSDIMENSION)
+        obsvalue = observation.find(_OBSVALUE)
+        if obsdimension is None or obsvalue is None:
+            raise ValueError("Element {0} must contain {1} and {2}".format(observation.tag,
+                                                                          _OBSDIMENSION,
+                                                                          _OBSVALUE))
+        yield obsdimension.get('value'), obsvalue.get('value')
 
 
 def _parse_series_key(series):
-    serieskey = _get_child(series, _SERIES_KEY)
+    # SeriesKey precedes observations, avoid scanning them
+    serieskey = series.find(_SERIES_KEY)
+    if serieskey is None:
+        raise ValueError("Element {0} contains no {1}".format(series.tag, _SERIES_KEY))
     key_values = serieskey.iter(_VALUE)
     keys = [(key.get('id'), key.get('value')) for key in key_values]
     # return list of key/value tuple, eg: [(key, value), ...]
@@ -142,13 +197,13 @@ def _parse_series_key(series):
 
 
 def _get_child(element, key):
-    elements = list(element.iter(key))
-    if len(elements) == 1:
-        return elements[0]
-    elif len(elements) == 0:
+    # direct children only, not the whole subtree
+    elements = element.findall(key)
+    if len(elements) == 0:
         raise ValueError("Element {0} contains no {1}".format(element.tag, key))
-    else:
+    elif len(elements) > 1:
         raise ValueError("Element {0} contains multiple {1}".format(element.tag, key))
+    return elements[0]
 
 
 _NAME_EN = ".//{0}Name[@{1}lang='en']".format(_COMMON, _XML)
@@ -159,11 +214,53 @@ def _get_english_name(element):
     return name
 
 
+def _iter_sdmx_dataflows(path_or_buf):
+    """
+    Parse SDMX-XML dataflows incrementally
+
+    Parameters
+    ----------
+    filepath_or_buffer : a valid SDMX-XML string, file-like or iterable of bytes
 
-SDMXCode = collections.namedtuple('SDMXCode', ['codes', 'ts'])
+    Returns
+    -------
+    generator which yields tuples of id, English name, agency and version
+    """
+    source = _read_stream(path_or_buf)
 
+    import xml.etree.ElementTree as ET
 
-def _read_sdmx_dsd(path_or_buf):
+    dataflows = None
+    try:
+        for event, element in ET.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if element.tag == _STRUCTURE + 'Dataflows':
+                    dataflows = element
+                continue
+            if element.tag != _STRUCTURE + 'Dataflow':
+                continue
+
+            name = element.find(_NAME_EN)
+            yield (element.get('id'), None if name is None else name.text,
+                   element.get('agencyID'), element.get('version'))
+
+            # release parsed dataflow
+            element.clear()
+            if dataflows is not None:
+                try:
+                    dataflows.remove(element)
+                except ValueError:
+                    pass
+    finally:
+        if source is not path_or_buf:
+            source.close()
+
+
+SDMXCode = collections.namedtuple('SDMXCode', ['codes', 'ts', 'dimensions',
+                                               'dimension_codes'])
+
+
+def _read_sdmx_dsd(path_or_buf, codelists=None):
     """
     Convert a SDMX-XML DSD string to mapping dictionary
 
@@ -171,6 +268,9 @@ def _read_sdmx_dsd(path_or_buf):
     ----------
     filepath_or_buffer : a valid SDMX-XML DSD string or file-like
         https://webgate.ec.europa.eu/fpfis/mwikis/sdmx/index.php/Main_Page
+    codelists : dict, optional
+        Codelists keyed by (agency, id, version). Identical codelist is
+        shared with other DSDs, and new codelist is added to it.
 
     Returns
     -------
@@ -188,6 +288,8 @@ def _read_sdmx_dsd(path_or_buf):
     datastructures = _get_child(structure, _STRUCTURE + 'DataStructures')
 
     code_results = {}
+    # codelists by id, referred from dimensions
+    code_refs = {}
     for codelist in codes:
         # codelist_id = codelist.get('id')
         codelist_name = _get_english_name(codelist)
@@ -196,13 +298,97 @@ def _read_sdmx_dsd(path_or_buf):
             code_id = code.get('id')
             name = _get_english_name(code)
             mapper[code_id] = name
+        if codelists is not None:
+            key = (codelist.get('agencyID'), codelist.get('id'), codelist.get('version'))
+            cached = codelists.get(key)
+            if cached == mapper:
+                mapper = cached
+            else:
+                codelists[key] = mapper
         # codeobj = SDMXCode(id=codelist_id, name=codelist_name, mapper=mapper)
         # code_results[codelist_id] = codeobj
         code_results[codelist_name] = mapper
+        code_refs[codelist.get('id')] = mapper
 
     times = list(datastructures.iter(_TIMEDIMENSION))
     times = [t.get('id') for t in times]
 
-    result = SDMXCode(codes=code_results, ts=times)
+    # series key dimensions ordered by position
+    dimensions = list(datastructures.iter(_DIMENSION))
+    order = sorted(range(len(dimensions)),
+                   key=lambda i: (int(dimensions[i].get('position', i + 1)), i))
+    dimensions = [dimensions[i] for i in order]
+
+    # codelist of each dimension, such as GEO -> CL_GEO
+    dimension_codes = {}
+    for dimension in dimensions:
+        ref = dimension.find(_ENUMERATION_REF)
+        if ref is not None and ref.get('id') in code_refs:
+            dimension_codes[dimension.get('id')] = code_refs[ref.get('id')]
+    dimensions = [dimension.get('id') for dimension in dimensions]
+
+    result = SDMXCode(codes=code_results, ts=times, dimensions=dimensions,
+                      dimension_codes=dimension_codes)
     return result
 
+
+def _build_sdmx_key(key, dimensions=None, codes=None):
+    """
+    Build SDMX 2.1 REST key, such as "A.B+C..D"
+
+    Parameters
+    ----------
+    key : str, list or dict
+        If str, it is used as it is.
+        If list, each element is a code or list of codes of the dimension at the position.
+        If dict, keys are dimension ids and values are a code or list of codes.
+        Dimensions not included in the dict or specified by empty list are not filtered.
+    dimensions : list of str, optional
+        Dimension ids ordered by position. Required if key is dict
+    codes : dict, optional
+        Mapping from dimension id to available codes, used to validate key
+
+    Returns
+    -------
+    key : str or None
+    """
+    if key is None:
+        return None
+
+    if isinstance(key, dict):
+        if dimensions is None:
+            raise ValueError('Dimensions must be known to build key from dict')
+        unknown = [k for k in key if k not in dimensions]
+        if len(unknown) > 0:
+            msg = 'Unknown dimensions: {0}, available dimensions are {1}'
+            raise ValueError(msg.format(', '.join(unknown), ', '.join(dimensions)))
+        filters = []
+        for dimension in dimensions:
+            values = key.get(dimension, [])
+            if isinstance(values, compat.string_types):
+                values = [values]
+            filters.append(list(values))
+    elif isinstance(key, compat.string_types):
+        filters = [[v for v in part.split('+') if v] for part in key.split('.')]
+        if dimensions is not None and len(filters) != len(dimensions):
+            msg = 'Key {0} must have {1} dimensions: {2}'
+            raise ValueError(msg.format(key, len(dimensions), ', '.join(dimensions)))
+    elif isinstance(key, (list, tuple)):
+        filters = [[v] if isinstance(v, compat.string_types) else list(v) for v in key]
+        if dimensions is not None and len(filters) != len(dimensions):
+            msg = 'Key must have {0} dimensions: {1}'
+            raise ValueError(msg.format(len(dimensions), ', '.join(dimensions)))
+    else:
+        raise ValueError('key must be str, list or dict: {0}'.format(key))
+
+    if dimensions is not None and codes is not None:
+        for dimension, values in zip(dimensions, filters):
+            mapper = codes.get(dimension)
+            if mapper is None:
+                continue
+            invalid = [v for v in values if v not in mapper]
+            if len(invalid) > 0:
+                msg = 'Invalid codes for dimension {0}: {1}'
+                raise ValueError(msg.format(dimension, ', '.join(invalid)))
+    return '.'.join('+'.join(values) for values in filters)
+
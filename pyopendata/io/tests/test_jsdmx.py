@@ -8,6 +8,7 @@ from pandas.compat import range
 import pandas.util.testing as tm
 
 from pyopendata.io import read_jsdmx
+from pyopendata.io.jsdmx import _parse_values
 
 
 class TestSDMX(tm.TestCase):
@@ -67,6 +68,35 @@ class TestSDMX(tm.TestCase):
         expected = pd.DataFrame(values, index=exp_idx, columns=exp_col)
         tm.assert_frame_equal(result, expected)
 
+    def test_sparse(self):
+        jdata = """
+        {"structure": {"dimensions": {
+            "series": [{"name": "Country", "values": [{"name": "Japan"}, {"name": "Korea"}]},
+                       {"name": "Variable", "values": [{"name": "A"}, {"name": "B"}]}],
+            "observation": [{"name": "Year", "role": "time",
+                             "values": [{"name": "2010"}, {"name": "2011"}, {"name": "2012"}]}]}},
+         "dataSets": [{"series": {"0:1": {"observations": {"0": [1.5], "2": [3.5]}},
+                                  "1:0": {"observations": {"1": [2.5], "5": [9.9]}}}}]}
+        """
+        result = read_jsdmx(jdata)
+
+        exp_col = pd.MultiIndex.from_product([['Japan', 'Korea'], ['A', 'B']],
+                                             names=['Country', 'Variable'])
+        exp_idx = pd.DatetimeIndex(['2010', '2011', '2012'], name='Year')
+        values = np.array([[np.nan, 1.5, np.nan, np.nan],
+                           [np.nan, np.nan, 2.5, np.nan],
+                           [np.nan, 3.5, np.nan, np.nan]])
+        expected = pd.DataFrame(values, index=exp_idx, columns=exp_col)
+        tm.assert_frame_equal(result, expected)
+
+        # sizes are taken from the structure, not from index levels
+        dataset = {'series': {'0:1': {'observations': {'0': [1.5], '2': [3.5]}}}}
+        result = _parse_values(dataset, index_sizes=[3], columns_sizes=[2, 2])
+        expected = np.array([[np.nan, 1.5, np.nan, np.nan],
+                             [np.nan, np.nan, np.nan, np.nan],
+                             [np.nan, 3.5, np.nan, np.nan]])
+        tm.assert_numpy_array_equal(result, expected)
+
 
 if __name__ == '__main__':
     import nose
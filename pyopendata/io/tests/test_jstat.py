@@ -117,6 +117,26 @@ class TestJStat(tm.TestCase):
                                 index=exp_idx, columns=exp_col)
         tm.assert_frame_equal(result, expected)
 
+    def test_status(self):
+        results = read_jstat(os.path.join(self.dirpath, 'jstat', 'oecd-canada.json'),
+                             status=True)
+        values, status = results['oecd']
+        tm.assert_frame_equal(values, read_jstat(os.path.join(self.dirpath, 'jstat',
+                                                              'oecd-canada.json'))['oecd'])
+        self.assertEqual(values.shape, status.shape)
+        self.assertEqual(status.loc[('Unemployment rate', 'Australia'), '2014'], 'e')
+        self.assertTrue(pd.isnull(status.loc[('Unemployment rate', 'Australia'), '2003']))
+
+        # single status applies to all values
+        values, status = results['canada']
+        self.assertEqual(values.shape, status.shape)
+        self.assertTrue((status == 'a').all().all())
+
+    def test_dtype(self):
+        result = read_jstat(os.path.join(self.dirpath, 'jstat', 'hierarchy.json'),
+                            typ='series', dtype='float32')
+        self.assertEqual(result.dtype, np.float32)
+
     def test_us_gsp(self):
         result = read_jstat(os.path.join(self.dirpath, 'jstat', 'us-gsp.json'))
         result = result.head(n=10)
@@ -7,7 +7,10 @@ import pandas as pd
 from pandas.compat import range
 import pandas.util.testing as tm
 
-from pyopendata.io.sdmx import read_sdmx, _read_sdmx_dsd
+from pyopendata.io.sdmx import (read_sdmx, _read_sdmx_dsd, _build_sdmx_key,
+                                _iter_sdmx_dataflows, _construct_time_index,
+                                _append_series_key)
+from pyopendata.util import testing
 
 
 class TestSDMX(tm.TestCase):
@@ -38,6 +41,140 @@ class TestSDMX(tm.TestCase):
         expected = pd.DataFrame(values, index=exp_idx, columns=exp_col)
         tm.assert_frame_equal(df, expected)
 
+    def test_read_chunks(self):
+        dsd = _read_sdmx_dsd(os.path.join(self.dirpath, 'sdmx', 'DSD_cdh_e_fos.xml'))
+        path = os.path.join(self.dirpath, 'sdmx', 'cdh_e_fos.xml')
+        expected = read_sdmx(path, dsd=dsd)
+
+        with open(path, 'rb') as fh:
+            content = fh.read()
+
+        # emulate requests.Response.iter_content
+        chunks = (content[i:i + 100] for i in range(0, len(content), 100))
+        result = read_sdmx(chunks, dsd=dsd)
+        tm.assert_frame_equal(result, expected)
+
+        result = read_sdmx(content, dsd=dsd)
+        tm.assert_frame_equal(result, expected)
+
+    def test_construct_time_index(self):
+        # series have the same observation keys, kept in the order of appearance
+        idx, rows = _construct_time_index(['2002', '2001', '2002', '2001'], 2, name='T')
+        tm.assert_index_equal(idx, pd.Index(['2002', '2001'], name='T'))
+        self.assertEqual(list(rows), [0, 1, 0, 1])
+
+        # different observation keys are sorted and realigned
+        idx, rows = _construct_time_index(['2001', '2002', '2003', '2000', '2002'], 2,
+                                          name='T')
+        tm.assert_index_equal(idx, pd.Index(['2000', '2001', '2002', '2003'], name='T'))
+        self.assertEqual(list(rows), [1, 2, 3, 0, 2])
+
+    def test_append_series_key(self):
+        names = ['D0', 'D1']
+        codes = [[], []]
+        _append_series_key([('D0', 'A'), ('D1', 'X')], names, codes)
+        # different order from the first series
+        _append_series_key([('D1', 'Y'), ('D0', 'B')], names, codes)
+        # missing component
+        _append_series_key([('D0', 'C')], names, codes)
+        self.assertEqual(codes, [['A', 'B', 'C'], ['X', 'Y', None]])
+
+    def test_unaligned_series(self):
+        def series(key, observations):
+            values = ''.join('<generic:Value id="{0}" value="{1}"/>'.format(k, v)
+                             for k, v in key)
+            obs = ''.join('<generic:Obs><generic:ObsDimension value="{0}"/>'
+                          '<generic:ObsValue value="{1}"/></generic:Obs>'.format(t, v)
+                          for t, v in observations)
+            return ('<generic:Series><generic:SeriesKey>{0}</generic:SeriesKey>'
+                    '{1}</generic:Series>'.format(values, obs))
+
+        content = ('<?xml version="1.0" encoding="UTF-8"?><message:GenericData {0}>'
+                   '<message:Header><message:Structure structureID="DSD" '
+                   'dimensionAtObservation="TIME_PERIOD"></message:Structure></message:Header>'
+                   '<message:DataSet>{1}</message:DataSet>'
+                   '</message:GenericData>').format(testing._SDMX_NS, ''.join([
+                       series([('D0', 'A'), ('D1', 'X')], [('2001', 1), ('2002', 2)]),
+                       series([('D1', 'Y'), ('D0', 'B')], [('2003', 3), ('2000', 4)]),
+                       series([('D0', 'C')], [('2002', 5)])]))
+        result = read_sdmx(content.encode('utf-8'))
+
+        columns = pd.MultiIndex.from_arrays([['A', 'B', 'C'], ['X', 'Y', None]],
+                                            names=['D0', 'D1'])
+        index = pd.Index(['2000', '2001', '2002', '2003'], name='TIME_PERIOD')
+        values = np.array([[np.nan, 4, np.nan], [1, np.nan, np.nan],
+                           [2, np.nan, 5], [np.nan, 3, np.nan]])
+        tm.assert_frame_equal(result, pd.DataFrame(values, index=index, columns=columns))
+
+        # shuffled keys and observations result in the same frame,
+        # levels are ordered as the key of the first series
+        dsd = _read_sdmx_dsd(testing.make_sdmx_dsd((4, 3, 2)))
+        expected = read_sdmx(testing.make_sdmx((4, 3, 2), periods=5), dsd=dsd)
+        result = read_sdmx(testing.make_sdmx((4, 3, 2), periods=5, shuffle=True), dsd=dsd)
+        result = result.reorder_levels(['D0', 'D1', 'D2'], axis=1)
+        tm.assert_frame_equal(result, expected.sort_index())
+
+    def test_dsd_dimensions(self):
+        dsd = _read_sdmx_dsd(os.path.join(self.dirpath, 'sdmx', 'DSD_cdh_e_fos.xml'))
+        self.assertEqual(dsd.dimensions, ['FREQ', 'Y_GRAD', 'UNIT', 'FOS07', 'GEO'])
+        self.assertEqual(dsd.ts, ['TIME_PERIOD'])
+
+    def test_dataflows(self):
+        dataflows = ''.join('<structure:Dataflow id="ds_{0}" agencyID="ESTAT" version="1.0">'
+                            '<common:Name xml:lang="de">Datensatz {0}</common:Name>'
+                            '<common:Name xml:lang="en">Dataset {0}</common:Name>'
+                            '</structure:Dataflow>'.format(i) for i in range(3))
+        content = ('<?xml version="1.0" encoding="UTF-8"?><message:Structure {0}>'
+                   '<message:Structures><structure:Dataflows>{1}</structure:Dataflows>'
+                   '</message:Structures></message:Structure>').format(testing._SDMX_NS,
+                                                                       dataflows)
+        content = content.encode('utf-8')
+        expected = [('ds_0', 'Dataset 0', 'ESTAT', '1.0'),
+                    ('ds_1', 'Dataset 1', 'ESTAT', '1.0'),
+                    ('ds_2', 'Dataset 2', 'ESTAT', '1.0')]
+        self.assertEqual(list(_iter_sdmx_dataflows(content)), expected)
+
+        chunks = (content[i:i + 50] for i in range(0, len(content), 50))
+        self.assertEqual(list(_iter_sdmx_dataflows(chunks)), expected)
+
+    def test_build_key(self):
+        dsd = _read_sdmx_dsd(os.path.join(self.dirpath, 'sdmx', 'DSD_cdh_e_fos.xml'))
+        dims, codes = dsd.dimensions, dsd.dimension_codes
+
+        self.assertTrue(_build_sdmx_key(None, dims, codes) is None)
+        self.assertEqual(_build_sdmx_key({'GEO': ['NO', 'PL'], 'FREQ': 'A'}, dims, codes),
+                         'A....NO+PL')
+        self.assertEqual(_build_sdmx_key({}, dims, codes), '....')
+        self.assertEqual(_build_sdmx_key('A....NO+PL', dims, codes), 'A....NO+PL')
+        # not validated without DSD
+        self.assertEqual(_build_sdmx_key('X.Y'), 'X.Y')
+
+        with tm.assertRaises(ValueError):
+            _build_sdmx_key({'XXX': 'A'}, dims, codes)
+        with tm.assertRaises(ValueError):
+            _build_sdmx_key({'GEO': 'XXX'}, dims, codes)
+        with tm.assertRaises(ValueError):
+            _build_sdmx_key('A.NO', dims, codes)
+        with tm.assertRaises(ValueError):
+            _build_sdmx_key({'GEO': 'NO'})
+
+    def test_build_key_codelist_name(self):
+        # codelist name differs from the dimension id
+        content = testing.make_sdmx_dsd(dimensions=(3, 2))
+        content = content.replace('lang="en">D1</common:Name>',
+                                  'lang="en">Second dimension</common:Name>')
+        dsd = _read_sdmx_dsd(content.encode('utf-8'))
+        self.assertEqual(sorted(dsd.codes), ['D0', 'Second dimension'])
+        self.assertEqual(sorted(dsd.dimension_codes), ['D0', 'D1'])
+        self.assertEqual(sorted(dsd.dimension_codes['D1']), ['C0', 'C1'])
+
+        dims, codes = dsd.dimensions, dsd.dimension_codes
+        self.assertEqual(_build_sdmx_key({'D1': 'C1'}, dims, codes), '.C1')
+        with tm.assertRaises(ValueError):
+            _build_sdmx_key({'D1': 'C2'}, dims, codes)
+        with tm.assertRaises(ValueError):
+            _build_sdmx_key('C0.C2', dims, codes)
+
 
 if __name__ == '__main__':
     import nose
@@ -0,0 +1,141 @@
+# pylint: disable-msg=E1101,W0613,W0603
+# coding: UTF-8
+
+from __future__ import unicode_literals
+
+import gzip
+import io
+import os
+
+import pandas.util.testing as tm
+
+from pyopendata.io import (read_sdmx, read_jsdmx, read_jstat,
+                           set_json_backend, get_json_backend)
+from pyopendata.io.sdmx import _read_sdmx_dsd
+from pyopendata.io.util import _json_loads, _JSON_BACKENDS, _sniff_format
+from pyopendata.util import testing
+
+
+class TestJSONBackend(tm.TestCase):
+
+    def setUp(self):
+        self.dirpath = tm.get_data_path()
+        self.backend = get_json_backend()
+
+    def tearDown(self):
+        set_json_backend(self.backend)
+
+    def test_default(self):
+        self.assertTrue(get_json_backend() in _JSON_BACKENDS)
+
+    def test_backends(self):
+        jstat_path = os.path.join(self.dirpath, 'jstat', 'oecd-canada.json')
+        jsdmx_path = os.path.join(self.dirpath, 'jsdmx', 'tourism.json')
+
+        set_json_backend('json')
+        self.assertEqual(get_json_backend(), 'json')
+        self.assertEqual(_json_loads(b'{"a": [1, 2]}'), {'a': [1, 2]})
+        jstat_expected = read_jstat(jstat_path)
+        jsdmx_expected = read_jsdmx(jsdmx_path)
+
+        for backend in _JSON_BACKENDS:
+            try:
+                set_json_backend(backend)
+            except ImportError:
+                continue
+            self.assertEqual(_json_loads(b'{"a": [1, 2]}'), {'a': [1, 2]})
+            self.assertEqual(_json_loads('{"a": [1, 2]}'), {'a': [1, 2]})
+
+            result = read_jstat(jstat_path)
+            for key in jstat_expected:
+                tm.assert_frame_equal(result[key], jstat_expected[key])
+            tm.assert_frame_equal(read_jsdmx(jsdmx_path), jsdmx_expected)
+
+    def test_invalid(self):
+        with tm.assertRaises(ValueError):
+            set_json_backend('xxx')
+
+
+class TestSyntheticDocuments(tm.TestCase):
+
+    def test_sdmx(self):
+        dsd = _read_sdmx_dsd(testing.make_sdmx_dsd((4, 3, 2)))
+        self.assertEqual(dsd.ts, ['TIME_PERIOD'])
+
+        result = read_sdmx(testing.make_sdmx((4, 3, 2), periods=5), dsd=dsd)
+        self.assertEqual(result.shape, (5, 24))
+        self.assertEqual(result.columns.names, ['D0', 'D1', 'D2'])
+        self.assertEqual(result.columns[0], ('D0 code 0', 'D1 code 0', 'D2 code 0'))
+        self.assertFalse(result.isnull().any().any())
+
+        result = read_sdmx(testing.make_sdmx((4, 3, 2), periods=5, sparsity=0.5), dsd=dsd)
+        self.assertTrue(result.shape[1] < 24)
+        self.assertTrue(result.isnull().any().any())
+
+    def test_jsdmx(self):
+        result = read_jsdmx(testing.make_jsdmx((4, 3, 2), periods=5))
+        self.assertEqual(result.shape, (5, 24))
+        self.assertFalse(result.isnull().any().any())
+
+        result = read_jsdmx(testing.make_jsdmx((4, 3, 2), periods=5, sparsity=0.5))
+        self.assertEqual(result.shape, (5, 24))
+        self.assertTrue(result.isnull().any().any())
+
+    def test_jstat(self):
+        result = read_jstat(testing.make_jstat((4, 3, 5)))
+        self.assertEqual(result.shape, (12, 5))
+        self.assertFalse(result.isnull().any().any())
+
+        values, status = read_jstat(testing.make_jstat((4, 3, 5), sparsity=0.5, status=True),
+                                    status=True)
+        self.assertEqual(values.shape, (12, 5))
+        self.assertEqual(status.shape, (12, 5))
+        self.assertTrue(values.isnull().any().any())
+
+
+class TestSniffFormat(tm.TestCase):
+
+    def test_text(self):
+        result = _sniff_format(b'a,b,c\n1,2,3\n4,5,6\n')
+        self.assertEqual(result, ('CSV', None, 'utf-8', ','))
+
+        result = _sniff_format(b'a\tb,c\tc\n1\t2,0\t3\n4\t5,0\t6')
+        self.assertEqual(result.delimiter, '\t')
+
+        result = _sniff_format('\ufeffa;b\n1;2\n'.encode('utf-8'))
+        self.assertEqual(result, ('CSV', None, 'utf-8-sig', ';'))
+
+        result = _sniff_format('名前,値\n東京,1\n'.encode('cp932'), encodings=('utf-8', 'cp932'))
+        self.assertEqual(result, ('CSV', None, 'cp932', ','))
+
+        # latin-1 text is not taken as multibyte encoding
+        content = 'région,département,année\n1,2,3\n'.encode('latin-1')
+        result = _sniff_format(content)
+        self.assertEqual(result, ('CSV', None, 'cp1252', ','))
+        self.assertEqual(content.decode(result.encoding), 'région,département,année\n1,2,3\n')
+        result = _sniff_format(b'a,b\n\x81,\xe9\n')
+        self.assertEqual(result, ('CSV', None, 'latin-1', ','))
+
+        # multibyte character truncated at the end
+        result = _sniff_format('名前,値\n東京,1\n'.encode('utf-8')[:-3])
+        self.assertEqual(result, ('CSV', None, 'utf-8', ','))
+
+        self.assertEqual(_sniff_format(b'  [{"a": 1}]').format, 'JSON')
+        self.assertEqual(_sniff_format(b'<!DOCTYPE html><html></html>').format, 'HTML')
+        self.assertEqual(_sniff_format(b'<?xml version="1.0"?><a/>').format, 'XML')
+        self.assertEqual(_sniff_format(b'single column\n').format, None)
+
+    def test_binary(self):
+        out = io.BytesIO()
+        with gzip.GzipFile(fileobj=out, mode='wb') as fh:
+            fh.write(b'a,b\n1,2\n')
+        self.assertEqual(_sniff_format(out.getvalue()), ('CSV', 'gzip', 'utf-8', ','))
+
+        self.assertEqual(_sniff_format(b'PK\x03\x04\x14\x00').compression, 'zip')
+        self.assertEqual(_sniff_format(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1\x00').format, 'XLS')
+        self.assertEqual(_sniff_format(b'\x00\x01\x02'), (None, None, None, None))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
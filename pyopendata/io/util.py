@@ -2,8 +2,12 @@
 
 from __future__ import unicode_literals
 
+import codecs
+import collections
+import io
 import itertools
 import os
+import zlib
 
 import requests
 
@@ -13,6 +17,64 @@ import pandas.compat as compat
 from pandas.io.common import get_filepath_or_buffer
 
 
+_JSON_BACKENDS = ('orjson', 'ujson', 'simdjson', 'json')
+_json_backend = None
+
+
+def set_json_backend(name=None):
+    """
+    Set the JSON library used by the JSON-based readers
+
+    Parameters
+    ----------
+    name : {None, 'orjson', 'ujson', 'simdjson', 'json'}
+        If None, use the fastest one installed. 'json' is the standard library.
+
+    Returns
+    -------
+    name : str
+        Name of the backend being used
+    """
+    global _json_backend
+
+    if name is None:
+        candidates = _JSON_BACKENDS
+    elif name in _JSON_BACKENDS:
+        candidates = [name]
+    else:
+        raise ValueError("JSON backend must be one of {0}".format(', '.join(_JSON_BACKENDS)))
+
+    for candidate in candidates:
+        try:
+            module = __import__(candidate)
+        except ImportError:
+            continue
+        _json_backend = (candidate, module.loads)
+        return candidate
+    raise ImportError('{0} is not installed'.format(name))
+
+
+def get_json_backend():
+    """
+    Return the name of JSON library used by the JSON-based readers
+    """
+    if _json_backend is None:
+        set_json_backend()
+    return _json_backend[0]
+
+
+def _json_loads(data):
+    """
+    Parse JSON string or bytes using the backend
+    """
+    if _json_backend is None:
+        set_json_backend()
+    name, loads = _json_backend
+    if name == 'json' and isinstance(data, compat.binary_type):
+        data = data.decode('utf-8')
+    return loads(data)
+
+
 def _read_content(path_or_buf):
     filepath_or_buffer, _ = get_filepath_or_buffer(path_or_buf)
     if isinstance(filepath_or_buffer, compat.string_types):
@@ -32,3 +94,162 @@ def _read_content(path_or_buf):
         data = filepath_or_buffer
 
     return data
+
+
+class _IterStream(io.RawIOBase):
+    """
+    Raw file-like to read bytes from iterable of chunks
+    """
+
+    def __init__(self, iterable):
+        self._iter = iter(iterable)
+        self._leftover = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        try:
+            chunk = self._leftover
+            while not chunk:
+                chunk = next(self._iter)
+        except StopIteration:
+            return 0
+        output, self._leftover = chunk[:len(b)], chunk[len(b):]
+        b[:len(output)] = output
+        return len(output)
+
+
+def _read_stream(path_or_buf, buffer_size=io.DEFAULT_BUFFER_SIZE):
+    """
+    Return binary file-like to be parsed incrementally.
+    Iterable of bytes chunks is wrapped so that it can be read without buffering whole content.
+    """
+    filepath_or_buffer, _ = get_filepath_or_buffer(path_or_buf)
+    if isinstance(filepath_or_buffer, compat.string_types):
+        try:
+            exists = os.path.exists(filepath_or_buffer)
+        except (TypeError, ValueError):
+            exists = False
+
+        if exists:
+            return open(filepath_or_buffer, 'rb')
+        elif isinstance(filepath_or_buffer, compat.binary_type):
+            return io.BytesIO(filepath_or_buffer)
+        return io.BytesIO(filepath_or_buffer.encode('utf-8'))
+    elif isinstance(filepath_or_buffer, compat.binary_type):
+        return io.BytesIO(filepath_or_buffer)
+    elif hasattr(filepath_or_buffer, 'read'):
+        return filepath_or_buffer
+    elif hasattr(filepath_or_buffer, '__iter__'):
+        return io.BufferedReader(_IterStream(filepath_or_buffer), buffer_size)
+    else:
+        raise ValueError('Unable to read {0}'.format(type(filepath_or_buffer)))
+
+
+# number of bytes to guess format
+_SNIFF_SIZE = 64 * 1024
+# latin-1 decodes any bytes, keep it last. Multibyte encodings such as cp932
+# also decode most latin-1 text, thus they must be given explicitly
+_ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+_DELIMITERS = (',', '\t', ';', '|')
+
+_BOMS = [(codecs.BOM_UTF8, 'utf-8-sig'),
+         (codecs.BOM_UTF16_LE, 'utf-16'),
+         (codecs.BOM_UTF16_BE, 'utf-16')]
+
+_Sniffed = collections.namedtuple('_Sniffed', ['format', 'compression', 'encoding', 'delimiter'])
+
+
+def _sniff_format(head, encodings=_ENCODINGS):
+    """
+    Guess format, compression, encoding and delimiter from the head of content.
+    Items which can't be guessed are None.
+
+    Parameters
+    ----------
+    head : bytes
+        Leading bytes of the content, which may be truncated at any position
+    encodings : tuple of str
+        Candidates of text encoding, tried in order. Pass multibyte
+        encodings such as ``('utf-8', 'cp932')`` explicitly
+
+    Returns
+    -------
+    result : namedtuple (_Sniffed)
+    """
+    if head.startswith(b'\x1f\x8b'):
+        try:
+            inner = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(head)
+        except zlib.error:
+            inner = b''
+        return _sniff_format(inner, encodings=encodings)._replace(compression='gzip')
+    elif head.startswith(b'PK\x03\x04'):
+        # either XLSX or archive, central directory is required to tell
+        return _Sniffed(None, 'zip', None, None)
+    elif head.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        # OLE2, used by XLS
+        return _Sniffed('XLS', None, None, None)
+
+    encoding, text = _detect_encoding(head, encodings=encodings)
+    if encoding is None:
+        return _Sniffed(None, None, None, None)
+
+    stripped = text.lstrip()
+    if stripped.startswith(('{', '[')):
+        return _Sniffed('JSON', None, encoding, None)
+    elif stripped[:100].lower().startswith(('<!doctype html', '<html')):
+        return _Sniffed('HTML', None, encoding, None)
+    elif stripped.startswith('<'):
+        return _Sniffed('XML', None, encoding, None)
+
+    delimiter = _detect_delimiter(text)
+    fmt = 'CSV' if delimiter is not None else None
+    return _Sniffed(fmt, None, encoding, delimiter)
+
+
+def _detect_encoding(head, encodings=_ENCODINGS):
+    """
+    Return tuple of the encoding and decoded text. Multibyte character
+    truncated at the end of head is ignored.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            candidates = [encoding]
+            break
+    else:
+        if b'\x00' in head:
+            # binary
+            return None, None
+        candidates = encodings
+
+    for encoding in candidates:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            return encoding, decoder.decode(head, final=False)
+        except UnicodeDecodeError:
+            continue
+    return None, None
+
+
+def _detect_delimiter(text, delimiters=_DELIMITERS, nlines=20):
+    """
+    Return the delimiter which appears the same times in most lines
+    """
+    lines = text.splitlines()
+    if len(lines) > 1 and not text.endswith(('\n', '\r')):
+        # the last line may be truncated
+        lines = lines[:-1]
+    lines = [line for line in lines[:nlines] if line.strip()]
+    if len(lines) == 0:
+        return None
+
+    best = None
+    for delimiter in delimiters:
+        counts = [line.count(delimiter) for line in lines]
+        if counts[0] == 0:
+            continue
+        score = (sum(c == counts[0] for c in counts), counts[0])
+        if best is None or score > best[0]:
+            best = (score, delimiter)
+    return None if best is None else best[1]
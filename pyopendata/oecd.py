@@ -4,11 +4,14 @@ from __future__ import unicode_literals
 
 import numpy as np
 import pandas as pd
-from pandas.compat import iterkeys
+from pandas.compat import u, iterkeys, iteritems
 from pandas.util.decorators import Appender
 
-from pyopendata.base import DataStore, DataResource, _shared_docs
+from pyopendata.base import DataStore, DataResource, _Prefetch, _shared_docs
 from pyopendata.io import read_jsdmx
+from pyopendata.io.sdmx import _build_sdmx_key
+from pyopendata.io.util import _json_loads
+from pyopendata.util import network
 
 
 _oecd_doc_kwargs = dict(resource_klass='OECDResource')
@@ -67,16 +70,173 @@ class OECDStore(DataStore):
         return '+'.join(list(iterkeys(self._countries)))
 
     @Appender(_shared_docs['get'] % _oecd_doc_kwargs)
-    def get(self, resource_id):
+    def get(self, resource_id, max_workers=None):
         url = self.url + '/{0}/{1}/OECD?'.format(resource_id, self._target_countries)
-        return OECDResource(id=resource_id, url=url)
+        return OECDResource(_store=self, id=resource_id, url=url, max_workers=max_workers)
 
 
 class OECDResource(DataResource):
 
-    def _read(self, **kwargs):
-        data = self._requests_get().json()
-        result = read_jsdmx(data)
+    # limits of a single request. Query exceeding them is split into multiple requests
+    max_url_length = 1000
+    # number of series selected by the key. As the number of codes is unknown,
+    # it is only applied to the key which filters all the dimensions
+    max_series = 1000
+    # number of threads to retrieve split queries
+    max_workers = 4
+
+    _since_keyword = 'start_time'
+
+    def __init__(self, _store=None, max_workers=None, **kwargs):
+        DataResource.__init__(self, **kwargs)
+        self._base_url = OECDStore._url if _store is None else _store.url
+        if max_workers is not None:
+            self.max_workers = max_workers
+        # raw contents of the last query, keyed by split queries
+        self._raw_contents = {}
+
+    def _query_url(self, filters):
+        key = '.'.join('+'.join(values) for values in filters)
+        return self._base_url + '/{0}/{1}/OECD?'.format(self.id, key)
+
+    def _split_filters(self, filters):
+        """
+        Split filters until the URL and the number of series fit to the limits
+        """
+        pending = [filters]
+        results = []
+        while len(pending) > 0:
+            filters = pending.pop(0)
+            sizes = [len(values) for values in filters]
+            # dimension not filtered selects unknown number of codes
+            nseries = np.prod(sizes) if min(sizes) > 0 else 0
+            if ((len(self._query_url(filters)) <= self.max_url_length and
+                 nseries <= self.max_series) or max(sizes) <= 1):
+                results.append(filters)
+                continue
+            # split the largest selection into halves, keeping the order
+            i = int(np.argmax(sizes))
+            half = sizes[i] // 2
+            pending[0:0] = [filters[:i] + [filters[i][:half]] + filters[i + 1:],
+                            filters[:i] + [filters[i][half:]] + filters[i + 1:]]
+        return results
+
+    def _build_queries(self, key=None, start_time=None, end_time=None):
+        """
+        Return list of queries to retrieve data, as tuples of url and sorted params
+        """
+        params = {}
+        for name, value in [('startTime', start_time), ('endTime', end_time)]:
+            if value is None:
+                continue
+            if hasattr(value, 'strftime'):
+                value = value.strftime('%Y-%m')
+            params[name] = u(str(value))
+        params = tuple(sorted(iteritems(params)))
+
+        if key is None:
+            return [(self.url, params)]
+        elif isinstance(key, dict):
+            # SDMX-JSON API provides no DSD to know the dimension ids in advance
+            raise ValueError('OECD key must be str or list, dict is not supported')
+        key = _build_sdmx_key(key)
+        filters = [[v for v in part.split('+') if v] for part in key.split('.')]
+        return [(self._query_url(f), params) for f in self._split_filters(filters)]
+
+    def _source_queries(self, **kwargs):
+        return self._build_queries(**kwargs)
+
+    def _get_contents(self, queries):
+        contents = dict((q, self._raw_contents[q]) for q in queries
+                        if q in self._raw_contents)
+        missing = [q for q in queries if q not in contents]
+
+        def read_query(query):
+            url, params = query
+            response = self._requests_get(url=url, params=dict(params), stream=True)
+            return self._buffer_part(query, response)
+
+        buffers = network.imap_threads(read_query, missing, max_workers=self.max_workers)
+        for query, buffer in zip(missing, buffers):
+            contents[query] = buffer
+        self._raw_contents = contents
+        return [contents[q] for q in queries]
+
+    def _prefetch(self, **kwargs):
+        prefetches = []
+        for query in self._build_queries(**kwargs):
+            if query in self._raw_contents:
+                continue
+
+            def callback(response, query=query):
+                self._raw_contents[query] = self._buffer_part(query, response)
+            url, params = query
+            prefetches.append(_Prefetch(url, dict(params), callback))
+        return prefetches
+
+    def _buffer_part(self, query, response):
+        """
+        Return a binary buffer which holds the content of the query,
+        or None if the query selects no data
+        """
+        if response.status_code == 404:
+            # OECD responds "NoRecordsFound" to the query selecting no series
+            response.close()
+            return None
+        self._check_status(response)
+        content = self._buffer_content(response)
+        content.seek(0, 2)
+        if content.tell() == 0:
+            content.close()
+            return None
+        return content
+
+    def _read_raw(self, **kwargs):
+        queries = self._build_queries(**kwargs)
+        if len(queries) > 1:
+            msg = 'Query is split into {0} requests, raw content is not available'
+            raise ValueError(msg.format(len(queries)))
+        content = self._get_contents(queries)[0]
+        if content is None:
+            raise ValueError('No data is found for {0}'.format(queries[0][0]))
+        content.seek(0)
+        return content
+
+    def _read(self, key=None, start_time=None, end_time=None):
+        """
+        Read data from OECD
+
+        Parameters
+        ----------
+        key : str or list, optional
+            Filter series by dimension codes. str is a SDMX key such as "AUS+JPN.GDP..".
+            list contains a code or list of codes for each dimension, such as
+            ``[['AUS', 'JPN'], 'GDP', [], []]``. Empty list means all codes.
+            dict is not supported, as dimension ids are unknown before retrieval.
+            If omitted, OECD member countries are selected.
+        start_time, end_time : str, int or datetime-like, optional
+            Filter observations by time
+
+        Notes
+        -----
+        Query exceeding ``max_url_length`` or ``max_series`` is split into
+        multiple requests. They are retrieved concurrently and merged, skipping
+        the requests which select no data. ``max_series`` is only applied to
+        the key filtering all the dimensions.
+        """
+        queries = self._build_queries(key=key, start_time=start_time, end_time=end_time)
+        frames = []
+        for content in self._get_contents(queries):
+            if content is None:
+                continue
+            content.seek(0)
+            frames.append(read_jsdmx(_json_loads(content.read())))
+        if len(frames) == 0:
+            raise ValueError('No data is found for {0}'.format(self.id))
+        elif len(frames) == 1:
+            result = frames[0]
+        else:
+            result = pd.concat(frames, axis=1)
         # There is data not be sorted by time
         result = result.sort_index()
         return result
@@ -0,0 +1,170 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+from __future__ import unicode_literals
+
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+import pandas.util.testing as tm
+
+from pyopendata import (CKANStore, CKANPackage, CKANResource, EurostatStore,
+                        OECDStore, WorldBankStore)
+from pyopendata.util.cache import DSDCache, ResultCache
+from pyopendata.util.emulator import ProviderEmulator
+
+
+class TestAsync(tm.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = ProviderEmulator(datasets=3, dimensions=(4, 3, 2), periods=10,
+                                        countries=30, packages=5, rows=50).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.emulator.stop()
+
+    def setUp(self):
+        if sys.version_info < (3, 5):
+            import nose
+            raise nose.SkipTest('asyncio API requires Python 3.5 or later')
+        try:
+            import aiohttp
+        except ImportError:
+            import nose
+            raise nose.SkipTest('aiohttp is not installed')
+
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        import asyncio
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_eurostat(self):
+        store = EurostatStore(self.emulator.url_for('eurostat'))
+        resource = self._run(store.aget('DS0'))
+        expected = store.get('DS0').read()
+
+        # DSD is not shared
+        resource.dsd_cache = DSDCache()
+        count = self.emulator.request_count
+        result = self._run(resource.aread())
+        tm.assert_frame_equal(result, expected)
+        # DSD and data
+        self.assertEqual(self.emulator.request_count, count + 2)
+
+    def test_eurostat_key(self):
+        store = EurostatStore(self.emulator.url_for('eurostat'))
+        expected = store.get('DS1').read(key={'D0': 'C1'}, start_period=1995)
+
+        resource = store.get('DS1')
+        resource.dsd_cache = DSDCache()
+        count = self.emulator.request_count
+        result = self._run(resource.aread(key={'D0': 'C1'}, start_period=1995))
+        tm.assert_frame_equal(result, expected)
+        # data is requested after DSD
+        self.assertEqual(self.emulator.request_count, count + 2)
+
+    def test_oecd(self):
+        store = OECDStore(self.emulator.url_for('oecd'))
+        expected = store.get('DS1').read()
+        result = self._run(store.get('DS1').aread())
+        tm.assert_frame_equal(result, expected)
+
+    def test_worldbank(self):
+        store = WorldBankStore(self.emulator.url_for('worldbank'))
+        resource = store.get('IND1')
+        resource.entries_per_page = 40
+        expected = resource.read()
+
+        resource = store.get('IND1')
+        resource.entries_per_page = 40
+        count = self.emulator.request_count
+        result = self._run(resource.aread())
+        tm.assert_frame_equal(result, expected)
+        self.assertEqual(self.emulator.request_count, count + 8)
+
+    def test_ckan(self):
+        store = CKANStore(self.emulator.url_for('ckan'))
+
+        resource = self._run(store.aget('package-1-resource-0'))
+        self.assertTrue(isinstance(resource, CKANResource))
+        df = self._run(resource.aread())
+        self.assertEqual(df.shape, (50, 3))
+
+        package = self._run(store.aget('package-2'))
+        self.assertTrue(isinstance(package, CKANPackage))
+        self.assertEqual(len(package.resources), 2)
+
+    def test_error_status(self):
+        with ProviderEmulator(datasets=1, dimensions=(2, 2), error_rate=1.) as emulator:
+            resource = WorldBankStore(emulator.url_for('worldbank')).get('IND0')
+            with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+                self._run(resource.aread())
+            self.assertTrue(resource._raw_content is None)
+
+            resource = OECDStore(emulator.url_for('oecd')).get('DS0')
+            with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+                self._run(resource.aread())
+
+            resource = EurostatStore(emulator.url_for('eurostat')).get('DS0')
+            resource.dsd_cache = DSDCache()
+            with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+                self._run(resource.aread())
+            # unavailable DSD is not retried
+            self.assertTrue(resource._dsd is None)
+            self.assertTrue(resource._dsd_error is not None)
+
+    def test_result_cache(self):
+        try:
+            import pyarrow
+        except ImportError:
+            import nose
+            raise nose.SkipTest('pyarrow is not installed')
+
+        directory = tempfile.mkdtemp()
+        try:
+            store = EurostatStore(self.emulator.url_for('eurostat'))
+            expected = store.get('DS2').read()
+            result_cache = ResultCache(directory=directory)
+            tm.assert_frame_equal(self._run(store.get('DS2').aread(cache=result_cache)),
+                                  expected)
+
+            # validators are taken from the prefetched response
+            count = self.emulator.request_count
+            resource = store.get('DS2')
+            resource.result_cache = result_cache
+
+            def blocking(*args, **kwargs):
+                raise AssertionError('source is revalidated by blocking requests')
+            resource._source_validators = blocking
+            tm.assert_frame_equal(self._run(resource.aread()), expected)
+            self.assertEqual(self.emulator.request_count, count + 1)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def test_gather(self):
+        import asyncio
+
+        store = OECDStore(self.emulator.url_for('oecd'))
+        resources = [store.get('DS{0}'.format(i)) for i in range(3)]
+
+        # all resources are in flight on a single loop
+        results = self._run(asyncio.gather(*[r.aread() for r in resources]))
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertTrue(isinstance(result, pd.DataFrame))
+            self.assertEqual(result.shape, (10, 24))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
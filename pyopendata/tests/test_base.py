@@ -3,11 +3,15 @@
 
 from __future__ import unicode_literals
 
-from pyopendata import (DataStore, CKANStore, OECDStore, EurostatStore,
+from pyopendata import (DataStore, CKANStore, CKANResource, OECDStore, EurostatStore,
     UNdataStore, WorldBankStore)
 
+import numpy as np
+import pandas as pd
 import pandas.util.testing as tm
 
+from pyopendata.util.emulator import ProviderEmulator
+
 
 class TestDataStore(tm.TestCase):
 
@@ -31,6 +35,93 @@ class TestDataStore(tm.TestCase):
             store = DataStore('http://google.com')
 
 
+class TestDataResource(tm.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = ProviderEmulator(datasets=2, dimensions=(4, 3, 2), periods=10,
+                                        packages=2, rows=200).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.emulator.stop()
+
+    def test_raw_buffer(self):
+        store = CKANStore(self.emulator.url_for('ckan'))
+        resource = store.get_resource('package-0-resource-0')
+        expected = resource.read()
+
+        resource = store.get_resource('package-0-resource-0')
+        resource._spool_size = 1000
+        raw = resource.read(raw=True)
+        self.assertTrue(isinstance(raw, bytes))
+        self.assertTrue(len(raw) > 1000)
+        # spilled to a temporary file
+        self.assertTrue(resource._raw_content._rolled)
+        self.assertEqual(resource.read(raw=True), raw)
+        tm.assert_frame_equal(resource.read(), expected)
+
+        resource = store.get_resource('package-0-resource-0')
+        raw = resource.read(raw=True)
+        self.assertFalse(resource._raw_content._rolled)
+        tm.assert_frame_equal(resource.read(), expected)
+
+    def test_raw_providers(self):
+        store = EurostatStore(self.emulator.url_for('eurostat'))
+        resource = store.get('DS0')
+        self.assertTrue(resource.read(raw=True).startswith(b'<?xml'))
+        self.assertEqual(resource.read().shape, (10, 24))
+
+        store = OECDStore(self.emulator.url_for('oecd'))
+        resource = store.get('DS0')
+        self.assertTrue(resource.read(raw=True).startswith(b'{'))
+        self.assertEqual(resource.read().shape, (10, 24))
+
+        store = WorldBankStore(self.emulator.url_for('worldbank'))
+        resource = store.get('IND0')
+        self.assertTrue(resource.read(raw=True).startswith(b'['))
+
+
+class TestRefresh(tm.TestCase):
+
+    def test_merge_periods(self):
+        from pyopendata.base import _last_observed, _merge_periods
+
+        idx = pd.DatetimeIndex(['2010', '2011', '2012', '2013'])
+        data = pd.DataFrame({'A': [1., 2., 3., np.nan], 'B': [1., 2., np.nan, np.nan]},
+                            index=idx)
+        self.assertEqual(_last_observed(data), pd.Timestamp('2012'))
+        self.assertEqual(_last_observed(data, overlap=2), pd.Timestamp('2011'))
+        self.assertEqual(_last_observed(data, overlap=5), pd.Timestamp('2010'))
+        self.assertTrue(_last_observed(data.iloc[:, :0]) is None)
+
+        idx = pd.DatetimeIndex(['2012', '2014'])
+        updates = pd.DataFrame({'A': [4., 5.], 'C': [6., np.nan]}, index=idx)
+        result = _merge_periods(data, updates, pd.Timestamp('2012'))
+        idx = pd.DatetimeIndex(['2010', '2011', '2012', '2013', '2014'])
+        expected = pd.DataFrame({'A': [1., 2., 4., np.nan, 5.],
+                                 'B': [1., 2., np.nan, np.nan, np.nan],
+                                 'C': [np.nan, np.nan, 6., np.nan, np.nan]},
+                                index=idx, columns=['A', 'B', 'C'])
+        tm.assert_frame_equal(result, expected)
+
+        # no updates
+        result = _merge_periods(data, pd.DataFrame(), pd.Timestamp('2012'))
+        tm.assert_frame_equal(result, data)
+
+    def test_not_supported(self):
+        store = CKANStore('http://localhost')
+        resource = CKANResource(_store=store, url='http://localhost/data.csv')
+        with tm.assertRaises(NotImplementedError):
+            resource.refresh(data=pd.DataFrame({'A': [1.]}))
+
+    def test_invalid_overlap(self):
+        store = CKANStore('http://localhost')
+        resource = CKANResource(_store=store, url='http://localhost/data.csv')
+        with tm.assertRaisesRegexp(ValueError, 'overlap must be 1 or greater'):
+            resource.refresh(data=pd.DataFrame({'A': [1.]}), overlap=0)
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
@@ -0,0 +1,351 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import numpy as np
+import pandas as pd
+import pandas.util.testing as tm
+
+from pyopendata import EurostatStore, WorldBankStore
+from pyopendata.io.sdmx import _read_sdmx_dsd
+from pyopendata.util import testing
+from pyopendata.util.cache import HTTPCache, DSDCache, ResultCache, set_default_cache
+from pyopendata.util.emulator import ProviderEmulator
+
+
+class _DummyRaw(object):
+    """Records whether the connection is released"""
+
+    released = False
+
+    def release_conn(self):
+        self.released = True
+
+
+class _DummyPool(object):
+    """Returns prepared responses instead of accessing the server"""
+
+    def __init__(self, content=b'<data/>', etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+        self.responses = []
+
+    def get(self, url, params=None, proxies=None, headers=None, **kwargs):
+        self.requests.append((url, headers))
+        response = requests.models.Response()
+        response.url = url
+        if headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response._content = self.content
+        response.headers = CaseInsensitiveDict({'ETag': self.etag})
+        response._content_consumed = True
+        response.raw = _DummyRaw()
+        self.responses.append(response)
+        return response
+
+
+class TestHTTPCache(tm.TestCase):
+
+    def setUp(self):
+        self.dirpath = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirpath)
+
+    def test_revalidate(self):
+        cache = HTTPCache(directory=self.dirpath)
+        pool = _DummyPool()
+
+        response = cache.get(pool, 'http://example.com/data', params={'b': 1, 'a': 2})
+        self.assertEqual(response.content, b'<data/>')
+        self.assertEqual(pool.requests[-1][1], {})
+
+        # params order doesn't affect to the key
+        response = cache.get(pool, 'http://example.com/data', params={'a': 2, 'b': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'<data/>')
+        self.assertEqual(pool.requests[-1][1], {'If-None-Match': '"v1"'})
+        self.assertEqual(len(pool.requests), 2)
+        # 304 response is closed
+        self.assertTrue(pool.responses[-1].raw.released)
+
+        # updated on the server
+        pool.content = b'<data>new</data>'
+        pool.etag = '"v2"'
+        response = cache.get(pool, 'http://example.com/data', params={'a': 2, 'b': 1})
+        self.assertEqual(response.content, b'<data>new</data>')
+
+        # other process can read the cache
+        other = HTTPCache(directory=self.dirpath, offline=True)
+        response = other.get(pool, 'http://example.com/data', params={'a': 2, 'b': 1})
+        self.assertEqual(response.content, b'<data>new</data>')
+        self.assertEqual(list(response.iter_content(4)), [b'<dat', b'a>ne', b'w</d', b'ata>'])
+        self.assertEqual(len(pool.requests), 3)
+
+    def test_ttl(self):
+        cache = HTTPCache(directory=self.dirpath, ttl=3600)
+        pool = _DummyPool()
+
+        cache.get(pool, 'http://example.com/data')
+        response = cache.get(pool, 'http://example.com/data')
+        self.assertEqual(response.content, b'<data/>')
+        self.assertEqual(len(pool.requests), 1)
+
+    def test_offline(self):
+        cache = HTTPCache(directory=self.dirpath, offline=True)
+        pool = _DummyPool()
+        with tm.assertRaises(requests.exceptions.ConnectionError):
+            cache.get(pool, 'http://example.com/data')
+        self.assertEqual(len(pool.requests), 0)
+
+    def test_clear(self):
+        cache = HTTPCache(directory=self.dirpath)
+        pool = _DummyPool()
+        cache.get(pool, 'http://example.com/data')
+        cache.clear()
+
+        cache.offline = True
+        with tm.assertRaises(requests.exceptions.ConnectionError):
+            cache.get(pool, 'http://example.com/data')
+
+    def test_stream(self):
+        cache = HTTPCache(directory=self.dirpath)
+        with ProviderEmulator(datasets=1, dimensions=(4, 3, 2), periods=10) as emulator:
+            resource = EurostatStore(emulator.url_for('eurostat')).get('DS0')
+            resource.http_cache = cache
+            expected = resource.read()
+            url, params = resource._source_queries()[0]
+            url = cache._normalize_url(url, params=list(params))
+
+            # stored while read by chunks, then revalidated and read from the file
+            response = cache.get(resource.session_pool, url, stream=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response._content_consumed)
+            content = b''.join(response.iter_content(1024))
+            response.close()
+            self.assertTrue(len(content) > 0)
+
+            # interrupted stream is not stored
+            emulator.set_periods(12)
+            response = cache.get(resource.session_pool, url, stream=True)
+            next(response.iter_content(16))
+            response.close()
+            offline = HTTPCache(directory=self.dirpath, offline=True)
+            response = offline.get(resource.session_pool, url, stream=True)
+            self.assertEqual(b''.join(response.iter_content(1024)), content)
+            # no temporary file is left
+            self.assertEqual(os.listdir(os.path.dirname(cache._path(url))),
+                             [os.path.basename(cache._path(url))])
+
+            resource = EurostatStore(emulator.url_for('eurostat')).get('DS0')
+            resource.http_cache = offline
+            tm.assert_frame_equal(resource.read(), expected)
+
+    def test_disabled(self):
+        default = set_default_cache(directory=self.dirpath)
+        try:
+            with ProviderEmulator(datasets=1, dimensions=(4, 3, 2), periods=10) as emulator:
+                resource = EurostatStore(emulator.url_for('eurostat')).get('DS0')
+                self.assertTrue(resource.http_cache is default)
+                resource.http_cache = None
+                self.assertTrue(resource.http_cache is None)
+                url, params = resource._source_queries()[0]
+                resource.read()
+                path = default._path(default._normalize_url(url, params=list(params)))
+                self.assertFalse(os.path.exists(path))
+        finally:
+            set_default_cache(False)
+
+
+class TestDSDCache(tm.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.key = ('http://localhost', 'ESTAT', 'DSD_DS0', 'latest')
+        self.loaded = []
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _loader(self):
+        self.loaded.append(1)
+        return _read_sdmx_dsd(testing.make_sdmx_dsd((4, 3, 2)))
+
+    def test_memory(self):
+        dsd_cache = DSDCache()
+        self.assertTrue(dsd_cache.lookup(self.key) is None)
+        result = dsd_cache.get(self.key, self._loader)
+        self.assertTrue(dsd_cache.get(self.key, self._loader) is result)
+        self.assertTrue(dsd_cache.lookup(self.key) is result)
+        self.assertEqual(len(self.loaded), 1)
+
+        dsd_cache.invalidate(self.key)
+        self.assertTrue(dsd_cache.lookup(self.key) is None)
+        dsd_cache.get(self.key, self._loader)
+        self.assertEqual(len(self.loaded), 2)
+
+    def test_disk(self):
+        dsd_cache = DSDCache(directory=self.directory)
+        expected = dsd_cache.get(self.key, self._loader)
+
+        # other process
+        dsd_cache = DSDCache(directory=self.directory)
+        result = dsd_cache.get(self.key, self._loader)
+        self.assertEqual(result, expected)
+        self.assertEqual(len(self.loaded), 1)
+
+        dsd_cache.invalidate()
+        self.assertTrue(DSDCache(directory=self.directory).lookup(self.key) is None)
+
+    def test_ttl(self):
+        dsd_cache = DSDCache(ttl=0.05)
+        dsd_cache.get(self.key, self._loader)
+        time.sleep(0.1)
+        self.assertTrue(dsd_cache.lookup(self.key) is None)
+        dsd_cache.get(self.key, self._loader)
+        self.assertEqual(len(self.loaded), 2)
+
+    def test_concurrent(self):
+        dsd_cache = DSDCache()
+
+        def loader():
+            time.sleep(0.05)
+            return self._loader()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(dsd_cache.get(self.key, loader)))
+                   for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.loaded), 1)
+        self.assertEqual(len(results), 5)
+        for result in results:
+            self.assertTrue(result is results[0])
+
+    def test_codelists(self):
+        dsd_cache = DSDCache()
+        dsd1 = _read_sdmx_dsd(testing.make_sdmx_dsd((4, 3, 2)), codelists=dsd_cache.codelists)
+        dsd2 = _read_sdmx_dsd(testing.make_sdmx_dsd((4, 3, 2)), codelists=dsd_cache.codelists)
+        for key in dsd1.codes:
+            self.assertTrue(dsd1.codes[key] is dsd2.codes[key])
+
+    def test_eurostat(self):
+        with ProviderEmulator(datasets=2, dimensions=(4, 3, 2), periods=5) as emulator:
+            store = EurostatStore(emulator.url_for('eurostat'))
+            dsd_cache = DSDCache()
+
+            resource = store.get('DS0')
+            resource.dsd_cache = dsd_cache
+            expected = resource.read()
+            count = emulator.request_count
+
+            resource = store.get('DS0')
+            resource.dsd_cache = dsd_cache
+            tm.assert_frame_equal(resource.read(), expected)
+            # only data is requested
+            self.assertEqual(emulator.request_count, count + 1)
+
+
+class TestResultCache(tm.TestCase):
+
+    def setUp(self):
+        try:
+            import pyarrow
+        except ImportError:
+            import nose
+            raise nose.SkipTest('pyarrow is not installed')
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_put_load(self):
+        columns = pd.MultiIndex.from_product([['A', 'B'], ['X', 'Y', 'Z']],
+                                             names=['D0', 'D1'])
+        index = pd.DatetimeIndex(['2010', '2011', '2012'], name='TIME_PERIOD')
+        df = pd.DataFrame(np.random.randn(3, 6), index=index, columns=columns)
+        df.iloc[1, 2] = np.nan
+        key = ('EurostatResource', 'http://localhost/data/DS0/?', '[]')
+
+        for format in ['parquet', 'feather']:
+            result_cache = ResultCache(directory=self.directory, format=format)
+            self.assertTrue(result_cache.load(key) is None)
+            self.assertTrue(result_cache.put(key, df, meta={'validators': [['"v1"', None]]}))
+            result, meta = result_cache.load(key)
+            tm.assert_frame_equal(result, df)
+            self.assertEqual(meta, {'validators': [['"v1"', None]]})
+            self.assertFalse(result_cache.is_fresh(key))
+
+            result_cache.invalidate()
+            self.assertTrue(result_cache.load(key) is None)
+
+        with tm.assertRaises(ValueError):
+            ResultCache(format='csv')
+
+    def test_read(self):
+        with ProviderEmulator(datasets=1, dimensions=(4, 3, 2), periods=10) as emulator:
+            store = EurostatStore(emulator.url_for('eurostat'))
+            expected = store.get('DS0').read()
+
+            result_cache = ResultCache(directory=self.directory, format='feather')
+            count = emulator.request_count
+            result = store.get('DS0').read(cache=result_cache)
+            tm.assert_frame_equal(result, expected)
+            # validators are taken from the data response
+            self.assertEqual(emulator.request_count, count + 1)
+
+            # revalidated by ETag, data is not retrieved
+            count = emulator.request_count
+            resource = store.get('DS0')
+            resource.result_cache = result_cache
+            tm.assert_frame_equal(resource.read(), expected)
+            self.assertEqual(emulator.request_count, count + 1)
+            # other keywords are stored separately
+            self.assertEqual(resource.read(key={'D0': 'C0'}).shape, (10, 6))
+            self.assertEqual(resource.read(cache=False).shape, (10, 24))
+
+            # used without requests within ttl
+            result_cache.ttl = 60
+            count = emulator.request_count
+            tm.assert_frame_equal(store.get('DS0').read(cache=result_cache), expected)
+            self.assertEqual(emulator.request_count, count)
+
+            # changed source is retrieved again
+            result_cache.ttl = None
+            emulator.set_periods(12)
+            result = store.get('DS0').read(cache=result_cache)
+            self.assertEqual(result.shape, (12, 24))
+            self.assertEqual(emulator.request_count, count + 2)
+
+    def test_read_without_validators(self):
+        with ProviderEmulator(datasets=1, countries=5, periods=10, etag=False) as emulator:
+            store = WorldBankStore(emulator.url_for('worldbank'))
+            result_cache = ResultCache(directory=self.directory)
+            count = emulator.request_count
+            expected = store.get('IND0').read(cache=result_cache)
+            pages = emulator.request_count - count
+
+            # read again without revalidation
+            count = emulator.request_count
+            tm.assert_frame_equal(store.get('IND0').read(cache=result_cache), expected)
+            self.assertEqual(emulator.request_count, count + pages)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
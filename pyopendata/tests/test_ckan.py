@@ -6,8 +6,11 @@ from __future__ import unicode_literals
 from pyopendata import CKANStore, CKANPackage, CKANResource
 
 import numpy as np
+import pandas as pd
 import pandas.util.testing as tm
 
+from pyopendata.util.emulator import ProviderEmulator
+
 
 class CKANTestBase(tm.TestCase):
 
@@ -303,6 +306,155 @@ class TestDATAGOVUK(tm.TestCase):
 """
 
 
+class TestCKANResource(tm.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = ProviderEmulator(packages=3, rows=100).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.emulator.stop()
+
+    def setUp(self):
+        self.store = CKANStore(self.emulator.url_for('ckan'))
+
+    def test_iter_chunks(self):
+        expected = self.store.get_resource('package-0-resource-0').read()
+
+        resource = self.store.get_resource('package-0-resource-0')
+        chunks = list(resource.iter_chunks(chunksize=30))
+        self.assertEqual([len(c) for c in chunks], [30, 30, 30, 10])
+        tm.assert_frame_equal(pd.concat(chunks), expected)
+        # parsed from the stream without buffering
+        self.assertTrue(resource._raw_content is None)
+
+        chunks = list(resource.read(chunksize=40, usecols=['id', 'value']))
+        self.assertEqual([len(c) for c in chunks], [40, 40, 20])
+        tm.assert_frame_equal(pd.concat(chunks), expected[['id', 'value']])
+
+        # buffered content is used if available
+        resource.read(raw=True)
+        count = self.emulator.request_count
+        chunks = list(resource.iter_chunks(chunksize=50))
+        tm.assert_frame_equal(pd.concat(chunks), expected)
+        self.assertEqual(self.emulator.request_count, count)
+
+        package = self.store.get_package('package-1')
+        with tm.assertRaises(ValueError):
+            package.read(chunksize=10)
+
+    def _resource(self, ext, format='CSV'):
+        # resource whose content differs from the format of metadata
+        url = '{0}/ckan/files/package-0-resource-0.{1}'.format(self.emulator.url, ext)
+        return CKANResource(_store=self.store, id='package-0-resource-0', url=url,
+                            format=format)
+
+    def test_iter_chunks_format(self):
+        expected = self.store.get_resource('package-0-resource-0').read()
+
+        for ext in ['tsv', 'csv.gz']:
+            chunks = list(self._resource(ext, format='XLS').iter_chunks(chunksize=30))
+            tm.assert_frame_equal(pd.concat(chunks), expected)
+
+        for ext in ['json', 'zip']:
+            with tm.assertRaises(ValueError):
+                list(self._resource(ext).iter_chunks())
+
+    def test_sniff(self):
+        expected = self.store.get_resource('package-0-resource-0').read()
+
+        for ext, format in [('csv', 'JSON'), ('tsv', 'CSV'), ('csv.gz', 'CSV'),
+                            ('zip', 'XLS'), ('csv', 'UNKNOWN')]:
+            resource = self._resource(ext, format=format)
+            count = self.emulator.request_count
+            tm.assert_frame_equal(resource.read(), expected)
+            # never retrieved twice
+            self.assertEqual(self.emulator.request_count, count + 1)
+
+        result = self._resource('json', format='CSV').read()
+        tm.assert_frame_equal(result[expected.columns], expected)
+
+        # user specified options are prior to guessed
+        result = self._resource('tsv').read(sep=',')
+        self.assertEqual(result.shape, (100, 1))
+
+
+class TestCKANStore(tm.TestCase):
+
+    def _check_packages(self, packages, n):
+        self.assertEqual(len(packages), n)
+        self.assertEqual(sorted(p.name for p in packages),
+                         sorted('package-{0}'.format(i) for i in range(n)))
+        for package in packages:
+            self.assertTrue(isinstance(package, CKANPackage))
+            self.assertEqual(len(package._resources), 2)
+
+    def test_packages(self):
+        with ProviderEmulator(packages=23, rows_max=5) as emulator:
+            store = CKANStore(emulator.url_for('ckan'))
+            packages = store.get_packages(hydrate=True, page_size=10, max_workers=3)
+            # page size is limited to 5 by the server
+            self._check_packages(packages, 23)
+            self.assertEqual(emulator.request_count, 5)
+            # resources are already retrieved
+            count = emulator.request_count
+            self.assertEqual(len(packages[5].resources), 2)
+            self.assertEqual(emulator.request_count, count)
+
+            # only names are retrieved by default
+            packages = store.packages
+            self.assertEqual(emulator.request_count, count + 1)
+            self.assertEqual(len(packages), 23)
+            self.assertTrue(packages[0]._resources is None)
+            self.assertEqual(len(packages[5].resources), 2)
+
+    def test_packages_without_search(self):
+        for n in [0, 7, 10, 23]:
+            with ProviderEmulator(packages=n, rows_max=5,
+                                  disabled_actions=['package_search']) as emulator:
+                store = CKANStore(emulator.url_for('ckan'))
+                self._check_packages(store.get_packages(hydrate=True, page_size=10,
+                                                        max_workers=2), n)
+
+        with ProviderEmulator(packages=7, disabled_actions=['package_search',
+                                                            'current_package_list_with_resources']) as emulator:
+            store = CKANStore(emulator.url_for('ckan'))
+            packages = store.get_packages(hydrate=True)
+            self.assertEqual(len(packages), 7)
+            self.assertTrue(packages[0]._resources is None)
+
+    def test_search(self):
+        with ProviderEmulator(packages=23, rows_max=5) as emulator:
+            store = CKANStore(emulator.url_for('ckan'))
+
+            # more than a page
+            result = store.search_package('Synthetic', rows=4)
+            self._check_packages(result, 23)
+            self.assertEqual(emulator.request_count, 6)
+
+            result = list(store.iter_search_package(fq='tags:tag-1', prefetch=0))
+            self.assertEqual([p.name for p in result],
+                             ['package-1', 'package-6', 'package-11', 'package-16', 'package-21'])
+
+            result = list(store.iter_search_package(fl=['name', 'metadata_modified'],
+                                                    sort='metadata_modified desc', prefetch=3))
+            self.assertEqual(len(result), 23)
+            self.assertEqual(sorted(result[0].keys()), ['metadata_modified', 'name'])
+            self.assertEqual(result[0]['name'], 'package-22')
+
+            # only the first page is retrieved if not consumed
+            count = emulator.request_count
+            search = store.iter_search_package(prefetch=0)
+            next(search)
+            self.assertEqual(emulator.request_count, count + 1)
+
+            result = store.search_resource('name:Resource 1', rows=3)
+            self.assertEqual(len(result), 23)
+            self.assertTrue(all(isinstance(r, CKANResource) for r in result))
+            self.assertEqual(len(store.search_resource('name:xxx')), 0)
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
@@ -0,0 +1,124 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+from __future__ import unicode_literals
+
+import time
+
+import pandas as pd
+import pandas.util.testing as tm
+
+from pyopendata import (CKANStore, CKANPackage, CKANResource, EurostatStore,
+                        EurostatResource, OECDStore, WorldBankStore)
+from pyopendata.util.emulator import ProviderEmulator
+
+
+class TestProviderEmulator(tm.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = ProviderEmulator(datasets=3, dimensions=(4, 3, 2), periods=10,
+                                        countries=30, packages=12, rows=50).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.emulator.stop()
+
+    def test_eurostat(self):
+        store = EurostatStore(self.emulator.url_for('eurostat'))
+        datasets = store.datasets
+        self.assertEqual(len(datasets), 3)
+        self.assertTrue(isinstance(datasets[0], EurostatResource))
+        self.assertEqual(datasets[0].name, 'Synthetic dataset 0')
+
+        df = store.get('DS1').read()
+        self.assertTrue(isinstance(df, pd.DataFrame))
+        self.assertEqual(df.shape, (10, 24))
+        self.assertEqual(df.columns.names, ['D0', 'D1', 'D2'])
+        self.assertTrue(isinstance(df.index, pd.DatetimeIndex))
+
+    def test_oecd(self):
+        store = OECDStore(self.emulator.url_for('oecd'))
+        df = store.get('DS2').read()
+        self.assertTrue(isinstance(df, pd.DataFrame))
+        self.assertEqual(df.shape, (10, 24))
+
+    def test_worldbank(self):
+        store = WorldBankStore(self.emulator.url_for('worldbank'))
+        resource = store.get('IND0', max_workers=4)
+        resource.entries_per_page = 25
+
+        df = resource.read()
+        self.assertEqual(df.shape, (10, 30))
+        self.assertEqual(df.columns.names, ['indicator', 'country'])
+        self.assertEqual(len(resource._raw_content), 300)
+
+    def test_ckan(self):
+        store = CKANStore(self.emulator.url_for('ckan'))
+        self.assertTrue(store.is_valid())
+
+        packages = store.packages
+        self.assertEqual(len(packages), 12)
+        self.assertTrue(isinstance(packages[0], CKANPackage))
+        self.assertEqual(len(packages[0].resources), 2)
+
+        resource = store.get_resource('package-3-resource-1')
+        self.assertTrue(isinstance(resource, CKANResource))
+        df = resource.read()
+        self.assertEqual(df.shape, (50, 3))
+        self.assertEqual(list(df.columns), ['id', 'name', 'value'])
+
+        self.assertEqual(store.tags, ['tag-0', 'tag-1', 'tag-2', 'tag-3', 'tag-4'])
+        self.assertEqual(store.groups, ['group-0', 'group-1', 'group-2'])
+        self.assertEqual(len(store.search_package('package-1')), 3)
+
+    def test_read_many(self):
+        store = OECDStore(self.emulator.url_for('oecd'))
+        result = dict(store.read_many(['DS0', 'DS1', 'DS2'], max_workers=2))
+        self.assertEqual(sorted(result.keys()), ['DS0', 'DS1', 'DS2'])
+        for key in result:
+            tm.assert_frame_equal(result[key], store.get(key).read())
+
+        result = dict(store.read_many(['DS0', 'XXX'], return_exceptions=True))
+        self.assertTrue(isinstance(result['DS0'], pd.DataFrame))
+        self.assertTrue(isinstance(result['XXX'], Exception))
+
+        with tm.assertRaises(Exception):
+            list(store.read_many(['DS0', 'XXX']))
+
+        store = CKANStore(self.emulator.url_for('ckan'))
+        ids = ['package-{0}-resource-0'.format(i) for i in range(6)]
+        result = dict(store.read_many(ids, max_workers=3, max_pending=2))
+        self.assertEqual(sorted(result.keys()), ids)
+        for df in result.values():
+            self.assertEqual(df.shape, (50, 3))
+
+
+class TestProviderEmulatorCondition(tm.TestCase):
+
+    def test_latency(self):
+        with ProviderEmulator(latency=0.2) as emulator:
+            store = CKANStore(emulator.url_for('ckan'))
+            start = time.time()
+            self.assertTrue(store.is_valid())
+            self.assertTrue(time.time() - start >= 0.2)
+
+    def test_bandwidth(self):
+        with ProviderEmulator(rows=1000, bandwidth=100000) as emulator:
+            store = CKANStore(emulator.url_for('ckan'))
+            resource = store.get_resource('package-0-resource-0')
+            start = time.time()
+            raw = resource.read(raw=True)
+            # about 20KB
+            self.assertTrue(len(raw) > 10000)
+            self.assertTrue(time.time() - start >= len(raw) / 100000. * 0.5)
+
+    def test_error_rate(self):
+        with ProviderEmulator(error_rate=1.) as emulator:
+            store = CKANStore(emulator.url_for('ckan'))
+            self.assertFalse(store.is_valid())
+            self.assertEqual(emulator.request_count, 1)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
@@ -7,6 +7,9 @@ import pandas as pd
 from pandas.compat import range
 import pandas.util.testing as tm
 
+from pyopendata.util.cache import DSDCache
+from pyopendata.util.emulator import ProviderEmulator
+
 
 class TestEurostatTestSite(tm.TestCase):
 
@@ -95,6 +98,100 @@ class TestEurostatTestSite(tm.TestCase):
             # tm.assert_series_equal(result, expected)
 
 
+class TestEurostatResource(tm.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = ProviderEmulator(datasets=2, dimensions=(4, 3, 2), periods=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.emulator.stop()
+
+    def setUp(self):
+        self.store = EurostatStore(self.emulator.url_for('eurostat'))
+
+    def test_key(self):
+        resource = self.store.get('DS0')
+        df = resource.read()
+        self.assertEqual(df.shape, (10, 24))
+        self.assertEqual(resource.dsd.dimensions, ['D0', 'D1', 'D2'])
+
+        result = resource.read(key={'D0': ['C1', 'C3'], 'D2': 'C0'})
+        self.assertEqual(result.shape, (10, 6))
+        tm.assert_frame_equal(result, df[result.columns])
+
+        result = resource.read(key='C1+C3..C0')
+        self.assertEqual(result.shape, (10, 6))
+
+        with tm.assertRaises(ValueError):
+            resource.read(key={'D0': 'XXX'})
+        with tm.assertRaises(ValueError):
+            resource.read(key={'XXX': 'C0'})
+        with tm.assertRaises(ValueError):
+            resource.read(key='C0.C0')
+
+    def test_period(self):
+        resource = self.store.get('DS1')
+        df = resource.read()
+
+        result = resource.read(start_period=1992, end_period='1995')
+        tm.assert_frame_equal(result, df['1992':'1995'])
+
+        result = resource.read(key={'D1': 'C2'}, last_n_observations=3)
+        self.assertEqual(result.shape, (3, 8))
+        tm.assert_frame_equal(result, df.iloc[-3:][result.columns])
+
+    def test_raw(self):
+        resource = self.store.get('DS0')
+        full = resource.read(raw=True)
+        filtered = resource.read(raw=True, key={'D0': 'C0'})
+        self.assertTrue(len(filtered) < len(full))
+
+        # raw content is kept for the last query
+        count = self.emulator.request_count
+        self.assertEqual(resource.read(raw=True, key={'D0': 'C0'}), filtered)
+        self.assertEqual(resource.read(key={'D0': 'C0'}).shape, (10, 6))
+        self.assertEqual(self.emulator.request_count, count)
+        self.assertEqual(resource.read(raw=True), full)
+        self.assertEqual(self.emulator.request_count, count + 1)
+
+    def test_refresh(self):
+        with ProviderEmulator(datasets=1, dimensions=(2, 2), periods=10) as emulator:
+            store = EurostatStore(emulator.url_for('eurostat'))
+            resource = store.get('DS0')
+            resource.dsd_cache = DSDCache()
+            df = resource.refresh()
+            self.assertEqual(df.shape, (10, 4))
+
+            # nothing is updated after the last refresh
+            count = emulator.request_count
+            tm.assert_frame_equal(resource.refresh(), df)
+            self.assertEqual(emulator.request_count, count + 1)
+
+            emulator.set_periods(12)
+            result = resource.refresh(overlap=2)
+            self.assertEqual(emulator.request_count, count + 2)
+            self.assertEqual(result.shape, (12, 4))
+
+            # observations since the overlapped periods are replaced
+            expected = store.get('DS0').read()
+            tm.assert_frame_equal(result['1998':], expected['1998':])
+            tm.assert_frame_equal(result[:'1997'], df[:'1997'])
+
+    def test_error_status(self):
+        with ProviderEmulator(datasets=1, dimensions=(2, 2), error_rate=1.) as emulator:
+            resource = EurostatStore(emulator.url_for('eurostat')).get('DS0')
+            resource.dsd_cache = DSDCache()
+            with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+                resource.dsd
+            with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+                resource.read()
+            with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+                resource.read(raw=True)
+            self.assertTrue(resource._raw_content is None)
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
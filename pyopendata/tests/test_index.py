@@ -0,0 +1,235 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import warnings
+
+import pandas.util.testing as tm
+
+from pyopendata import CKANStore, CKANPackage, CKANResource, EurostatStore, EurostatResource
+from pyopendata.util.emulator import ProviderEmulator
+from pyopendata.util.index import CKANIndex, EurostatCatalog
+
+
+class TestCKANIndex(tm.TestCase):
+
+    def setUp(self):
+        self.emulator = ProviderEmulator(packages=23, rows_max=5).start()
+        self.store = CKANStore(self.emulator.url_for('ckan'))
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'ckan.sqlite')
+
+    def tearDown(self):
+        self.emulator.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_sync(self):
+        index = self.store.get_index(path=self.path)
+        self.assertEqual(len(index), 23)
+        self.assertEqual(index.last_modified, '2015-01-01T00:00:22')
+        self.assertEqual(index.tags, ['tag-0', 'tag-1', 'tag-2', 'tag-3', 'tag-4'])
+        self.assertEqual(index.groups, ['group-0', 'group-1', 'group-2'])
+        self.assertEqual(index.formats, ['CSV'])
+        index.close()
+
+        self.emulator.modify_package('package-3', title='Modified package',
+                                     resources=[{'format': 'JSON', 'size': 2000}])
+        self.emulator.delete_package('package-4')
+
+        # reopened index retrieves only the modified packages
+        count = self.emulator.request_count
+        index = CKANIndex(self.store, path=self.path)
+        self.assertEqual(index.sync(), 2)
+        # search and package_list
+        self.assertEqual(self.emulator.request_count, count + 2)
+        self.assertEqual(len(index), 22)
+        self.assertEqual(index.last_modified, '2015-01-01T00:00:23')
+
+        result = index.search_package('modified')
+        self.assertEqual(len(result), 1)
+        self.assertTrue(isinstance(result[0], CKANPackage))
+        self.assertEqual(result[0].name, 'package-3')
+        self.assertEqual(len(result[0].resources), 2)
+        self.assertEqual(self.emulator.request_count, count + 2)
+        self.assertEqual(index.search_package('package-4'), [])
+
+        # all the packages are retrieved again
+        self.assertEqual(index.sync(full=True), 22)
+        self.assertEqual(len(index), 22)
+        self.assertEqual(len(index.search_package('modified')), 1)
+
+    def test_search(self):
+        self.emulator.modify_package('package-5', resources=[{'format': 'json', 'size': 100},
+                                                             {'size': 5000}])
+        index = self.store.get_index(path=':memory:')
+
+        # words are matched as tokens
+        result = index.search_package('package-1')
+        self.assertEqual([p.name for p in result], ['package-1'])
+        self.assertEqual(len(index.search_package('synthetic package')), 23)
+        result = index.search_package('package', tags='tag-1')
+        self.assertEqual([p.name for p in result], ['package-1', 'package-6', 'package-11',
+                                                    'package-16', 'package-21'])
+        result = index.search_package(tags='tag-1', groups=['group-0'])
+        self.assertEqual([p.name for p in result], ['package-6', 'package-21'])
+        self.assertEqual(len(index.search_package(groups='group-2', limit=3)), 3)
+
+        result = index.search_package(formats='JSON')
+        self.assertEqual([p.name for p in result], ['package-5'])
+        self.assertEqual(len(index.search_package(formats=['json', 'csv'])), 23)
+        result = index.search_package(min_size=1000)
+        self.assertEqual([p.name for p in result], ['package-5'])
+        # a single resource must satisfy all the conditions
+        self.assertEqual(index.search_package(formats='JSON', min_size=1000), [])
+
+        result = index.search_resource('package-5', max_size=1000)
+        self.assertEqual(len(result), 1)
+        self.assertTrue(isinstance(result[0], CKANResource))
+        self.assertEqual(result[0].id, 'package-5-resource-0')
+        self.assertEqual(result[0].format, 'JSON')
+        self.assertEqual(len(index.search_resource(formats='CSV')), 45)
+
+    def test_search_without_fts(self):
+        index = CKANIndex(self.store, path=':memory:')
+        index.fts = None
+        index.sync()
+        # words are matched as substrings
+        self.assertEqual(len(index.search_package('package-1')), 11)
+        self.assertEqual(len(index.search_package('package-1', tags='tag-1')), 3)
+
+    def test_store(self):
+        index = self.store.get_index(path=':memory:')
+
+        # the store uses the index
+        count = self.emulator.request_count
+        result = self.store.search_package('package-1')
+        self.assertEqual([p.name for p in result], ['package-1'])
+        self.assertEqual(self.store.tags, ['tag-0', 'tag-1', 'tag-2', 'tag-3', 'tag-4'])
+        self.assertEqual(self.store.groups, ['group-0', 'group-1', 'group-2'])
+        result = self.store.search_resource('package-1')
+        self.assertEqual([r.id for r in result],
+                         ['package-1-resource-0', 'package-1-resource-1'])
+        self.assertEqual([r.id for r in self.store.search('package-1')],
+                         ['package-1-resource-0', 'package-1-resource-1'])
+        self.assertEqual(self.emulator.request_count, count)
+
+        # keywords of package_search are not supported by the index
+        self.assertEqual(len(self.store.search_package('package-1', rows=10)), 11)
+        self.assertTrue(self.emulator.request_count > count)
+
+        index.close()
+        count = self.emulator.request_count
+        self.assertEqual(len(self.store.tags), 5)
+        self.assertEqual(self.emulator.request_count, count + 1)
+
+    def test_sync_fallback(self):
+        index = self.store.get_index(path=self.path)
+        self.emulator.modify_package('package-3', title='Modified package')
+        self.emulator.disabled_actions.add('package_search')
+
+        # incremental sync is not available, retrieve all the packages
+        self.assertEqual(index.sync(), 23)
+        self.assertEqual(len(index.search_package('modified')), 1)
+
+
+class TestEurostatCatalog(tm.TestCase):
+
+    def setUp(self):
+        self.emulator = ProviderEmulator(datasets=12).start()
+        self.store = EurostatStore(self.emulator.url_for('eurostat'))
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'eurostat.sqlite')
+
+    def tearDown(self):
+        self.emulator.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_refresh(self):
+        catalog = self.store.get_catalog(path=self.path)
+        self.assertEqual(len(catalog), 12)
+        datasets = catalog.datasets
+        self.assertTrue(isinstance(datasets[0], EurostatResource))
+        self.assertEqual([d.id for d in datasets[:3]], ['DS0', 'DS1', 'DS2'])
+        self.assertEqual(datasets[1].name, 'Synthetic dataset 1')
+        catalog.close()
+
+        # persisted catalog is used without requests within ttl
+        count = self.emulator.request_count
+        catalog = self.store.get_catalog(path=self.path)
+        self.assertEqual(len(catalog), 12)
+        self.assertEqual(self.emulator.request_count, count)
+
+        # revalidated by ETag
+        catalog = self.store.get_catalog(path=self.path, ttl=0)
+        self.assertFalse(catalog.refresh())
+        self.assertEqual(self.emulator.request_count, count + 2)
+
+        self.emulator.set_datasets(15)
+        self.assertFalse(self.store.get_catalog(path=self.path).refresh())
+        self.assertTrue(catalog.refresh())
+        self.assertEqual(len(catalog), 15)
+        self.assertEqual(len(catalog.search('dataset 14')), 1)
+
+        self.assertFalse(catalog.refresh(force=False))
+        self.assertTrue(catalog.refresh(force=True))
+
+    def test_refresh_error(self):
+        catalog = self.store.get_catalog(path=self.path, ttl=0)
+        self.assertEqual(len(catalog), 12)
+
+        # stored dataflows are used if the list is unavailable
+        self.emulator.error_rate = 1.
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            self.assertFalse(catalog.refresh())
+        self.assertEqual(len(w), 1)
+        self.assertTrue(issubclass(w[0].category, UserWarning))
+        self.assertEqual(len(catalog.datasets), 12)
+        self.assertEqual(len(catalog.search('dataset 1')), 1)
+
+        with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+            catalog.refresh(force=True)
+
+        empty = self.store.get_catalog(path=':memory:', refresh=False)
+        with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+            empty.refresh()
+
+    def test_search(self):
+        catalog = self.store.get_catalog(path=':memory:')
+        result = catalog.search('Synthetic DATASET 1')
+        self.assertEqual([r.id for r in result], ['DS1'])
+        self.assertEqual(len(catalog.search('synthetic')), 12)
+        self.assertEqual(len(catalog.search('synthetic', limit=5)), 5)
+        self.assertEqual(catalog.search('XXX'), [])
+
+        catalog.fts = None
+        # words are matched as substrings
+        result = catalog.search('Synthetic DATASET 1')
+        self.assertEqual([r.id for r in result], ['DS1', 'DS10', 'DS11'])
+
+    def test_store(self):
+        cache_dir = os.environ.get('PYOPENDATA_CACHE_DIR')
+        os.environ['PYOPENDATA_CACHE_DIR'] = self.directory
+        try:
+            store = EurostatStore(self.emulator.url_for('eurostat'))
+            self.assertEqual(len(store.datasets), 12)
+            self.assertEqual([r.id for r in store.search('dataset 3')], ['DS3'])
+
+            # other sessions use the persisted catalog
+            count = self.emulator.request_count
+            store = EurostatStore(self.emulator.url_for('eurostat'))
+            self.assertEqual(len(store.datasets), 12)
+            self.assertEqual(self.emulator.request_count, count)
+        finally:
+            if cache_dir is None:
+                del os.environ['PYOPENDATA_CACHE_DIR']
+            else:
+                os.environ['PYOPENDATA_CACHE_DIR'] = cache_dir
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
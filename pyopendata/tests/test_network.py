@@ -0,0 +1,143 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import requests
+
+import pandas.util.testing as tm
+
+from pyopendata import DataStore, EurostatResource
+from pyopendata.util import network
+
+
+class TestSessionPool(tm.TestCase):
+
+    def test_session_per_host(self):
+        pool = network.SessionPool(pool_maxsize=4)
+
+        s1 = pool.get_session('http://api.worldbank.org/countries')
+        s2 = pool.get_session('http://api.worldbank.org/indicators?format=json')
+        s3 = pool.get_session('https://api.worldbank.org/countries')
+        s4 = pool.get_session('http://stats.oecd.org/SDMX-JSON/data')
+
+        self.assertTrue(isinstance(s1, requests.Session))
+        self.assertTrue(s1 is s2)
+        self.assertFalse(s1 is s3)
+        self.assertFalse(s1 is s4)
+
+        adapter = s1.get_adapter('http://api.worldbank.org')
+        self.assertEqual(adapter._pool_maxsize, 4)
+
+        pool.close()
+        s5 = pool.get_session('http://api.worldbank.org/countries')
+        self.assertFalse(s1 is s5)
+
+    def test_default_pool(self):
+        original = network.get_default_pool()
+        try:
+            store = DataStore('eurostat')
+            resource = EurostatResource(id='cdh_e_fos')
+            self.assertTrue(store.session_pool is original)
+            self.assertTrue(resource.session_pool is original)
+
+            pool = network.set_default_pool(pool_maxsize=20)
+            self.assertTrue(network.get_default_pool() is pool)
+            self.assertEqual(pool.pool_maxsize, 20)
+            self.assertTrue(store.session_pool is pool)
+
+            custom = network.SessionPool()
+            resource.session_pool = custom
+            self.assertTrue(resource.session_pool is custom)
+            self.assertTrue(store.session_pool is pool)
+        finally:
+            network.set_default_pool(original)
+
+
+class TestImapThreads(tm.TestCase):
+
+    def test_order(self):
+        threads = set()
+
+        def func(x):
+            threads.add(threading.current_thread().ident)
+            # later items finish earlier
+            time.sleep(0.01 * (10 - x))
+            return x * 2
+
+        result = list(network.imap_threads(func, range(10), max_workers=4))
+        self.assertEqual(result, [x * 2 for x in range(10)])
+        self.assertTrue(1 < len(threads) <= 4)
+
+        result = list(network.imap_threads(func, range(3)))
+        self.assertEqual(result, [0, 2, 4])
+
+    def test_error(self):
+        def func(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        with tm.assertRaises(ValueError):
+            list(network.imap_threads(func, range(5), max_workers=2))
+        with tm.assertRaises(ValueError):
+            list(network.imap_threads(func, range(5), max_workers=2, max_pending=2))
+
+    def test_max_pending(self):
+        started = []
+
+        def func(x):
+            started.append(x)
+            time.sleep(0.01 * (5 - x % 5))
+            return x * 2
+
+        results = network.imap_threads(func, range(20), max_workers=4, max_pending=2)
+        self.assertEqual(next(results), 0)
+        time.sleep(0.05)
+        self.assertTrue(len(started) <= 3)
+        self.assertEqual(list(results), [x * 2 for x in range(1, 20)])
+
+
+class TestImapThreadsUnordered(tm.TestCase):
+
+    def test_completion_order(self):
+        def func(x):
+            time.sleep(0.02 * (4 - x))
+            return x * 2
+
+        result = list(network.imap_threads_unordered(func, range(4), max_workers=4))
+        self.assertEqual(result, [(x, x * 2, None) for x in [3, 2, 1, 0]])
+
+    def test_max_pending(self):
+        started = []
+
+        def func(x):
+            started.append(x)
+            return x
+
+        results = network.imap_threads_unordered(func, range(100), max_workers=2,
+                                                 max_pending=3)
+        next(results)
+        time.sleep(0.05)
+        # consumed one, and at most 3 are pending
+        self.assertTrue(len(started) <= 4)
+        self.assertEqual(len(list(results)), 99)
+        self.assertEqual(sorted(started), list(range(100)))
+
+    def test_error(self):
+        def func(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        result = sorted(network.imap_threads_unordered(func, range(5), max_workers=2),
+                        key=lambda x: x[0])
+        self.assertEqual([r[1] for r in result], [0, 1, 2, None, 4])
+        self.assertTrue(isinstance(result[3][2], ValueError))
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
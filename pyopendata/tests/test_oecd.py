@@ -1,6 +1,7 @@
 # pylint: disable-msg=E1101,W0613,W0603
 
 from pyopendata import OECDStore, OECDResource
+from pyopendata.util.emulator import ProviderEmulator
 
 import numpy as np
 import pandas as pd
@@ -78,6 +79,118 @@ class TestOECDTestSite(tm.TestCase):
             tm.assert_series_equal(df[label]['Total international arrivals'], expected)
 
 
+class TestOECDResource(tm.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.emulator = ProviderEmulator(datasets=2, dimensions=(8, 3, 2), periods=10).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.emulator.stop()
+
+    def setUp(self):
+        self.store = OECDStore(self.emulator.url_for('oecd'))
+
+    def test_key(self):
+        resource = self.store.get('DS0')
+        df = resource.read()
+        self.assertEqual(df.shape, (10, 48))
+
+        result = resource.read(key='C1+C3..C0')
+        self.assertEqual(result.shape, (10, 6))
+        tm.assert_frame_equal(result, df[result.columns])
+
+        result = resource.read(key=[['C1', 'C3'], [], 'C0'])
+        self.assertEqual(result.shape, (10, 6))
+
+        with tm.assertRaises(ValueError):
+            resource.read(key=1)
+        # dimension ids are unknown
+        with tm.assertRaisesRegexp(ValueError, 'dict is not supported'):
+            resource.read(key={'D0': 'C1'})
+
+    def test_time(self):
+        resource = self.store.get('DS1')
+        df = resource.read()
+
+        result = resource.read(start_time=1992, end_time='1995')
+        tm.assert_frame_equal(result, df['1992':'1995'])
+
+    def test_split(self):
+        resource = self.store.get('DS0', max_workers=3)
+        key = [['C{0}'.format(i) for i in range(8)], ['C0', 'C2'], ['C0', 'C1']]
+        expected = resource.read(key=key)
+        self.assertEqual(expected.shape, (10, 32))
+
+        resource = self.store.get('DS0', max_workers=3)
+        resource.max_series = 8
+        queries = resource._build_queries(key=key)
+        self.assertEqual(len(queries), 4)
+        # number of series is unknown if any dimension is not filtered
+        self.assertEqual(len(resource._build_queries(key=key[:2] + [[]])), 1)
+
+        count = self.emulator.request_count
+        result = resource.read(key=key)
+        self.assertEqual(self.emulator.request_count, count + 4)
+        tm.assert_frame_equal(result, expected[result.columns])
+        self.assertEqual(sorted(result.columns), sorted(expected.columns))
+
+        # contents are kept for the last query
+        resource.read(key=key)
+        self.assertEqual(self.emulator.request_count, count + 4)
+        with tm.assertRaises(ValueError):
+            resource.read(raw=True, key=key)
+
+        resource.max_series = 1000
+        resource.max_url_length = len(resource._query_url([['C0'], ['C0'], ['C0', 'C1']])) + 2
+        self.assertEqual(len(resource._build_queries(key=key)), 16)
+
+    def test_split_no_records(self):
+        resource = self.store.get('DS0')
+        resource.max_series = 2
+        key = [['C0', 'C1', 'X0', 'X1'], 'C0', 'C0']
+        self.assertEqual(len(resource._build_queries(key=key)), 2)
+
+        # part selecting no series is skipped
+        result = resource.read(key=key)
+        expected = self.store.get('DS0').read(key=[['C0', 'C1'], 'C0', 'C0'])
+        tm.assert_frame_equal(result, expected)
+
+        with tm.assertRaisesRegexp(ValueError, 'No data is found'):
+            resource.read(key=[['X0', 'X1', 'X2'], 'C0', 'C0'])
+        with tm.assertRaisesRegexp(ValueError, 'No data is found'):
+            resource.read(raw=True, key='X0.C0.C0')
+
+    def test_split_error(self):
+        with ProviderEmulator(datasets=1, dimensions=(2, 2), error_rate=1.) as emulator:
+            resource = OECDStore(emulator.url_for('oecd')).get('DS0')
+            with tm.assertRaisesRegexp(ValueError, 'HTTP status 500'):
+                resource.read(key=[['C0', 'C1'], []])
+
+    def test_refresh(self):
+        with ProviderEmulator(datasets=1, dimensions=(2, 2), periods=10) as emulator:
+            store = OECDStore(emulator.url_for('oecd'))
+            resource = store.get('DS0')
+            df = resource.refresh()
+            self.assertEqual(df.shape, (10, 4))
+
+            emulator.set_periods(12)
+            count = emulator.request_count
+            result = resource.refresh()
+            self.assertEqual(emulator.request_count, count + 1)
+            self.assertEqual(result.shape, (12, 4))
+
+            expected = store.get('DS0').read()
+            tm.assert_frame_equal(result['1999':], expected['1999':])
+            tm.assert_frame_equal(result[:'1998'], df[:'1998'])
+
+            # refresh the given data
+            result = store.get('DS0').refresh(data=df[:'1995'], overlap=3)
+            tm.assert_frame_equal(result['1993':], expected['1993':])
+            tm.assert_frame_equal(result[:'1992'], df[:'1992'])
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
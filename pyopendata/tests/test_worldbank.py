@@ -1,5 +1,7 @@
 # pylint: disable-msg=E1101,W0613,W0603
 
+import warnings
+
 from pyopendata import WorldBankStore, WorldBankResource
 
 import numpy as np
@@ -7,6 +9,8 @@ import pandas as pd
 from pandas.compat import range
 import pandas.util.testing as tm
 
+from pyopendata.util.emulator import ProviderEmulator
+
 
 class TestWorldBankTestSite(tm.TestCase):
 
@@ -105,6 +109,61 @@ class TestWorldBankTestSite(tm.TestCase):
         self.assertTrue(len(raw_data) > 0)
 
 
+class TestWorldBankResource(tm.TestCase):
+
+    def test_read_cached_contents(self):
+        contents = []
+        for country in ['Japan', 'United States']:
+            for year, value in [('2011', '1.5'), ('2012', None), ('2013', '3.5')]:
+                contents.append({'date': year, 'decimal': '1', 'value': value,
+                                 'country': {'id': country[:2], 'value': country},
+                                 'indicator': {'id': 'X', 'value': 'Indicator X'}})
+
+        resource = WorldBankResource(id='X', url='http://api.worldbank.org')
+        resource._raw_content = contents
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            df = resource.read()
+        # warned only once
+        self.assertEqual(len(w), 1)
+
+        exp_col = pd.MultiIndex.from_product([['Indicator X'], ['Japan', 'United States']],
+                                             names=['indicator', 'country'])
+        exp_idx = pd.DatetimeIndex(['2011', '2013'], name='date')
+        expected = pd.DataFrame([[1.5, 1.5], [3.5, 3.5]], index=exp_idx, columns=exp_col)
+        tm.assert_frame_equal(df, expected)
+
+        # cached contents must not be modified
+        self.assertEqual(contents[0]['date'], '2011')
+        self.assertEqual(contents[0]['country'], {'id': 'Ja', 'value': 'Japan'})
+
+    def test_refresh(self):
+        with ProviderEmulator(datasets=1, periods=10, countries=20) as emulator:
+            store = WorldBankStore(emulator.url_for('worldbank'))
+            resource = store.get('IND0')
+            resource.entries_per_page = 30
+            df = resource.refresh()
+            self.assertEqual(df.shape, (10, 20))
+
+            emulator.set_periods(12)
+            count = emulator.request_count
+            result = resource.refresh()
+            # 3 periods of 20 countries in 2 pages
+            self.assertEqual(emulator.request_count, count + 2)
+            self.assertEqual(result.shape, (12, 20))
+
+            expected = store.get('IND0').read()
+            tm.assert_frame_equal(result['1999':], expected['1999':])
+            tm.assert_frame_equal(result[:'1998'], df[:'1998'])
+
+    def test_no_pages(self):
+        resource = WorldBankResource(id='X', url='http://api.worldbank.org')
+        # meta of no matched entries
+        resource._read_page = lambda page, dates=None: ({'page': 0, 'pages': 0}, None)
+        self.assertEqual(resource._read_pagenate(), [])
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule(argv=[__file__, '-vvs', '-x', '--pdb', '--pdb-failure'], exit=False)
@@ -8,6 +8,7 @@ from pandas.compat import u, bytes_to_str, range, iterkeys, iteritems
 
 from pyopendata.base import DataStore, DataResource
 import pyopendata.io.sdmx as sdmx
+from pyopendata.io.util import _json_loads
 
 
 
@@ -46,8 +47,7 @@ class UNdataStore(DataStore):
             # replace 1st Nodes to "Nodes"
             content = bytes_to_str(response.content)
             content = content.replace(str('Nodes'), str('"Nodes"'), 1)
-            import json
-            result = json.loads(content)
+            result = _json_loads(content)
             nodes = result['Nodes']
 
             # import html.parser
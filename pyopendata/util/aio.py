@@ -0,0 +1,106 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+"""
+asyncio support for stores and resources. Requires Python 3.5 or later and aiohttp.
+
+Resources describe requests required by ``read`` as ``_Prefetch``. Responses are
+retrieved asynchronously and stored to the resource caches via the callbacks,
+then ``read`` parses them without blocking requests.
+"""
+
+import asyncio
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _check_aiohttp():
+    if aiohttp is None:
+        raise ImportError('aiohttp is required for asynchronous requests')
+
+
+class _SessionContext(object):
+
+    # asynchronous context manager to close session only when created here
+
+    def __init__(self, session, pool):
+        self.session = session
+        self.pool = pool
+        self.created = None
+
+    async def __aenter__(self):
+        if self.session is not None:
+            return self.session
+        connector = aiohttp.TCPConnector(limit_per_host=self.pool.pool_maxsize)
+        self.created = aiohttp.ClientSession(connector=connector)
+        return self.created
+
+    async def __aexit__(self, *args):
+        if self.created is not None:
+            await self.created.close()
+
+
+async def _fetch(session, prefetch, proxies=None):
+    proxy = None
+    if proxies:
+        proxy = proxies.get(urlparse(prefetch.url).scheme)
+
+    async with session.get(prefetch.url, params=prefetch.params, proxy=proxy) as resp:
+        content = await resp.read()
+
+        # callbacks share the logic with synchronous requests
+        response = requests.models.Response()
+        response.status_code = resp.status
+        response.headers = CaseInsensitiveDict(resp.headers)
+        response.url = str(resp.url)
+        response.encoding = resp.charset
+        response._content = content
+        response._content_consumed = True
+    return response
+
+
+async def _run(prefetches, session, proxies=None, resource=None):
+    pending = list(prefetches)
+    while len(pending) > 0:
+        responses = await asyncio.gather(*[_fetch(session, p, proxies=proxies)
+                                           for p in pending])
+        followings = []
+        for prefetch, response in zip(pending, responses):
+            if resource is not None:
+                resource._record_validators(prefetch.url, prefetch.params, response.headers)
+            followings.extend(prefetch.callback(response) or [])
+        pending = followings
+
+
+async def aread(resource, raw=False, session=None, cache=None, **kwargs):
+    """
+    Coroutine version of ``DataResource.read``
+    """
+    _check_aiohttp()
+    async with _SessionContext(session, resource.session_pool) as s:
+        await _run(resource._prefetch(**kwargs), s, proxies=resource.proxies,
+                   resource=resource)
+    if raw:
+        return resource.read(raw=raw, **kwargs)
+    result_cache = resource._get_result_cache(cache)
+    if result_cache is not None:
+        # the source is not revalidated by blocking requests in the loop
+        return resource._read_cached(result_cache, prefetched=True, **kwargs)
+    return resource._read(**kwargs)
+
+
+async def aget(store, name, session=None, **kwargs):
+    """
+    Coroutine version of ``DataStore.get``
+    """
+    _check_aiohttp()
+    found = []
+    async with _SessionContext(session, store.session_pool) as s:
+        await _run(store._get_prefetch(name, found, **kwargs), s, proxies=store.proxies)
+    return found[0]
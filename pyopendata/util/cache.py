@@ -0,0 +1,736 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+from __future__ import unicode_literals
+from __future__ import division
+
+import errno
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import pandas as pd
+import pandas.compat as compat
+
+
+def get_cache_dir():
+    """
+    Return the root directory for on-disk caches.
+    Uses ``PYOPENDATA_CACHE_DIR`` environment variable if specified,
+    otherwise ``~/.pyopendata``
+    """
+    path = os.environ.get('PYOPENDATA_CACHE_DIR')
+    if path is None:
+        path = os.path.join(os.path.expanduser('~'), '.pyopendata')
+    return path
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        # other process may create the same directory
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def _hash_key(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(repr(part).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _atomic_write(path, data):
+    """
+    Write bytes to the path via temporary file and rename,
+    so that other processes never see partially written file
+    """
+    dirname = os.path.dirname(path)
+    _makedirs(dirname)
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        _replace(tmp, path)
+    except Exception:
+        _remove(tmp)
+        raise
+
+
+def _replace(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError:
+        # Python 2 doesn't have os.replace, rename is atomic on POSIX
+        os.rename(src, dst)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _CachingStream(object):
+    """
+    Wrap raw stream of a streamed response to write chunks to the cache file
+    as they are read. The cache file is replaced when the stream is exhausted,
+    and discarded if the stream is closed before
+    """
+
+    def __init__(self, raw, path, header):
+        self._raw = raw
+        self._path = path
+        dirname = os.path.dirname(path)
+        _makedirs(dirname)
+        fd, self._tmp = tempfile.mkstemp(dir=dirname, prefix='.tmp')
+        self._fh = os.fdopen(fd, 'wb')
+        self._fh.write(header)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        try:
+            for chunk in self._raw.stream(amt, decode_content=decode_content):
+                if self._fh is not None:
+                    self._fh.write(chunk)
+                yield chunk
+        except Exception:
+            self._discard()
+            raise
+        self._complete()
+
+    def read(self, amt=None, *args, **kwargs):
+        chunk = self._raw.read(amt, *args, **kwargs)
+        if self._fh is not None:
+            self._fh.write(chunk)
+        if amt is None or not chunk:
+            self._complete()
+        return chunk
+
+    def close(self):
+        self._discard()
+        self._raw.close()
+
+    def _complete(self):
+        if self._fh is None:
+            return
+        self._fh.close()
+        self._fh = None
+        try:
+            _replace(self._tmp, self._path)
+        except OSError:
+            _remove(self._tmp)
+
+    def _discard(self):
+        if self._fh is None:
+            return
+        self._fh.close()
+        self._fh = None
+        _remove(self._tmp)
+
+
+class _CachedStream(object):
+    """
+    Raw stream of a response read from the cache file, closed at the end
+    """
+
+    def __init__(self, fh):
+        self._fh = fh
+
+    def read(self, amt=None, *args, **kwargs):
+        chunk = self._fh.read() if amt is None else self._fh.read(amt)
+        if amt is None or not chunk:
+            self._fh.close()
+        return chunk
+
+    def close(self):
+        self._fh.close()
+
+
+class HTTPCache(object):
+
+    """On-disk cache of HTTP responses, keyed by URL and params
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory to store responses. Default is ``http`` under ``get_cache_dir()``
+    ttl : int or float, optional
+        Seconds to regard the cached response as fresh without accessing the server.
+        If None, a cached response is always revalidated by a conditional GET
+        (``If-None-Match`` / ``If-Modified-Since``).
+    offline : bool, default False
+        If True, never access the server and only return cached responses.
+        ``requests.exceptions.ConnectionError`` is raised when the response is not cached.
+
+    Notes
+    -----
+    Each response is stored as a single file and replaced atomically,
+    thus the cache can be shared by multiple processes."""
+
+    def __init__(self, directory=None, ttl=None, offline=False):
+        if directory is None:
+            directory = os.path.join(get_cache_dir(), 'http')
+        self.directory = directory
+        self.ttl = ttl
+        self.offline = offline
+
+    def _normalize_url(self, url, params=None):
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        request = requests.Request('GET', url, params=params)
+        return request.prepare().url
+
+    def _path(self, url):
+        key = _hash_key(url)
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load(self, path, stream=False):
+        """
+        Return tuple of meta, content and mtime. If stream, content is the file
+        positioned at the beginning of the content
+        """
+        try:
+            fh = open(path, 'rb')
+        except (IOError, OSError):
+            return None
+        try:
+            meta = json.loads(fh.readline().decode('utf-8'))
+            mtime = os.path.getmtime(path)
+            content = fh if stream else fh.read()
+        except (IOError, OSError, ValueError):
+            fh.close()
+            return None
+        if not stream:
+            fh.close()
+        return meta, content, mtime
+
+    def _header(self, url, response):
+        headers = dict((k, v) for k, v in response.headers.items()
+                       if k.lower() not in ('content-encoding', 'transfer-encoding',
+                                            'content-length', 'connection'))
+        meta = dict(url=url, headers=headers, encoding=response.encoding)
+        return json.dumps(meta).encode('utf-8') + b'\n'
+
+    def _store(self, path, url, response):
+        _atomic_write(path, self._header(url, response) + response.content)
+
+    def _build_response(self, url, meta, content):
+        response = requests.models.Response()
+        response.status_code = 200
+        response.url = url
+        response.headers = CaseInsensitiveDict(meta.get('headers', {}))
+        response.encoding = meta.get('encoding')
+        if hasattr(content, 'read'):
+            # content is read from the file as iterated
+            length = os.fstat(content.fileno()).st_size - content.tell()
+            response.raw = _CachedStream(content)
+        else:
+            length = len(content)
+            response._content = content
+            response._content_consumed = True
+        response.headers['content-length'] = str(length)
+        return response
+
+    def get(self, pool, url, params=None, proxies=None, **kwargs):
+        """
+        Issue GET request via the cache
+
+        Parameters
+        ----------
+        pool : SessionPool
+            Pool used to access the server
+        url : str
+        params : dict, optional
+        proxies : dict, optional
+        kwargs :
+            Keywords passed to ``SessionPool.get``. If ``stream=True``, the content
+            is written to and read from the cache file by chunks as iterated
+
+        Returns
+        -------
+        response : requests.Response
+        """
+        url = self._normalize_url(url, params=params)
+        path = self._path(url)
+        stream = kwargs.get('stream', False)
+        cached = self._load(path, stream=stream)
+
+        if cached is not None:
+            meta, content, mtime = cached
+            fresh = self.ttl is not None and (time.time() - mtime) < self.ttl
+            if fresh or self.offline:
+                return self._build_response(url, meta, content)
+        elif self.offline:
+            msg = 'Response is not cached for {0} in offline mode'
+            raise requests.exceptions.ConnectionError(msg.format(url))
+
+        headers = kwargs.pop('headers', None) or {}
+        if cached is not None:
+            cached_headers = CaseInsensitiveDict(meta.get('headers', {}))
+            if 'etag' in cached_headers:
+                headers['If-None-Match'] = cached_headers['etag']
+            if 'last-modified' in cached_headers:
+                headers['If-Modified-Since'] = cached_headers['last-modified']
+
+        try:
+            response = pool.get(url, proxies=proxies, headers=headers, **kwargs)
+        except Exception:
+            if stream and cached is not None:
+                content.close()
+            raise
+
+        if response.status_code == 304 and cached is not None:
+            # release the connection of the live response
+            response.close()
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+            return self._build_response(url, meta, content)
+        if stream and cached is not None:
+            content.close()
+        if response.status_code == 200:
+            if stream and not response._content_consumed:
+                # stored while the content is iterated, rather than held in memory
+                response.raw = _CachingStream(response.raw, path, self._header(url, response))
+            else:
+                self._store(path, url, response)
+        return response
+
+    def clear(self):
+        """
+        Remove all the cached responses
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                try:
+                    os.remove(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """
+    Return the HTTPCache used by all stores and resources by default.
+    None means responses are not cached on disk.
+    """
+    return _default_cache
+
+
+def set_default_cache(cache=None, **kwargs):
+    """
+    Set the HTTPCache used by all stores and resources
+
+    Parameters
+    ----------
+    cache : HTTPCache, False or None
+        If None, a new HTTPCache is created from kwargs.
+        If False, disable the on-disk cache.
+    kwargs :
+        Keywords passed to HTTPCache
+
+    Returns
+    -------
+    cache : HTTPCache or None
+    """
+    global _default_cache
+    if cache is None:
+        cache = HTTPCache(**kwargs)
+    elif cache is False:
+        cache = None
+    _default_cache = cache
+    return cache
+
+
+class DSDCache(object):
+
+    """Process-wide cache of parsed data structure definitions (DSD)
+
+    Parameters
+    ----------
+    directory : str, optional
+        If specified, parsed DSDs are also stored in the directory
+        and shared by processes.
+    ttl : int or float, optional
+        Seconds to regard the cached DSD as valid. If None, the cached DSD is
+        used until invalidated.
+
+    Notes
+    -----
+    DSDs are keyed by a tuple such as (source URL, agency, DSD id, version).
+    Concurrent loads of the same DSD are performed only once.
+    ``codelists`` is used to share identical codelists among DSDs."""
+
+    def __init__(self, directory=None, ttl=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.codelists = {}
+
+        self._values = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _path(self, key):
+        return os.path.join(self.directory, _hash_key(*key) + '.pickle')
+
+    def _is_fresh(self, loaded):
+        return self.ttl is None or (time.time() - loaded) < self.ttl
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fh:
+                value = pickle.load(fh)
+            loaded = os.path.getmtime(path)
+        except (IOError, OSError, EOFError, ValueError, TypeError, AttributeError,
+                pickle.UnpicklingError):
+            # missing, broken or incompatible with current version
+            return None
+        if not self._is_fresh(loaded):
+            return None
+        return value, loaded
+
+    def lookup(self, key):
+        """
+        Return the cached DSD, or None if not cached
+
+        Parameters
+        ----------
+        key : tuple
+        """
+        cached = self._values.get(key)
+        if cached is None:
+            cached = self._load(key)
+            if cached is None:
+                return None
+            self._values[key] = cached
+        value, loaded = cached
+        if not self._is_fresh(loaded):
+            return None
+        return value
+
+    def put(self, key, value):
+        """
+        Store the DSD to the cache
+
+        Parameters
+        ----------
+        key : tuple
+        value : object
+        """
+        self._values[key] = (value, time.time())
+        if self.directory is not None:
+            _atomic_write(self._path(key), pickle.dumps(value, protocol=2))
+
+    def get(self, key, loader):
+        """
+        Return the cached DSD. If not cached, call loader to load and cache it.
+
+        Parameters
+        ----------
+        key : tuple
+        loader : callable
+            Called without arguments to load DSD. Exceptions are not cached.
+        """
+        value = self.lookup(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:
+            # other thread may have loaded during waiting
+            value = self.lookup(key)
+            if value is None:
+                value = loader()
+                self.put(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Remove the DSD from the cache
+
+        Parameters
+        ----------
+        key : tuple, optional
+            If None, remove all the DSDs and codelists
+        """
+        if key is None:
+            keys = list(self._values.keys())
+            self.codelists.clear()
+        else:
+            keys = [key]
+        for k in keys:
+            self._values.pop(k, None)
+
+        if self.directory is None:
+            return
+        if key is None:
+            paths = [os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                     if f.endswith('.pickle')] if os.path.isdir(self.directory) else []
+        else:
+            paths = [self._path(key)]
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_default_dsd_cache = DSDCache()
+
+
+def get_default_dsd_cache():
+    """
+    Return the DSDCache used by all resources by default
+    """
+    return _default_dsd_cache
+
+
+def set_default_dsd_cache(cache=None, **kwargs):
+    """
+    Set the DSDCache used by all resources
+
+    Parameters
+    ----------
+    cache : DSDCache, optional
+        If None, a new DSDCache is created from kwargs.
+        To store DSDs on disk, specify ``directory``, for example
+        ``os.path.join(get_cache_dir(), 'dsd')``.
+    kwargs :
+        Keywords passed to DSDCache
+
+    Returns
+    -------
+    cache : DSDCache
+    """
+    global _default_dsd_cache
+    if cache is None:
+        cache = DSDCache(**kwargs)
+    _default_dsd_cache = cache
+    return cache
+
+
+class ResultCache(object):
+
+    """On-disk store of parsed DataFrames in a columnar format. Requires pyarrow.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Directory to store results. Default is ``results`` under ``get_cache_dir()``
+    format : {'parquet', 'feather'}, default 'parquet'
+        Parquet is compressed and smaller. Feather (Arrow IPC) is not compressed,
+        and is reloaded faster via memory mapping.
+    ttl : int or float, optional
+        Seconds to use stored results without checking the source. If None,
+        the source is revalidated by ETag / Last-Modified on every read.
+
+    Notes
+    -----
+    Index, MultiIndex columns and their names are restored via the pandas
+    metadata of Arrow. Results are keyed by the queries and keywords of ``read``."""
+
+    _formats = ('parquet', 'feather')
+    _metadata_key = b'pyopendata'
+    # Arrow flattens MultiIndex with a single level
+    _levels_key = b'pyopendata_levels'
+
+    def __init__(self, directory=None, format='parquet', ttl=None):
+        if format not in self._formats:
+            raise ValueError("format must be one of {0}".format(', '.join(self._formats)))
+        if directory is None:
+            directory = os.path.join(get_cache_dir(), 'results')
+        self.directory = directory
+        self.format = format
+        self.ttl = ttl
+
+    def _path(self, key):
+        return os.path.join(self.directory, '{0}.{1}'.format(_hash_key(*key), self.format))
+
+    def is_fresh(self, key):
+        """
+        Whether the stored result can be used without checking the source
+        """
+        if self.ttl is None:
+            return False
+        try:
+            return (time.time() - os.path.getmtime(self._path(key))) < self.ttl
+        except OSError:
+            return False
+
+    def touch(self, key):
+        """
+        Mark the stored result as validated now
+        """
+        try:
+            os.utime(self._path(key), None)
+        except OSError:
+            pass
+
+    def load(self, key):
+        """
+        Return tuple of the stored DataFrame and its metadata, or None if not stored
+
+        Parameters
+        ----------
+        key : tuple
+        """
+        pa = _import_pyarrow()
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            if self.format == 'feather':
+                from pyarrow import feather
+                table = feather.read_table(path, memory_map=True)
+            else:
+                from pyarrow import parquet
+                table = parquet.read_table(path, memory_map=True)
+            metadata = table.schema.metadata or {}
+            meta = json.loads(metadata[self._metadata_key].decode('utf-8'))
+            levels = json.loads(metadata[self._levels_key].decode('utf-8'))
+            frame = table.to_pandas()
+        except (IOError, OSError, KeyError, ValueError, pa.ArrowException):
+            # broken or written by other version
+            return None
+
+        if levels['index'] and not isinstance(frame.index, pd.MultiIndex):
+            frame.index = pd.MultiIndex.from_arrays([frame.index])
+        if levels['columns'] and not isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = pd.MultiIndex.from_arrays([frame.columns])
+        return frame, meta
+
+    def put(self, key, frame, meta=None):
+        """
+        Store the DataFrame with metadata
+
+        Parameters
+        ----------
+        key : tuple
+        frame : pandas.DataFrame
+        meta : dict, optional
+            JSON serializable metadata, such as validators of the source
+
+        Returns
+        -------
+        stored : bool
+            False if the DataFrame can't be represented in Arrow
+        """
+        pa = _import_pyarrow()
+        try:
+            table = pa.Table.from_pandas(frame)
+        except (TypeError, ValueError, pa.ArrowException) as e:
+            warnings.warn('Unable to store the result: {0}'.format(e), UserWarning)
+            return False
+        metadata = dict(table.schema.metadata or {})
+        metadata[self._metadata_key] = json.dumps(meta or {}).encode('utf-8')
+        levels = dict(index=isinstance(frame.index, pd.MultiIndex),
+                      columns=isinstance(frame.columns, pd.MultiIndex))
+        metadata[self._levels_key] = json.dumps(levels).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+
+        # written to temporary file and renamed, as _atomic_write
+        path = self._path(key)
+        _makedirs(self.directory)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        os.close(fd)
+        try:
+            if self.format == 'feather':
+                from pyarrow import feather
+                feather.write_feather(table, tmp, compression='uncompressed')
+            else:
+                from pyarrow import parquet
+                parquet.write_table(table, tmp)
+            _replace(tmp, path)
+        except Exception:
+            _remove(tmp)
+            raise
+        return True
+
+    def invalidate(self, key=None):
+        """
+        Remove the stored result of key. If key is None, remove all the results
+        """
+        if key is not None:
+            paths = [self._path(key)]
+        elif os.path.isdir(self.directory):
+            paths = [os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                     if f.endswith('.' + self.format)]
+        else:
+            paths = []
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('pyarrow is required to store results')
+    return pyarrow
+
+
+_default_result_cache = None
+
+
+def get_default_result_cache():
+    """
+    Return the ResultCache used by all resources by default.
+    None means results are not stored.
+    """
+    return _default_result_cache
+
+
+def set_default_result_cache(cache=None, **kwargs):
+    """
+    Set the ResultCache used by all resources
+
+    Parameters
+    ----------
+    cache : ResultCache, str, False or None
+        If None, a new ResultCache is created from kwargs.
+        str is regarded as ``format`` of a new ResultCache.
+        If False, results are not stored.
+    kwargs :
+        Keywords passed to ResultCache
+
+    Returns
+    -------
+    cache : ResultCache or None
+    """
+    global _default_result_cache
+    if cache is None:
+        cache = ResultCache(**kwargs)
+    elif isinstance(cache, compat.string_types):
+        cache = ResultCache(format=cache, **kwargs)
+    elif cache is False:
+        cache = None
+    _default_result_cache = cache
+    return cache
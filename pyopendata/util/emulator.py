@@ -0,0 +1,592 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+"""
+Local HTTP server emulating the APIs of supported providers,
+to test and benchmark stores without network access
+"""
+
+from __future__ import unicode_literals
+from __future__ import division
+
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import zipfile
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qsl
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qsl
+
+from pyopendata.util import testing
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _EmulatorHandler(BaseHTTPRequestHandler):
+
+    # keep-alive, as the actual providers
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        emulator = self.server.emulator
+        parsed = urlparse(self.path)
+        params = dict(parse_qsl(parsed.query))
+
+        status, content_type, body = emulator._handle(parsed.path, params)
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+
+        etag = '"{0}"'.format(hashlib.sha1(body).hexdigest()[:16])
+        if not emulator.etag:
+            etag = None
+        elif status == 200 and self.headers.get('If-None-Match') == etag:
+            status = 304
+            body = b''
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None and status in (200, 304):
+            self.send_header('ETag', etag)
+        self.end_headers()
+        emulator._write(self.wfile, body)
+
+
+class ProviderEmulator(object):
+
+    """Local HTTP server which emulates CKAN action API, World Bank paginated JSON,
+    Eurostat SDMX REST and OECD SDMX-JSON with synthetic catalogs and datasets.
+    Responses have ETag, and requests with the matching If-None-Match are responded
+    with 304 Not Modified.
+
+    Parameters
+    ----------
+    datasets : int, default 5
+        Number of Eurostat dataflows, OECD datasets and World Bank indicators
+    dimensions : tuple of int, default (10, 5, 2)
+        Number of codes for each series dimension of Eurostat and OECD datasets
+    periods : int, default 20
+        Number of annual observations per series
+    sparsity : float, default 0.
+        Ratio of omitted series and observations
+    countries : int, default 50
+        Number of World Bank countries
+    packages : int, default 20
+        Number of CKAN packages
+    resources_per_package : int, default 2
+        Number of CKAN resources in each package
+    rows : int, default 100
+        Number of rows in each CKAN CSV resource
+    rows_max : int, default 1000
+        Maximum number of CKAN packages / resources returned in a single page
+    disabled_actions : list of str, optional
+        CKAN actions disabled on the portal, which respond 404
+    latency : float, default 0.
+        Seconds to wait before each response
+    bandwidth : int, optional
+        Bytes per second to send responses
+    error_rate : float, default 0.
+        Ratio of requests responded with 500 Internal Server Error
+    seed : int, default 0
+        Random seed
+    etag : bool, default True
+        If False, responses have no ETag as World Bank and OECD
+    host : str, default '127.0.0.1'
+    port : int, default 0
+        If 0, an unused port is used
+
+    Examples
+    --------
+    >>> with ProviderEmulator(datasets=10, latency=0.05) as emulator:
+    ...     store = EurostatStore(emulator.url_for('eurostat'))
+    ...     df = store.get('DS0').read()
+    """
+
+    _providers = ('ckan', 'eurostat', 'oecd', 'worldbank')
+
+    def __init__(self, datasets=5, dimensions=(10, 5, 2), periods=20, sparsity=0.,
+                 countries=50, packages=20, resources_per_package=2, rows=100,
+                 rows_max=1000, disabled_actions=None, latency=0., bandwidth=None,
+                 error_rate=0., seed=0, etag=True, host='127.0.0.1', port=0):
+        self.datasets = datasets
+        self.dimensions = tuple(dimensions)
+        self.periods = periods
+        self.sparsity = sparsity
+        self.countries = countries
+        self.packages = packages
+        self.resources_per_package = resources_per_package
+        self.rows = rows
+        self.rows_max = rows_max
+        self.disabled_actions = set(disabled_actions or [])
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.seed = seed
+        self.etag = etag
+
+        self.host = host
+        self.port = port
+        self.request_count = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._documents = {}
+        # time when data is updated by set_periods
+        self._updated = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        if self._server is None:
+            raise ValueError('Emulator is not started')
+        return 'http://{0}:{1}'.format(self.host, self._server.server_address[1])
+
+    def url_for(self, provider):
+        """
+        Return base URL to be passed to the store of the provider
+        """
+        if provider not in self._providers:
+            raise ValueError('provider must be one of {0}'.format(', '.join(self._providers)))
+        return '{0}/{1}'.format(self.url, provider)
+
+    def start(self):
+        self._server = _ThreadingHTTPServer((self.host, self.port), _EmulatorHandler)
+        self._server.emulator = self
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _write(self, wfile, body):
+        if self.bandwidth is None:
+            wfile.write(body)
+            return
+        # send 10 chunks per second to limit bandwidth
+        chunk_size = max(int(self.bandwidth / 10), 1)
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            wfile.write(chunk)
+            wfile.flush()
+            time.sleep(len(chunk) / self.bandwidth)
+
+    def _handle(self, path, params):
+        with self._lock:
+            self.request_count += 1
+            error = self.error_rate > 0 and self._random.random() < self.error_rate
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if error:
+            return 500, 'text/plain', 'Internal Server Error'
+
+        parts = [p for p in path.split('/') if p]
+        if len(parts) == 0 or parts[0] not in self._providers:
+            return 404, 'text/plain', 'Not Found'
+
+        handler = getattr(self, '_handle_{0}'.format(parts[0]))
+        try:
+            return handler(parts[1:], params)
+        except (KeyError, IndexError, ValueError):
+            return 404, 'text/plain', 'Not Found'
+
+    def _get_document(self, key, func, *args, **kwargs):
+        # synthetic documents are generated once per key
+        with self._lock:
+            if key not in self._documents:
+                self._documents[key] = func(*args, **kwargs)
+            return self._documents[key]
+
+    def _dataset_id(self, data_id, prefix):
+        number = int(data_id[len(prefix):])
+        if not data_id.startswith(prefix) or not 0 <= number < self.datasets:
+            raise KeyError(data_id)
+        return number
+
+    # Eurostat
+
+    def _handle_eurostat(self, parts, params):
+        if parts[0] == 'dataflow':
+            return 200, 'application/xml', self._get_document('eurostat_dataflow',
+                                                              self._make_dataflow)
+        elif parts[0] == 'datastructure':
+            data_id = parts[2][len('DSD_'):]
+            self._dataset_id(data_id, 'DS')
+            return 200, 'application/xml', self._get_document('eurostat_dsd',
+                                                              testing.make_sdmx_dsd,
+                                                              self.dimensions)
+        elif parts[0] == 'data':
+            number = self._dataset_id(parts[1], 'DS')
+            document = self._get_document(('eurostat', number), testing.make_sdmx,
+                                          self.dimensions, periods=self.periods,
+                                          sparsity=self.sparsity, seed=self.seed + number)
+            if not self._updated_after(params.get('updatedAfter')):
+                return 404, 'text/plain', 'No Results Found'
+            params = dict((k, v) for k, v in params.items() if k != 'updatedAfter')
+            key = parts[2] if len(parts) > 2 else None
+            if key is not None or len(params) > 0:
+                document = self._filter_sdmx(document, key, params)
+            return 200, 'application/xml', document
+        raise KeyError(parts[0])
+
+    def _filter_sdmx(self, document, key, params):
+        # emulate SDMX 2.1 REST key and period filters
+        import xml.etree.ElementTree as ET
+        from pyopendata.io import sdmx
+
+        if not isinstance(document, bytes):
+            document = document.encode('utf-8')
+        root = ET.fromstring(document)
+        if key is not None:
+            filters = [set(v for v in part.split('+') if v) for part in key.split('.')]
+            if len(filters) != len(self.dimensions):
+                raise ValueError(key)
+        start = params.get('startPeriod')
+        end = params.get('endPeriod')
+        last_n = params.get('lastNObservations')
+
+        dataset = root.find(sdmx._DATASET)
+        for series in list(dataset.iter(sdmx._SERIES)):
+            codes = [v for _, v in sdmx._parse_series_key(series)]
+            if key is not None and not all(len(f) == 0 or c in f
+                                           for f, c in zip(filters, codes)):
+                dataset.remove(series)
+                continue
+            observations = list(series.iter(sdmx._OBSERVATION))
+            for observation in observations:
+                period = observation.find(sdmx._OBSDIMENSION).get('value')
+                if (start is not None and period < start[:len(period)]) or \
+                   (end is not None and period > end[:len(period)]):
+                    series.remove(observation)
+            if last_n is not None:
+                observations = list(series.iter(sdmx._OBSERVATION))
+                for observation in observations[:-int(last_n)]:
+                    series.remove(observation)
+        return ET.tostring(root)
+
+    def _make_dataflow(self):
+        dataflows = ''.join('<structure:Dataflow id="DS{0}" agencyID="ESTAT" version="1.0">'
+                            '<common:Name xml:lang="en">Synthetic dataset {0}</common:Name>'
+                            '<structure:Structure><Ref id="DSD_DS{0}"/></structure:Structure>'
+                            '</structure:Dataflow>'.format(i) for i in range(self.datasets))
+        return ('<?xml version="1.0" encoding="UTF-8"?><message:Structure {0}>'
+                '<message:Header><message:ID>SYNTHETIC</message:ID></message:Header>'
+                '<message:Structures><structure:Dataflows>{1}</structure:Dataflows>'
+                '</message:Structures></message:Structure>').format(testing._SDMX_NS, dataflows)
+
+    # OECD
+
+    def _handle_oecd(self, parts, params):
+        number = self._dataset_id(parts[0], 'DS')
+        document = self._get_document(('oecd', number), testing.make_jsdmx,
+                                      self.dimensions, periods=self.periods,
+                                      sparsity=self.sparsity, seed=self.seed + number)
+        key = parts[1] if len(parts) > 1 else None
+        if key is not None and len(key.split('.')) != len(self.dimensions):
+            # such as the default filter of OECD member countries
+            key = None
+        if key is not None or len(params) > 0:
+            document = self._filter_jsdmx(document, key, params)
+        if document is None:
+            # as OECD, key selecting no series is responded with 404
+            return 404, 'text/plain', 'NoRecordsFound'
+        return 200, 'application/json', document
+
+    def _filter_jsdmx(self, document, key, params):
+        # emulate key and time filters, structure only contains selected values
+        data = json.loads(document)
+        structure = data['structure']['dimensions']
+
+        def select(dimension, func):
+            # return mapping from old positions to new positions
+            positions = {}
+            values = []
+            for i, value in enumerate(dimension['values']):
+                if func(value['id']):
+                    positions[str(i)] = str(len(values))
+                    values.append(value)
+            dimension['values'] = values
+            return positions
+
+        series_positions = []
+        filters = key.split('.') if key is not None else [''] * len(self.dimensions)
+        for dimension, part in zip(structure['series'], filters):
+            codes = set(v for v in part.split('+') if v)
+            series_positions.append(select(dimension, lambda c: len(codes) == 0 or c in codes))
+
+        start = params.get('startTime')
+        end = params.get('endTime')
+        time_positions = select(structure['observation'][0],
+                                lambda t: (start is None or t >= start[:len(t)]) and
+                                          (end is None or t <= end[:len(t)]))
+
+        series = {}
+        for s_key, s_value in data['dataSets'][0]['series'].items():
+            s_key = s_key.split(':')
+            if not all(k in p for k, p in zip(s_key, series_positions)):
+                continue
+            observations = dict((time_positions[o_key], o_value)
+                                for o_key, o_value in s_value['observations'].items()
+                                if o_key in time_positions)
+            s_key = ':'.join(p[k] for k, p in zip(s_key, series_positions))
+            series[s_key] = dict(s_value, observations=observations)
+        if len(series) == 0:
+            return None
+        data['dataSets'][0]['series'] = series
+        return json.dumps(data)
+
+    # World Bank
+
+    def _handle_worldbank(self, parts, params):
+        # /countries/all/indicators/<indicator>
+        number = self._dataset_id(parts[3], 'IND')
+        entries = self._get_document(('worldbank', number), self._make_indicator, parts[3])
+
+        if 'date' in params:
+            dates = params['date'].split(':')
+            entries = [e for e in entries if dates[0] <= e['date'] <= dates[-1]]
+
+        per_page = int(params.get('per_page', 50))
+        page = int(params.get('page', 1))
+        pages = max((len(entries) + per_page - 1) // per_page, 1)
+        meta = {'page': page, 'pages': pages, 'per_page': str(per_page),
+                'total': len(entries)}
+        content = entries[(page - 1) * per_page:page * per_page]
+        return 200, 'application/json', json.dumps([meta, content])
+
+    def _make_indicator(self, indicator):
+        random_state = random.Random(self.seed + int(indicator[len('IND'):]))
+        entries = []
+        for country in range(self.countries):
+            for year in reversed(range(1990, 1990 + self.periods)):
+                if self.sparsity > 0 and random_state.random() < self.sparsity:
+                    value = None
+                else:
+                    value = '{0:.4f}'.format(random_state.random() * 100)
+                entries.append({'indicator': {'id': indicator,
+                                              'value': 'Synthetic indicator {0}'.format(indicator)},
+                                'country': {'id': 'C{0}'.format(country),
+                                            'value': 'Country {0}'.format(country)},
+                                'value': value, 'decimal': '0', 'date': str(year)})
+        return entries
+
+    # CKAN
+
+    def _handle_ckan(self, parts, params):
+        if parts[0] == 'files':
+            return 200, 'application/octet-stream', self._get_document(('ckan_file', parts[1]),
+                                                                       self._make_file, parts[1])
+        elif parts[:2] == ['api', 'action']:
+            result = self._ckan_action(parts[2], params)
+            return 200, 'application/json', json.dumps({'success': True, 'result': result})
+        raise KeyError(parts[0])
+
+    def _ckan_catalog(self):
+        return self._get_document('ckan_catalog', self._make_catalog)
+
+    def _make_catalog(self):
+        packages = []
+        for i in range(self.packages):
+            name = 'package-{0}'.format(i)
+            resources = []
+            for j in range(self.resources_per_package):
+                resource_id = '{0}-resource-{1}'.format(name, j)
+                resources.append({'id': resource_id, 'package_id': name,
+                                  'name': 'Resource {0} of {1}'.format(j, name),
+                                  'format': 'CSV', 'size': None,
+                                  'url': '{0}/ckan/files/{1}.csv'.format(self.url, resource_id)})
+            packages.append({'id': name, 'name': name,
+                             'title': 'Synthetic package {0}'.format(i),
+                             'notes': 'Synthetic data for testing',
+                             'tags': [{'name': 'tag-{0}'.format(i % 5)}],
+                             'groups': [{'name': 'group-{0}'.format(i % 3)}],
+                             'metadata_modified': '2015-01-01T00:00:{0:02d}'.format(i % 60),
+                             'num_resources': len(resources),
+                             'resources': resources})
+        return packages
+
+    def set_periods(self, periods):
+        """
+        Change the number of periods of Eurostat, OECD and World Bank data,
+        as if the data are updated. Eurostat data is regarded as updated at this time
+        """
+        with self._lock:
+            self.periods = periods
+            for key in list(self._documents):
+                if isinstance(key, tuple) and key[0] in ('eurostat', 'oecd', 'worldbank'):
+                    del self._documents[key]
+            self._updated = datetime.datetime.utcnow()
+
+    def _updated_after(self, value):
+        # whether data is updated after the SDMX updatedAfter parameter
+        if value is None:
+            return True
+        if self._updated is None:
+            return False
+        value = datetime.datetime.strptime(value.rstrip('Z')[:19], '%Y-%m-%dT%H:%M:%S')
+        return self._updated > value
+
+    def set_datasets(self, datasets):
+        """
+        Change the number of Eurostat dataflows, OECD datasets and World Bank indicators,
+        as if the catalogs are updated
+        """
+        with self._lock:
+            self.datasets = datasets
+            self._documents.pop('eurostat_dataflow', None)
+
+    def modify_package(self, name, **fields):
+        """
+        Update fields of a CKAN package and its ``metadata_modified``, as if the package
+        is edited on the portal. ``resources`` replaces the fields of the resources
+        """
+        packages = self._ckan_catalog()
+        with self._lock:
+            package = [p for p in packages if p['name'] == name][0]
+            resources = fields.pop('resources', None)
+            if resources is not None:
+                for resource, values in zip(package['resources'], resources):
+                    resource.update(values)
+            package.update(fields)
+            latest = max(datetime.datetime.strptime(p['metadata_modified'], '%Y-%m-%dT%H:%M:%S')
+                         for p in packages)
+            modified = latest + datetime.timedelta(seconds=1)
+            package['metadata_modified'] = modified.strftime('%Y-%m-%dT%H:%M:%S')
+            # the latest modified package appears at the end, as the actual search index
+            packages.remove(package)
+            packages.append(package)
+
+    def delete_package(self, name):
+        """
+        Delete a CKAN package from the catalog
+        """
+        packages = self._ckan_catalog()
+        with self._lock:
+            packages.remove([p for p in packages if p['name'] == name][0])
+
+    def _make_file(self, filename):
+        # the same data in the format specified by the extension,
+        # regardless of the format of the resource metadata
+        name, ext = filename.split('.', 1)
+        content = self._make_csv(name + '.csv')
+        if ext == 'csv':
+            return content
+        elif ext == 'tsv':
+            return content.replace(',', '\t')
+        elif ext == 'json':
+            lines = content.splitlines()
+            columns = lines[0].split(',')
+            records = [dict(zip(columns, line.split(','))) for line in lines[1:]]
+            for record in records:
+                record['id'] = int(record['id'])
+                record['value'] = float(record['value'])
+            return json.dumps(records)
+        elif ext == 'csv.gz':
+            out = io.BytesIO()
+            with gzip.GzipFile(fileobj=out, mode='wb') as fh:
+                fh.write(content.encode('utf-8'))
+            return out.getvalue()
+        elif ext == 'zip':
+            out = io.BytesIO()
+            with zipfile.ZipFile(out, 'w') as archive:
+                archive.writestr(name + '.csv', content.encode('utf-8'))
+            return out.getvalue()
+        raise KeyError(filename)
+
+    def _make_csv(self, name):
+        random_state = random.Random(name)
+        lines = ['id,name,value']
+        for i in range(self.rows):
+            lines.append('{0},row{0},{1:.4f}'.format(i, random_state.random()))
+        return '\n'.join(lines) + '\n'
+
+    def _ckan_action(self, action, params):
+        if action in self.disabled_actions:
+            raise KeyError(action)
+        packages = self._ckan_catalog()
+        if action == 'site_read':
+            return True
+        elif action == 'package_list':
+            return [p['name'] for p in packages]
+        elif action == 'package_show':
+            return [p for p in packages if p['name'] == params['id'] or p['id'] == params['id']][0]
+        elif action == 'resource_show':
+            resources = [r for p in packages for r in p['resources']]
+            return [r for r in resources if r['id'] == params['id']][0]
+        elif action == 'current_package_list_with_resources':
+            offset = int(params.get('offset', 0))
+            limit = min(int(params.get('limit', len(packages))), self.rows_max)
+            return packages[offset:offset + limit]
+        elif action == 'package_search':
+            query = params.get('q', '')
+            results = [p for p in packages if query in p['title'] or query in p['name']]
+            if 'fq' in params:
+                # supports only "tags:xxx", "groups:xxx" and "metadata_modified:[xxx TO *]"
+                field, value = params['fq'].split(':', 1)
+                if field == 'metadata_modified':
+                    since = value[1:].split(' TO ')[0].rstrip('Z')
+                    results = [p for p in results if p[field] >= since]
+                else:
+                    results = [p for p in results if value in [v['name'] for v in p[field]]]
+            if params.get('sort', '').startswith('metadata_modified'):
+                results = sorted(results, key=lambda p: p['metadata_modified'],
+                                 reverse=params['sort'].endswith('desc'))
+            count = len(results)
+            start = int(params.get('start', 0))
+            rows = min(int(params.get('rows', 10)), self.rows_max)
+            results = results[start:start + rows]
+            if 'fl' in params:
+                fields = params['fl'].split(',')
+                results = [dict((k, p[k]) for k in fields if k in p) for p in results]
+            return {'count': count, 'results': results}
+        elif action == 'resource_search':
+            query = params.get('query', '')
+            if ':' in query:
+                query = query.split(':', 1)[1]
+            resources = [r for p in packages for r in p['resources'] if query in r['name']]
+            offset = int(params.get('offset', 0))
+            limit = min(int(params.get('limit', len(resources))), self.rows_max)
+            return {'count': len(resources), 'results': resources[offset:offset + limit]}
+        elif action == 'group_list':
+            return sorted(set(g['name'] for p in packages for g in p['groups']))
+        elif action == 'tag_list':
+            return sorted(set(t['name'] for p in packages for t in p['tags']))
+        elif action == 'group_show':
+            return {'name': params['id'],
+                    'packages': [p for p in packages
+                                 if params['id'] in [g['name'] for g in p['groups']]]}
+        elif action == 'tag_show':
+            return {'name': params['id'],
+                    'packages': [p for p in packages
+                                 if params['id'] in [t['name'] for t in p['tags']]]}
+        raise KeyError(action)
@@ -0,0 +1,604 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+"""
+Local persistent indexes of provider catalogs, to search metadata without
+accessing the server. Indexes are stored in SQLite and use its full-text search
+(FTS5 or FTS4) if available, otherwise fall back to LIKE queries.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+
+from pandas.compat import string_types
+
+from pyopendata.io.util import _json_loads
+from pyopendata.util import cache
+
+
+class _SQLiteIndex(object):
+
+    """Base class of indexes stored in SQLite
+
+    Parameters
+    ----------
+    path : str
+        Path to the SQLite database. ``:memory:`` creates an in-memory index."""
+
+    # table to be searched by text, and its columns
+    _text_table = None
+    _text_columns = []
+
+    def __init__(self, path):
+        if path != ':memory:':
+            cache._makedirs(os.path.dirname(os.path.abspath(path)))
+        self.path = path
+        self.closed = False
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS meta '
+                               '(key TEXT PRIMARY KEY, value TEXT)')
+            self._create_tables()
+            self.fts = self._create_fts()
+            self._conn.commit()
+
+    def _create_tables(self):
+        raise NotImplementedError
+
+    def _create_fts(self):
+        """
+        Create full-text search table and return the module name, or None if unavailable
+        """
+        fts = self._get_meta('fts')
+        if fts is not None:
+            return fts or None
+
+        # rows are associated with the text table by rowid
+        columns = ', '.join(self._text_columns)
+        for module in ['fts5', 'fts4']:
+            try:
+                self._conn.execute('CREATE VIRTUAL TABLE {0}_fts USING {1}({2})'
+                                   .format(self._text_table, module, columns))
+            except sqlite3.OperationalError:
+                continue
+            self._set_meta('fts', module)
+            return module
+        self._set_meta('fts', '')
+        return None
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?',
+                                     (key, )).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, key, value):
+        self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                           (key, value))
+
+    def _update_text(self, rowid, values):
+        if self.fts is None:
+            return
+        self._conn.execute('DELETE FROM {0}_fts WHERE rowid = ?'.format(self._text_table),
+                           (rowid, ))
+        if values is not None:
+            placeholders = ', '.join(['?'] * (len(values) + 1))
+            self._conn.execute('INSERT INTO {0}_fts (rowid, {1}) VALUES ({2})'
+                               .format(self._text_table, ', '.join(self._text_columns),
+                                       placeholders), [rowid] + list(values))
+
+    def _text_condition(self, text):
+        """
+        Return SQL condition and parameters to match rows of the text table
+        containing all the words
+        """
+        words = [w for w in text.split() if w]
+        if len(words) == 0:
+            return '1', []
+        if self.fts is not None:
+            # quote each word not to be interpreted as FTS syntax
+            query = ' '.join('"{0}"'.format(w.replace('"', '""')) for w in words)
+            return ('rowid IN (SELECT rowid FROM {0}_fts WHERE {0}_fts MATCH ?)'
+                    .format(self._text_table), [query])
+        conditions = []
+        params = []
+        for word in words:
+            columns = ' OR '.join('{0} LIKE ?'.format(c) for c in self._text_columns)
+            conditions.append('({0})'.format(columns))
+            params.extend(['%{0}%'.format(word)] * len(self._text_columns))
+        return ' AND '.join(conditions), params
+
+    def close(self):
+        """
+        Close the database
+        """
+        with self._lock:
+            self._conn.close()
+            self.closed = True
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, string_types):
+        return [value]
+    return list(value)
+
+
+def _as_size(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CKANIndex(_SQLiteIndex):
+
+    """Local index of packages, resources, tags and groups of a CKAN store
+
+    Parameters
+    ----------
+    store : CKANStore
+    path : str, optional
+        Path to the SQLite database. Default is under ``index`` directory of
+        ``pyopendata.util.cache.get_cache_dir()``, named by the URL of the store.
+        ``:memory:`` creates an in-memory index.
+
+    Notes
+    -----
+    The first ``sync`` retrieves all the packages. Following ``sync`` retrieves
+    only the packages modified after the last sync, using ``metadata_modified``."""
+
+    _text_table = 'packages'
+    _text_columns = ['name', 'title', 'notes', 'tag_names', 'group_names', 'resource_names']
+
+    def __init__(self, store, path=None):
+        if path is None:
+            path = os.path.join(cache.get_cache_dir(), 'index',
+                                'ckan_{0}.sqlite'.format(cache._hash_key(store.url)))
+        self.store = store
+        _SQLiteIndex.__init__(self, path)
+
+    def _create_tables(self):
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS packages
+                (id TEXT PRIMARY KEY, name TEXT, title TEXT, notes TEXT,
+                 tag_names TEXT, group_names TEXT, resource_names TEXT,
+                 metadata_modified TEXT, data TEXT);
+            CREATE TABLE IF NOT EXISTS resources
+                (id TEXT PRIMARY KEY, package_id TEXT, name TEXT, format TEXT,
+                 size INTEGER, data TEXT);
+            CREATE TABLE IF NOT EXISTS package_tags (package_id TEXT, name TEXT);
+            CREATE TABLE IF NOT EXISTS package_groups (package_id TEXT, name TEXT);
+            CREATE INDEX IF NOT EXISTS packages_name ON packages (name);
+            CREATE INDEX IF NOT EXISTS resources_package ON resources (package_id);
+            CREATE INDEX IF NOT EXISTS resources_format ON resources (format);
+            CREATE INDEX IF NOT EXISTS package_tags_name ON package_tags (name, package_id);
+            CREATE INDEX IF NOT EXISTS package_groups_name ON package_groups (name, package_id);
+        ''')
+
+    @property
+    def last_modified(self):
+        """
+        The latest ``metadata_modified`` of the indexed packages
+        """
+        return self._get_meta('last_modified')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM packages').fetchone()[0]
+
+    def sync(self, full=False, prune=True):
+        """
+        Retrieve packages from the store and update the index
+
+        Parameters
+        ----------
+        full : bool, default False
+            If True, retrieve all the packages. Otherwise, retrieve only
+            the packages modified after the last sync.
+        prune : bool, default True
+            If True, remove packages deleted from the store, using ``package_list``.
+
+        Returns
+        -------
+        count : int
+            Number of updated packages
+        """
+        last_modified = None if full else self.last_modified
+        packages = None
+        if last_modified is not None:
+            # Solr date range, packages modified at the same time are updated again
+            fq = 'metadata_modified:[{0}Z TO *]'.format(last_modified[:19])
+            try:
+                packages = list(self.store.iter_search_package(fq=fq,
+                                                               sort='metadata_modified asc'))
+            except self.store._connection_errors:
+                packages = None
+        if packages is None:
+            # resources are retrieved per package if not available in bulk
+            packages = self.store.get_packages(hydrate=True)
+            full = True
+
+        with self._lock:
+            if full:
+                for table in ['packages', 'resources', 'package_tags', 'package_groups']:
+                    self._conn.execute('DELETE FROM {0}'.format(table))
+                if self.fts is not None:
+                    self._conn.execute('DELETE FROM packages_fts')
+            for package in packages:
+                self._put_package(package)
+                modified = package.kwargs.get('metadata_modified')
+                if modified is not None and (last_modified is None or modified > last_modified):
+                    last_modified = modified
+            if last_modified is not None:
+                self._set_meta('last_modified', last_modified)
+            self._conn.commit()
+
+        if prune and not full:
+            try:
+                response = self.store._requests_get('/api/action/package_list')
+                names = set(self.store._validate_response(response))
+            except self.store._connection_errors:
+                names = None
+            if names is not None:
+                self._prune(names)
+        return len(packages)
+
+    def _put_package(self, package):
+        data = dict(package.kwargs, name=package.name, id=package.id,
+                    resources=[self._resource_data(r) for r in package.resources])
+        id = package.id or package.name
+        self._delete_package(id)
+
+        tags = [t['name'] if isinstance(t, dict) else t for t in data.get('tags') or []]
+        groups = [g['name'] if isinstance(g, dict) else g for g in data.get('groups') or []]
+        resources = ' '.join('{0} {1}'.format(r.get('name') or '', r.get('format') or '')
+                             for r in data['resources'])
+        values = [package.name, data.get('title') or '', data.get('notes') or '',
+                  ' '.join(tags), ' '.join(groups), resources]
+
+        cursor = self._conn.execute('INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    [id] + values + [data.get('metadata_modified'),
+                                                     json.dumps(data)])
+        self._update_text(cursor.lastrowid, values)
+        self._conn.executemany('INSERT INTO package_tags VALUES (?, ?)',
+                               [(id, t) for t in tags])
+        self._conn.executemany('INSERT INTO package_groups VALUES (?, ?)',
+                               [(id, g) for g in groups])
+        self._conn.executemany('INSERT INTO resources VALUES (?, ?, ?, ?, ?, ?)',
+                               [(r.get('id'), id, r.get('name'), r.get('format'),
+                                 _as_size(r.get('size')), json.dumps(r))
+                                for r in data['resources']])
+
+    def _resource_data(self, resource):
+        return dict(resource.kwargs, id=resource.id, name=resource.name, url=resource.url,
+                    format=resource.format, size=resource.size,
+                    size_text=resource.size_text)
+
+    def _delete_package(self, id):
+        row = self._conn.execute('SELECT rowid FROM packages WHERE id = ?', (id, )).fetchone()
+        if row is None:
+            return
+        self._update_text(row[0], None)
+        self._conn.execute('DELETE FROM packages WHERE id = ?', (id, ))
+        for table in ['resources', 'package_tags', 'package_groups']:
+            self._conn.execute('DELETE FROM {0} WHERE package_id = ?'.format(table), (id, ))
+
+    def _prune(self, names):
+        with self._lock:
+            rows = self._conn.execute('SELECT id, name FROM packages').fetchall()
+            for id, name in rows:
+                if name not in names:
+                    self._delete_package(id)
+            self._conn.commit()
+
+    def _package_conditions(self, text=None, tags=None, groups=None, formats=None,
+                            min_size=None, max_size=None):
+        conditions = []
+        params = []
+        if text is not None:
+            condition, text_params = self._text_condition(text)
+            conditions.append(condition)
+            params.extend(text_params)
+        for table, values in [('package_tags', _as_list(tags)),
+                              ('package_groups', _as_list(groups))]:
+            if values is None:
+                continue
+            # packages must have all the specified tags / groups
+            for value in values:
+                conditions.append('id IN (SELECT package_id FROM {0} WHERE name = ?)'
+                                  .format(table))
+                params.append(value)
+        resource_conditions, resource_params = self._resource_conditions(formats=formats,
+                                                                         min_size=min_size,
+                                                                         max_size=max_size)
+        if len(resource_conditions) > 0:
+            conditions.append('id IN (SELECT package_id FROM resources WHERE {0})'
+                              .format(' AND '.join(resource_conditions)))
+            params.extend(resource_params)
+        return conditions, params
+
+    def _resource_conditions(self, formats=None, min_size=None, max_size=None):
+        conditions = []
+        params = []
+        formats = _as_list(formats)
+        if formats is not None:
+            conditions.append('UPPER(format) IN ({0})'.format(', '.join(['?'] * len(formats))))
+            params.extend([f.upper() for f in formats])
+        if min_size is not None:
+            conditions.append('size >= ?')
+            params.append(min_size)
+        if max_size is not None:
+            conditions.append('size <= ?')
+            params.append(max_size)
+        return conditions, params
+
+    def search_package(self, text=None, tags=None, groups=None, formats=None,
+                       min_size=None, max_size=None, limit=None):
+        """
+        Search packages in the index
+
+        Parameters
+        ----------
+        text : str, optional
+            Packages containing all the words in name, title, notes, tags, groups
+            or names of resources
+        tags, groups : str or list of str, optional
+            Packages having all the tags / groups
+        formats : str or list of str, optional
+            Packages having a resource of any of the formats
+        min_size, max_size : int, optional
+            Packages having a resource whose size is in the range.
+            Used together with formats, a single resource must satisfy both.
+        limit : int, optional
+            Maximum number of packages
+
+        Returns
+        -------
+        result : list of CKANPackage
+        """
+        from pyopendata.ckan import CKANPackage
+        conditions, params = self._package_conditions(text=text, tags=tags, groups=groups,
+                                                      formats=formats, min_size=min_size,
+                                                      max_size=max_size)
+        rows = self._select('packages', conditions, params, limit=limit)
+        return [CKANPackage(_store=self.store, **_json_loads(row[0])) for row in rows]
+
+    def search_resource(self, text=None, formats=None, min_size=None, max_size=None,
+                        limit=None):
+        """
+        Search resources in the index
+
+        Parameters
+        ----------
+        text : str, optional
+            Resources of packages containing all the words
+        formats : str or list of str, optional
+        min_size, max_size : int, optional
+        limit : int, optional
+            Maximum number of resources
+
+        Returns
+        -------
+        result : list of CKANResource
+        """
+        from pyopendata.ckan import CKANResource
+        conditions, params = self._resource_conditions(formats=formats, min_size=min_size,
+                                                       max_size=max_size)
+        if text is not None:
+            condition, text_params = self._text_condition(text)
+            conditions.append('package_id IN (SELECT id FROM packages WHERE {0})'
+                              .format(condition))
+            params.extend(text_params)
+        rows = self._select('resources', conditions, params, limit=limit)
+        return [CKANResource(_store=self.store, **_json_loads(row[0])) for row in rows]
+
+    def _select(self, table, conditions, params, limit=None):
+        query = 'SELECT data FROM {0}'.format(table)
+        if len(conditions) > 0:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY rowid'
+        if limit is not None:
+            query += ' LIMIT {0:d}'.format(limit)
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    @property
+    def tags(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT DISTINCT name FROM package_tags ORDER BY name')
+            return [row[0] for row in rows]
+
+    @property
+    def groups(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT DISTINCT name FROM package_groups ORDER BY name')
+            return [row[0] for row in rows]
+
+    @property
+    def formats(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT DISTINCT UPPER(format) FROM resources '
+                                      'WHERE format IS NOT NULL ORDER BY 1')
+            return [row[0] for row in rows]
+
+
+class EurostatCatalog(_SQLiteIndex):
+
+    """Local catalog of Eurostat dataflows
+
+    Parameters
+    ----------
+    store : EurostatStore
+    path : str, optional
+        Path to the SQLite database. Default is under ``index`` directory of
+        ``pyopendata.util.cache.get_cache_dir()``, named by the URL of the store.
+        ``:memory:`` creates an in-memory catalog.
+    ttl : int, optional
+        Seconds to use the catalog without revalidating. If None, the catalog is
+        revalidated on every ``refresh``.
+
+    Notes
+    -----
+    ``refresh`` revalidates the dataflow list by ETag / Last-Modified, and parses
+    it while downloading only when it has changed."""
+
+    _text_table = 'dataflows'
+    _text_columns = ['id', 'name']
+
+    def __init__(self, store, path=None, ttl=None):
+        if path is None:
+            path = os.path.join(cache.get_cache_dir(), 'index',
+                                'eurostat_{0}.sqlite'.format(cache._hash_key(store.url)))
+        self.store = store
+        self.ttl = ttl
+        _SQLiteIndex.__init__(self, path)
+
+    def _create_tables(self):
+        self._conn.execute('CREATE TABLE IF NOT EXISTS dataflows '
+                           '(id TEXT PRIMARY KEY, name TEXT, agency TEXT, version TEXT)')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM dataflows').fetchone()[0]
+
+    def refresh(self, force=False):
+        """
+        Retrieve the dataflow list if it has been changed
+
+        Parameters
+        ----------
+        force : bool, default False
+            If True, retrieve and parse the dataflow list regardless of its validators
+
+        Returns
+        -------
+        changed : bool
+            Whether the catalog is updated
+
+        Notes
+        -----
+        If the dataflow list cannot be retrieved, the stored catalog is kept with
+        a warning. The error is raised if the catalog is empty or ``force`` is True.
+        """
+        checked = self._get_meta('checked')
+        if not force and checked is not None and self.ttl is not None:
+            if time.time() - float(checked) < self.ttl:
+                return False
+
+        headers = {}
+        if not force:
+            for key, header in [('etag', 'If-None-Match'),
+                                ('last_modified', 'If-Modified-Since')]:
+                value = self._get_meta(key)
+                if value is not None:
+                    headers[header] = value
+        try:
+            response = self.store._requests_get('/dataflow/ESTAT/all/latest',
+                                                headers=headers, stream=True)
+            if response.status_code not in (200, 304):
+                self.store._check_status(response)
+        except self.store._connection_errors as e:
+            if force or len(self) == 0:
+                raise
+            message = 'Unable to refresh the catalog, stored dataflows are used: {0}'
+            warnings.warn(message.format(e), UserWarning)
+            return False
+        if response.status_code == 304:
+            response.close()
+            with self._lock:
+                self._set_meta('checked', repr(time.time()))
+                self._conn.commit()
+            return False
+
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if not force and etag is not None and etag == self._get_meta('etag'):
+            # validators are not supported by the cache in between
+            response.close()
+            changed = False
+        else:
+            changed = self._update(response, force=force)
+
+        with self._lock:
+            for key, value in [('etag', etag), ('last_modified', last_modified)]:
+                if value is None:
+                    self._conn.execute('DELETE FROM meta WHERE key = ?', (key, ))
+                else:
+                    self._set_meta(key, value)
+            self._set_meta('checked', repr(time.time()))
+            self._conn.commit()
+        return changed
+
+    def _update(self, response, force=False):
+        from pyopendata.io import sdmx
+
+        digest = hashlib.sha1()
+
+        def chunks():
+            for chunk in response.iter_content(chunk_size=self.store._chunk_size):
+                digest.update(chunk)
+                yield chunk
+
+        with self._lock:
+            self._conn.execute('DELETE FROM dataflows')
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO dataflows VALUES (?, ?, ?, ?)',
+                                       sdmx._iter_sdmx_dataflows(chunks()))
+            except Exception:
+                self._conn.rollback()
+                raise
+            if not force and digest.hexdigest() == self._get_meta('digest'):
+                # content is not changed, keep the current catalog
+                self._conn.rollback()
+                return False
+            if self.fts is not None:
+                self._conn.execute('DELETE FROM dataflows_fts')
+                self._conn.execute('INSERT INTO dataflows_fts (rowid, id, name) '
+                                   'SELECT rowid, id, name FROM dataflows')
+            self._set_meta('digest', digest.hexdigest())
+            self._conn.commit()
+        return True
+
+    def _resources(self, rows):
+        from pyopendata.eurostat import EurostatResource
+        return [EurostatResource(_store=self.store, id=id, name=name) for id, name in rows]
+
+    @property
+    def datasets(self):
+        """
+        All the dataflows as EurostatResource, in the order of the dataflow list
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT id, name FROM dataflows ORDER BY rowid').fetchall()
+        return self._resources(rows)
+
+    def search(self, text, limit=None):
+        """
+        Search dataflows containing all the words in their id or name
+
+        Parameters
+        ----------
+        text : str
+        limit : int, optional
+            Maximum number of dataflows
+
+        Returns
+        -------
+        result : list of EurostatResource
+        """
+        condition, params = self._text_condition(text)
+        query = 'SELECT id, name FROM dataflows WHERE {0} ORDER BY rowid'.format(condition)
+        if limit is not None:
+            query += ' LIMIT {0:d}'.format(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return self._resources(rows)
@@ -3,8 +3,17 @@
 from __future__ import unicode_literals
 from __future__ import division
 
+import collections
 import os
 import sys
+import threading
+
+import requests
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
 
 
 class ProgressBar:
@@ -39,3 +48,200 @@ class ProgressBar:
 
         if self.current >= self.total:
             sys.stdout.write(os.linesep)
+
+
+class SessionPool(object):
+
+    """Pool of keep-alive ``requests.Session`` shared per host
+
+    Parameters
+    ----------
+    pool_connections : int, default 10
+        Number of connection pools (distinct hosts / proxies) to cache per session
+    pool_maxsize : int, default 10
+        Maximum number of connections to keep alive per host
+    max_retries : int, default 0
+        Number of retries for each connection
+    pool_block : bool, default False
+        If True, block when all the connections to a host are in use
+        rather than opening a new one"""
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, max_retries=0,
+                 pool_block=False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.pool_block = pool_block
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_connections,
+                                                pool_maxsize=self.pool_maxsize,
+                                                max_retries=self.max_retries,
+                                                pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def get_session(self, url):
+        """
+        Return the session bound to the host of the url
+        """
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.netloc)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._create_session()
+                self._sessions[key] = session
+        return session
+
+    def get(self, url, params=None, proxies=None, **kwargs):
+        """
+        Issue GET request using the pooled session.
+        Proxies are passed per request, thus sessions can be shared
+        between resources with different proxies.
+        """
+        session = self.get_session(url)
+        return session.get(url, params=params, proxies=proxies, **kwargs)
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+        for session in sessions:
+            session.close()
+
+
+_default_pool = SessionPool()
+
+
+def get_default_pool():
+    """
+    Return the SessionPool used by all stores and resources by default
+    """
+    return _default_pool
+
+
+def set_default_pool(pool=None, **kwargs):
+    """
+    Replace the SessionPool used by all stores and resources
+
+    Parameters
+    ----------
+    pool : SessionPool, optional
+        If omitted, a new SessionPool is created from kwargs
+    kwargs :
+        Keywords passed to SessionPool
+
+    Returns
+    -------
+    pool : SessionPool
+    """
+    global _default_pool
+    if pool is None:
+        pool = SessionPool(**kwargs)
+    old, _default_pool = _default_pool, pool
+    if old is not pool:
+        old.close()
+    return pool
+
+
+def imap_threads(func, iterable, max_workers=None, max_pending=None):
+    """
+    Apply func to each item using a bounded pool of threads.
+    Results are yielded in the same order as iterable.
+
+    Parameters
+    ----------
+    func : callable
+    iterable : iterable
+    max_workers : int, optional
+        Maximum number of threads. If None or 1, func is applied sequentially
+    max_pending : int, optional
+        Maximum number of items being processed or waiting to be consumed.
+        If None, all items are processed regardless of consumption
+    """
+    items = list(iterable)
+    if max_workers is None or max_workers <= 1 or len(items) <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(min(max_workers, len(items)))
+    try:
+        if max_pending is None:
+            for result in pool.imap(func, items):
+                yield result
+        else:
+            # submit next item only when the earliest result is consumed
+            pending = collections.deque()
+            for item in items:
+                pending.append(pool.apply_async(func, (item, )))
+                if len(pending) >= max(max_pending, 1):
+                    yield pending.popleft().get()
+            while len(pending) > 0:
+                yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def imap_threads_unordered(func, iterable, max_workers=4, max_pending=None):
+    """
+    Apply func to each item using a bounded pool of threads.
+    Yield tuples of (item, result, exception) as completed.
+
+    Parameters
+    ----------
+    func : callable
+    iterable : iterable
+    max_workers : int, default 4
+        Maximum number of threads
+    max_pending : int, optional
+        Maximum number of items being processed or waiting to be consumed,
+        which bounds the memory used by results. Default is twice of max_workers
+    """
+    if max_pending is None:
+        max_pending = max_workers * 2
+    max_pending = max(max_pending, 1)
+
+    try:
+        from queue import Queue
+    except ImportError:
+        from Queue import Queue
+    from multiprocessing.pool import ThreadPool
+
+    def wrapper(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    queue = Queue()
+    pool = ThreadPool(max(max_workers, 1))
+    try:
+        items = iter(iterable)
+        exhausted = False
+        pending = 0
+        while True:
+            while not exhausted and pending < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pool.apply_async(wrapper, (item, ), callback=queue.put)
+                pending += 1
+            if pending == 0:
+                break
+            result = queue.get()
+            pending -= 1
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,222 @@
+# pylint: disable-msg=E1101,W0613,W0603
+
+"""
+Generators of synthetic documents for testing and benchmarking readers
+"""
+
+from __future__ import unicode_literals
+from __future__ import division
+
+import itertools
+import json
+
+import numpy as np
+
+
+_SDMX_NS = ('xmlns:message="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message" '
+            'xmlns:generic="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/data/generic" '
+            'xmlns:common="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common" '
+            'xmlns:structure="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure"')
+
+
+def _dimension_names(sizes):
+    return ['D{0}'.format(i) for i in range(len(sizes))]
+
+
+def _iter_keys(sizes, sparsity, random_state):
+    """
+    Yield coordinates of product of dimensions, skipping ``sparsity`` ratio of them
+    """
+    for key in itertools.product(*[range(size) for size in sizes]):
+        if sparsity > 0 and random_state.rand() < sparsity:
+            continue
+        yield key
+
+
+_DSD_DIMENSION = ('<structure:Dimension id="{0}"><structure:LocalRepresentation>'
+                  '<structure:Enumeration><Ref id="CL_{0}" class="Codelist"/>'
+                  '</structure:Enumeration></structure:LocalRepresentation>'
+                  '</structure:Dimension>')
+
+
+def make_sdmx_dsd(dimensions=(10, 5, 2), time_name='TIME_PERIOD'):
+    """
+    Generate SDMX-ML DSD corresponding to ``make_sdmx``
+
+    Parameters
+    ----------
+    dimensions : tuple of int
+        Number of codes for each series key dimension
+
+    Returns
+    -------
+    result : str
+    """
+    names = _dimension_names(dimensions)
+    codelists = []
+    for name, size in zip(names, dimensions):
+        codes = ''.join('<structure:Code id="C{0}"><common:Name xml:lang="en">'
+                        '{1} code {0}</common:Name></structure:Code>'.format(i, name)
+                        for i in range(size))
+        codelists.append('<structure:Codelist id="CL_{0}"><common:Name xml:lang="en">{0}'
+                         '</common:Name>{1}</structure:Codelist>'.format(name, codes))
+    return ('<?xml version="1.0" encoding="UTF-8"?><message:Structure {0}><message:Header>'
+            '<message:ID>SYNTHETIC</message:ID></message:Header><message:Structures>'
+            '<structure:Codelists>{1}</structure:Codelists><structure:DataStructures>'
+            '<structure:DataStructure id="DSD_SYNTHETIC"><structure:DataStructureComponents>'
+            '<structure:DimensionList>{2}<structure:TimeDimension id="{3}"/>'
+            '</structure:DimensionList></structure:DataStructureComponents>'
+            '</structure:DataStructure></structure:DataStructures></message:Structures>'
+            '</message:Structure>').format(_SDMX_NS, ''.join(codelists),
+                                           ''.join(_DSD_DIMENSION.format(n) for n in names),
+                                           time_name)
+
+
+def make_sdmx(dimensions=(10, 5, 2), periods=20, sparsity=0., start=1990,
+              time_name='TIME_PERIOD', shuffle=False, seed=0):
+    """
+    Generate SDMX-ML generic data
+
+    Parameters
+    ----------
+    dimensions : tuple of int
+        Number of codes for each series key dimension.
+        The number of series is the product of them.
+    periods : int
+        Number of annual observations per series
+    sparsity : float
+        Ratio of omitted series and observations
+    start : int
+        First year of observations
+    shuffle : bool
+        If True, series key values and observations are ordered randomly in each series
+    seed : int
+        Random seed
+
+    Returns
+    -------
+    result : str
+    """
+    random_state = np.random.RandomState(seed)
+    names = _dimension_names(dimensions)
+
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><message:GenericData {0}>'
+             '<message:Header><message:ID>SYNTHETIC</message:ID>'
+             '<message:Structure structureID="DSD_SYNTHETIC" dimensionAtObservation="{1}">'
+             '</message:Structure></message:Header>'
+             '<message:DataSet structureRef="DSD_SYNTHETIC">'.format(_SDMX_NS, time_name)]
+    # shuffle doesn't affect to the generated values
+    order_state = np.random.RandomState(seed)
+    for key in _iter_keys(dimensions, sparsity, random_state):
+        values = ['<generic:Value id="{0}" value="C{1}"/>'.format(n, k)
+                  for n, k in zip(names, key)]
+        observations = []
+        for period in range(periods):
+            if sparsity > 0 and random_state.rand() < sparsity:
+                continue
+            observations.append('<generic:Obs><generic:ObsDimension value="{0}"/>'
+                                '<generic:ObsValue value="{1:.4f}"/><generic:Attributes>'
+                                '<generic:Value id="OBS_STATUS" value="na"/>'
+                                '</generic:Attributes></generic:Obs>'.format(start + period,
+                                                                            random_state.rand()))
+        if shuffle:
+            values = [values[i] for i in order_state.permutation(len(values))]
+            observations = [observations[i] for i in order_state.permutation(len(observations))]
+        parts.append('<generic:Series><generic:SeriesKey>{0}'
+                     '</generic:SeriesKey>'.format(''.join(values)))
+        parts.extend(observations)
+        parts.append('</generic:Series>')
+    parts.append('</message:DataSet></message:GenericData>')
+    return ''.join(parts)
+
+
+def make_jsdmx(dimensions=(10, 5, 2), periods=20, sparsity=0., start=1990, seed=0):
+    """
+    Generate SDMX-JSON data
+
+    Parameters
+    ----------
+    dimensions : tuple of int
+        Number of values for each series dimension.
+        The number of series is the product of them.
+    periods : int
+        Number of annual observations per series
+    sparsity : float
+        Ratio of omitted series and observations
+    start : int
+        First year of observations
+    seed : int
+        Random seed
+
+    Returns
+    -------
+    result : str
+    """
+    random_state = np.random.RandomState(seed)
+    names = _dimension_names(dimensions)
+
+    series_dims = [{'id': name, 'name': name,
+                    'values': [{'id': 'C{0}'.format(i), 'name': '{0} value {1}'.format(name, i)}
+                               for i in range(size)]}
+                   for name, size in zip(names, dimensions)]
+    obs_dims = [{'id': 'TIME_PERIOD', 'name': 'Year', 'role': 'time',
+                 'values': [{'id': str(start + i), 'name': str(start + i)}
+                            for i in range(periods)]}]
+
+    series = {}
+    for key in _iter_keys(dimensions, sparsity, random_state):
+        observations = {}
+        for period in range(periods):
+            if sparsity > 0 and random_state.rand() < sparsity:
+                continue
+            observations[str(period)] = [round(random_state.rand(), 4), None]
+        series[':'.join(str(k) for k in key)] = {'attributes': [],
+                                                  'observations': observations}
+
+    data = {'header': {'id': 'SYNTHETIC'},
+            'dataSets': [{'action': 'Information', 'series': series}],
+            'structure': {'dimensions': {'series': series_dims, 'observation': obs_dims}}}
+    return json.dumps(data)
+
+
+def make_jstat(dimensions=(10, 5, 20), sparsity=0., status=False, seed=0):
+    """
+    Generate JSON-stat data
+
+    Parameters
+    ----------
+    dimensions : tuple of int
+        Number of categories for each dimension
+    sparsity : float
+        Ratio of omitted values. If more than 0, value is written as dict
+    status : bool
+        If True, include status of values
+    seed : int
+        Random seed
+
+    Returns
+    -------
+    result : str
+    """
+    random_state = np.random.RandomState(seed)
+    names = _dimension_names(dimensions)
+    size = int(np.prod(dimensions))
+
+    dimension = {'id': names, 'size': list(dimensions)}
+    for name, dim_size in zip(names, dimensions):
+        categories = ['{0}{1}'.format(name, i) for i in range(dim_size)]
+        dimension[name] = {'category': {'index': categories,
+                                        'label': dict((c, c + ' label') for c in categories)}}
+
+    values = np.round(random_state.rand(size), 4)
+    if sparsity > 0:
+        mask = random_state.rand(size) >= sparsity
+        value = dict((str(i), v) for i, v in zip(np.arange(size)[mask], values[mask]))
+    else:
+        value = values.tolist()
+
+    dataset = {'value': value, 'dimension': dimension}
+    if status:
+        flags = random_state.rand(size) < 0.1
+        dataset['status'] = dict((str(i), 'e') for i in np.arange(size)[flags])
+    return json.dumps({'dataset': dataset})
@@ -2,18 +2,19 @@
 
 from __future__ import unicode_literals
 
-import copy
 import datetime
 import json
 import warnings
 
 import numpy as np
 import pandas as pd
-from pandas.compat import StringIO, iterkeys, iteritems
+import pandas.compat as compat
+from pandas.compat import range, iterkeys
 from pandas.util.decorators import Appender
 
-from pyopendata.base import DataStore, DataResource, _shared_docs
+from pyopendata.base import DataStore, DataResource, _Prefetch, _shared_docs
 from pyopendata.io import read_jsdmx
+from pyopendata.io.util import _json_loads
 from pyopendata.util import network
 
 
@@ -30,88 +31,207 @@ class WorldBankStore(DataStore):
     _cache_attrs = ['_datasets']
 
     @Appender(_shared_docs['get'] % _worldbank_doc_kwargs)
-    def get(self, resource_id):
+    def get(self, resource_id, max_workers=None):
         query = '/countries/all/indicators/{0}?format=json'.format(resource_id)
         url = self.url + query
-        return WorldBankResource(id=resource_id, url=url)
+        return WorldBankResource(id=resource_id, url=url, max_workers=max_workers)
 
 
 class WorldBankResource(DataResource):
 
     entries_per_page = 500
+    # number of pages to be retrieved concurrently
+    max_workers = 4
 
-    def _read_pagenate(self, **kwargs):
+    _since_keyword = 'start_date'
+
+    def __init__(self, max_workers=None, **kwargs):
+        DataResource.__init__(self, **kwargs)
+        if max_workers is not None:
+            self.max_workers = max_workers
+        # date range which _raw_content corresponds to
+        self._raw_query = None
+
+    def _date_query(self, start_date=None, end_date=None):
+        """
+        Return the date range as World Bank ``date`` parameter, such as "2010:2015"
+        """
+        if start_date is None and end_date is None:
+            return None
+        dates = []
+        for value, default in [(start_date, 1900), (end_date, datetime.date.today().year)]:
+            if value is None:
+                value = default
+            elif hasattr(value, 'strftime'):
+                value = value.strftime('%Y')
+            dates.append(str(value))
+        return ':'.join(dates)
+
+    def _page_query(self, page, dates=None):
+        query = '&page={0}&per_page={1}'.format(page, self.entries_per_page)
+        if dates is not None:
+            query += '&date={0}'.format(dates)
+        return query
+
+    def _source_queries(self, start_date=None, end_date=None, **kwargs):
+        dates = self._date_query(start_date=start_date, end_date=end_date)
+        return [(self.url + self._page_query(1, dates=dates), ())]
+
+    def _parse_page(self, response):
+        data = _json_loads(response.content)
+        meta = data[0]
+        content = data[1]
+        return meta, content
+
+    def _read_page(self, page, dates=None):
+        return self._parse_page(self._requests_get(self._page_query(page, dates=dates)))
+
+    def _prefetch(self, start_date=None, end_date=None, **kwargs):
+        dates = self._date_query(start_date=start_date, end_date=end_date)
+        if self._raw_content is not None and self._raw_query == dates:
+            return []
+
+        pages = {}
+
+        def page_callback(page):
+            def callback(response):
+                self._check_status(response)
+                meta, content = self._parse_page(response)
+                pages[page] = content or []
+
+                followings = []
+                if page == 1:
+                    # total number of pages can be known after retrieving the 1st page
+                    followings = [_Prefetch(self.url + self._page_query(p, dates=dates), None,
+                                            page_callback(p))
+                                  for p in range(2, meta['pages'] + 1)]
+                if len(pages) >= meta['pages']:
+                    self._raw_content = [c for p in sorted(pages) for c in pages[p]]
+                    self._raw_query = dates
+                return followings
+            return callback
+
+        return [_Prefetch(self.url + self._page_query(1, dates=dates), None, page_callback(1))]
+
+    def _read_pagenate(self, start_date=None, end_date=None, **kwargs):
         """Because of pagenation, raw_contet stores parsed json data as it is
         * _read_raw will return it after converting to string
         * _read will convert it to pandas.DataFrame
         """
-        if self._raw_content is None:
-            page = 1
-            contents = []
-            pb = None
-
-            while(True):
-                query = '&page={0}&per_page={1}'.format(page, self.entries_per_page)
-                data = self._requests_get(query).json()
-                meta = data[0]
-                content = data[1]
-
-                if pb is None:
-                    # progressbar cannot be initialized
-                    # arter retrieving total number of pages
-                    pb = network.ProgressBar(total=meta['pages'])
+        dates = self._date_query(start_date=start_date, end_date=end_date)
+        if self._raw_content is None or self._raw_query != dates:
+            # total number of pages can be known after retrieving the 1st page
+            meta, content = self._read_page(1, dates=dates)
+            if meta['pages'] > 0:
+                # no pages are reported if nothing matches
+                pb = network.ProgressBar(total=meta['pages'])
                 pb.update(1)
+
+            contents = []
+            if content:
                 contents.extend(content)
-                if page >= meta['pages']:
-                    break
-                page = page + 1
+
+            def read_page(page):
+                meta, content = self._read_page(page, dates=dates)
+                return content
+
+            pages = range(2, meta['pages'] + 1)
+            for content in network.imap_threads(read_page, pages,
+                                                max_workers=self.max_workers):
+                pb.update(1)
+                if content:
+                    contents.extend(content)
 
             self._raw_content = contents
+            self._raw_query = dates
         return self._raw_content
 
     def _read_raw(self, **kwargs):
-        contents = copy.deepcopy(self._read_pagenate(**kwargs))
-        return StringIO(json.dumps(contents))
-
-    def _read(self, **kwargs):
-        # meta, data = json.loads(json_raw)
-        page = 1
-        contents = []
-
-        def assign_value(entry):
-            # each attribute can contain dict as value.
-            # In this case, retrieve 'value' from the list
-            #
-            # {'date': '2009',
-            #  'country': {'id': 'L5', 'value': 'Andean Region'},
-            #  'indicator': {'id': 'NY.GDP.PCAP.KD.ZG', 'value': 'GDP per capita growth (annual %)'},
-            #  'decimal': '1', 'value': None},
-
-            for k, v in iteritems(entry):
-                if isinstance(v, dict):
-                    entry[k] = v['value']
-            if 'date' in entry:
-                dt = entry['date']
-                if '1900' <= dt <= '2100':
-                    entry['date'] = datetime.datetime(int(dt), 1, 1)
-            for key in ['decimal', 'value']:
-                if key in entry and entry[key] is not None:
-                    entry[key] = float(entry[key])
-            if entry['decimal'] != 0:
-                message = "The entry has 'decimal' != 0, it may not be parsed properly "
-                warnings.warn(message , UserWarning)
-            return entry
-        contents = copy.deepcopy(self._read_pagenate(**kwargs))
-        contents = [assign_value(c) for c in contents]
-        result = pd.DataFrame(contents)
+        contents = self._read_pagenate(**kwargs)
+        out = self._new_buffer()
+        out.write(json.dumps(contents).encode('utf-8'))
+        out.seek(0)
+        return out
+
+    def _read(self, start_date=None, end_date=None, **kwargs):
+        """
+        Read data from World Bank
+
+        Parameters
+        ----------
+        start_date, end_date : str, int or datetime-like, optional
+            Filter observations by year
+        """
+        # each attribute can contain dict as value.
+        # In this case, retrieve 'value' from the dict
+        #
+        # {'date': '2009',
+        #  'country': {'id': 'L5', 'value': 'Andean Region'},
+        #  'indicator': {'id': 'NY.GDP.PCAP.KD.ZG', 'value': 'GDP per capita growth (annual %)'},
+        #  'decimal': '1', 'value': None},
+
+        # cached contents are only read, not modified
+        contents = self._read_pagenate(start_date=start_date, end_date=end_date, **kwargs)
+        if len(contents) == 0:
+            return pd.DataFrame()
+
+        columns = {}
+        for key in ('date', 'country', 'indicator', 'decimal', 'value'):
+            columns[key] = _extract_values(contents, key)
+
+        columns['date'] = _convert_dates(columns['date'])
+        for key in ('decimal', 'value'):
+            columns[key] = _convert_floats(columns[key])
+
+        if (columns['decimal'] != 0).any():
+            message = "The entry has 'decimal' != 0, it may not be parsed properly "
+            warnings.warn(message, UserWarning)
 
         try:
-            result = pd.pivot_table(result, index='date', columns=['indicator', 'country'],
-                                    values='value', aggfunc=np.sum)
+            result = _pivot(columns['value'], date=columns['date'],
+                            indicator=columns['indicator'], country=columns['country'])
         except Exception:
-            pass
-
+            result = pd.DataFrame(columns)
         return result
 
 
+def _extract_values(contents, key):
+    values = np.empty(len(contents), dtype=object)
+    for i, entry in enumerate(contents):
+        value = entry.get(key)
+        if isinstance(value, dict):
+            value = value['value']
+        values[i] = value
+    return values
+
+
+def _convert_dates(values):
+    # annual data can be parsed as datetime
+    uniques = pd.unique(values)
+    for dt in uniques:
+        if not (isinstance(dt, compat.string_types) and len(dt) == 4 and
+                dt.isdigit() and '1900' <= dt <= '2100'):
+            return values
+    return pd.to_datetime(values, format='%Y')
 
+
+def _convert_floats(values):
+    mask = pd.isnull(values)
+    result = np.empty(len(values), dtype=np.float64)
+    result.fill(np.nan)
+    result[~mask] = values[~mask].astype(np.float64)
+    return result
+
+
+def _pivot(values, date, indicator, country):
+    """
+    Reshape values to DataFrame whose index is date and columns are indicator and country.
+    Same as ``pd.pivot_table(..., aggfunc=np.sum)`` but avoids grouping
+    """
+    mask = ~np.isnan(values)
+    index = pd.MultiIndex.from_arrays([date[mask], indicator[mask], country[mask]],
+                                      names=['date', 'indicator', 'country'])
+    result = pd.Series(values[mask], index=index)
+    if not result.index.is_unique:
+        result = result.groupby(level=[0, 1, 2]).sum()
+    return result.unstack(level=['indicator', 'country'])